@@ -1,77 +1,412 @@
 from flask import Flask, render_template, request, jsonify, send_from_directory
-from database import db, Player
+import click
+import mimetypes
+import data_assets
+import metrics
+from draft import DEFAULT_BENCH, simulator
+from database import STAT_NAMES, db, Player, season_stats_query
+from jobs import JobManager
+from result_cache import ResultCache
+from scoring import WEIGHT_NAMES, engine
+from serialization import MappedBody
+from stat_fields import stat_set_name
+from search import player_search
+from similarity import similarity
 import fetch_data
+import load_data
 import os
+import snapshot_file
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///baseball_stats.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///baseball_stats.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db.init_app(app)
 
+# Per-route latency, response sizes and query counts, served at /metrics
+metrics.init_app(app)
+
+# Encoded /api/calculate responses, keyed by the normalised weights, year, options and data version
+result_cache = ResultCache(int(os.environ.get('RESULT_CACHE_SIZE', 256)))
+
+# Processes used by /api/simulate-draft
+DRAFT_WORKERS = int(os.environ.get('DRAFT_WORKERS', os.cpu_count() or 1))
+
+# With SNAPSHOT_DIR set, players are served from the snapshot files published
+# there (see load_data.build_snapshot) and the database is not used
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR') or None
+if SNAPSHOT_DIR:
+    engine.use_snapshots(SNAPSHOT_DIR)
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+# Columns that /api/players and /api/calculate can sort by, besides the stats
+SORT_FIELDS = ('name', 'team', 'position')
+
+def parse_list_options(args, sortable):
+    """
+    Parse the paging, sorting and filter parameters shared by /api/players and /api/calculate.
+
+    `top_k=N` is shorthand for the first N players sorted by `sort` (points by default
+    where available). Raises ValueError with a message for the client on bad input.
+    """
+    options = {'positions': None, 'team': None, 'is_pitcher': None,
+               'sort': args.get('sort'), 'descending': True, 'offset': 0, 'limit': None}
+    
+    position = args.get('position')
+    if position:
+        # A comma-separated string, or a list of positions in a JSON body
+        values = position.split(',') if isinstance(position, str) else position
+        if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+            raise ValueError('position must be a string or a list of strings')
+        options['positions'] = [value.strip() for value in values if value.strip()]
+    team = args.get('team')
+    if team is not None and not isinstance(team, str):
+        raise ValueError('team must be a string')
+    options['team'] = team or None
+    
+    is_pitcher = args.get('is_pitcher')
+    if is_pitcher is not None and is_pitcher != '':
+        if str(is_pitcher).lower() in ('1', 'true', 'yes'):
+            options['is_pitcher'] = True
+        elif str(is_pitcher).lower() in ('0', 'false', 'no'):
+            options['is_pitcher'] = False
+        else:
+            raise ValueError('is_pitcher must be true or false')
+    
+    order = str(args.get('order', 'desc')).lower()
+    if order not in ('asc', 'desc'):
+        raise ValueError('order must be asc or desc')
+    options['descending'] = order == 'desc'
+    
+    for name in ('offset', 'limit', 'top_k'):
+        value = args.get(name)
+        if value is None or value == '':
+            continue
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{name} must be an integer')
+        if value < 0:
+            raise ValueError(f'{name} must not be negative')
+        if name == 'top_k':
+            options['limit'] = value
+            options['sort'] = options['sort'] or sortable[0]
+        else:
+            options[name] = value
+    
+    if options['sort'] is not None and options['sort'] not in sortable:
+        raise ValueError(f"sort must be one of: {', '.join(sortable)}")
+    return options
+
 @app.route('/api/players')
 def get_players():
-    year = request.args.get('year', '2025')  # Default to 2025 projected stats
-    players = Player.query.all()
-    return jsonify([player.to_dict() for player in players])
+    try:
+        # Defaults to the latest season's projection; see Snapshot.selection
+        selection = engine.selection(request.args.get('year'), request.args.get('kind'))
+        options = parse_list_options(request.args, STAT_NAMES + SORT_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Player JSON is encoded once per data version; the response only joins the encoded players
+    snapshot = engine.get_snapshot()
+    if not any((options['positions'], options['team'], options['sort'], options['offset'])) and \
+            options['is_pitcher'] is None and options['limit'] is None:
+        # Every player in id order is one cached buffer
+        total, body = snapshot.size, snapshot.body(selection)
+    elif SNAPSHOT_DIR:
+        # No database to ask, so the snapshot's columns are filtered and sorted instead
+        total, rows = snapshot.page(selection, **options)
+        body = snapshot.body(selection, rows.tolist())
+    else:
+        # Filters, sorting and paging run in SQL, which picks the ids to return
+        query = db.select(Player.id)
+        if options['positions']:
+            query = query.filter(Player.position.in_(options['positions']))
+        if options['team']:
+            query = query.filter(Player.team == options['team'])
+        if options['is_pitcher'] is not None:
+            query = query.filter(Player.is_pitcher == options['is_pitcher'])
+        total = db.session.execute(db.select(db.func.count()).select_from(query.subquery())).scalar()
+        
+        if options['sort'] in SORT_FIELDS:
+            column = getattr(Player, options['sort'])
+        elif options['sort']:
+            # The selected season's stats (or their multi-season totals) joined on by player
+            stats = season_stats_query(selection).subquery()
+            query = query.outerjoin(stats, stats.c.player_id == Player.id)
+            column = db.func.coalesce(stats.c[options['sort']], 0)
+        if options['sort']:
+            query = query.order_by(column.desc() if options['descending'] else column.asc(), Player.id)
+        else:
+            query = query.order_by(Player.id)
+        query = query.offset(options['offset'])
+        if options['limit'] is not None:
+            query = query.limit(options['limit'])
+        ids = db.session.execute(query).scalars().all()
+        rows = [snapshot.row_of.get(player_id) for player_id in ids]
+        if None in rows:
+            # The tables were reloaded since the snapshot was read; pick up the new data,
+            # and leave out any id the snapshot still doesn't have
+            engine.check_data(force=True)
+            snapshot = engine.get_snapshot()
+            rows = [snapshot.row_of.get(player_id) for player_id in ids]
+        body = snapshot.body(selection, [row for row in rows if row is not None])
+    
+    if isinstance(body, MappedBody):
+        # Streamed from the snapshot file's mapping rather than copied into this process
+        response = app.response_class(body, mimetype='application/json', direct_passthrough=True)
+        response.content_length = len(body)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+    response.headers['X-Total-Count'] = str(total)
+    return response
+
+# Most results /api/search returns at once
+MAX_SEARCH_RESULTS = 100
+
+@app.route('/api/search')
+def search_players():
+    query = request.args.get('q', '').strip()
+    try:
+        limit = min(int(request.args.get('limit', 10)), MAX_SEARCH_RESULTS)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be at least 1'}), 400
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    
+    results = [dict(player, score=score) for score, player in player_search.search(query, limit)]
+    source = 'index'
+    if not results and request.args.get('fallback', 'true').lower() not in ('0', 'false'):
+        # Not a player we have loaded; ask the MLB API
+        people = fetch_data.fetch_player_by_name(query) or []
+        results = [{
+            'id': person['id'],
+            'name': person.get('fullName'),
+            'team': person.get('currentTeam', {}).get('name'),
+            'position': person.get('primaryPosition', {}).get('abbreviation'),
+            'is_pitcher': person.get('primaryPosition', {}).get('abbreviation') in ['P', 'SP', 'RP', 'CL'],
+            'score': None
+        } for person in people[:limit]]
+        source = 'mlb_api'
+    
+    return jsonify({'query': query, 'source': source, 'results': results})
+
+# Most players /api/similar returns at once
+MAX_SIMILAR_RESULTS = 100
+
+@app.route('/api/similar/<int:player_id>')
+def similar_players(player_id):
+    try:
+        k = min(int(request.args.get('k', 10)), MAX_SIMILAR_RESULTS)
+    except ValueError:
+        return jsonify({'error': 'k must be an integer'}), 400
+    if k < 1:
+        return jsonify({'error': 'k must be at least 1'}), 400
+    positions = [p for p in request.args.get('position', '').split(',') if p] or None
+    
+    index = similarity.get_index()
+    if player_id not in index.members:
+        return jsonify({'error': f"Player {player_id} not found"}), 404
+    
+    snapshot = index.snapshot
+    neighbours = index.similar([player_id], k, positions)[0]
+    return jsonify({
+        'player': snapshot.player(index.snapshot_row(player_id)),
+        'results': [dict(snapshot.player(row), distance=round(distance, 4)) for distance, row in neighbours]
+    })
 
 @app.route('/api/calculate', methods=['POST'])
 def calculate_points():
     # Get the scoring weights from the request
     weights = request.json
-    year = weights.get('year', '2025')
+    if not isinstance(weights, dict):
+        return jsonify({'error': 'The body must be a JSON object of weights'}), 400
     
-    # Get all players
-    players = Player.query.all()
-    result = []
+    # Paging and filter options can come in the query string or alongside the weights
+    params = {**weights, **request.args.to_dict()}
+    # Keys and scores both come from this snapshot, even if a newer one appears meanwhile
+    snapshot = engine.get_snapshot()
+    try:
+        options = parse_list_options(params, ('points',) + STAT_NAMES + SORT_FIELDS)
+        selection = snapshot.selection(params.get('year'), params.get('kind'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    for player in players:
-        player_dict = player.to_dict()
-        stats = player_dict[f'stats_{year}']
-        points = 0
-        
-        # Calculate points based on weights
-        if not player.is_pitcher:  # Batter
-            points += stats['avg'] * weights.get('avg', 0)
-            points += stats['runs'] * weights.get('runs', 0)
-            points += stats['rbi'] * weights.get('rbi', 0)
-            points += stats['steals'] * weights.get('steals', 0)
-            points += stats['hr'] * weights.get('hr', 0)
-        else:  # Pitcher
-            points += stats['wins'] * weights.get('wins', 0)
-            # For ERA, lower is better, so we invert the weight
-            if weights.get('era', 0) != 0:
-                points += (5.0 - stats['era']) * weights.get('era', 0)  # 5.0 is a baseline ERA
-            points += stats['strikeouts'] * weights.get('strikeouts', 0)
-            # For walks, lower is better, so we invert the weight
-            if weights.get('walks', 0) != 0:
-                points += (100 - stats['walks']) * weights.get('walks', 0) / 100  # Normalize walks
-            points += stats['saves'] * weights.get('saves', 0)
-        
-        # Add points to the result
-        player_dict['points'] = round(points, 2)
-        result.append(player_dict)
+    # Identical weight sets share one cached response; repeat clients can skip the body entirely
+    try:
+        key = result_cache.key(snapshot.version, weights, WEIGHT_NAMES, selection.name, options)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Weights must be numbers'}), 400
+    etag = result_cache.etag(key)
+    if etag in request.if_none_match:
+        result_cache.count_not_modified()
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    
+    cached = result_cache.get(key)
+    if cached is None:
+        # Score every player at once from the columnar snapshot of the Player table
+        total, body = engine.calculate_json(weights, selection, snapshot=snapshot, **options)
+        cached = (body, total)
+        result_cache.put(key, cached)
+    
+    body, total = cached
+    response = app.response_class(body, mimetype='application/json')
+    response.headers['X-Total-Count'] = str(total)
+    response.set_etag(etag)
+    return response
+
+@app.route('/api/simulate-draft', methods=['POST'])
+def simulate_draft():
+    settings = request.json or {}
+    if not isinstance(settings, dict) or not isinstance(settings.get('weights', settings), dict):
+        return jsonify({'error': 'The body and weights must be JSON objects'}), 400
+    if settings.get('slots') is not None and not isinstance(settings['slots'], dict):
+        return jsonify({'error': 'slots must be an object of counts per roster slot'}), 400
+    weights = settings.get('weights', settings)
+    try:
+        selection = engine.selection(settings.get('year', weights.get('year')),
+                                     settings.get('kind', weights.get('kind')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        snapshot, points = engine.points(weights, selection)
+        result = simulator.run(
+            points, snapshot.players,
+            teams=int(settings.get('teams', 12)),
+            slots=settings.get('slots'),
+            bench=int(settings.get('bench', DEFAULT_BENCH)),
+            draft_position=int(settings.get('draft_position', 1)),
+            simulations=int(settings.get('simulations', 1000)),
+            opponents=settings.get('opponents', 'adp'),
+            noise=settings.get('noise'),
+            seed=int(settings.get('seed', 0)),
+            workers=DRAFT_WORKERS,
+            limit=int(settings['limit']) if settings.get('limit') is not None else None
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify(result)
 
-@app.route('/api/refresh-data')
+@app.errorhandler(snapshot_file.NoSnapshotError)
+def no_snapshot(e):
+    return jsonify({'error': str(e)}), 503
+
+@app.route('/readyz')
+def readiness():
+    # Opening the data is all it takes to serve; payloads and indexes are built on first use
+    try:
+        snapshot = engine.get_snapshot()
+    except Exception as e:
+        return jsonify({'ready': False, 'error': str(e)}), 503
+    return jsonify({
+        'ready': True,
+        'source': 'snapshot' if SNAPSHOT_DIR else 'database',
+        'version': snapshot.version,
+        'players': snapshot.size,
+        'stat_sets': sorted(stat_set_name(season, kind) for season, kind in snapshot.available)
+    })
+
+@app.route('/api/cache-stats')
+def cache_stats():
+    return jsonify(result_cache.stats())
+
+def run_refresh(job):
+    """
+    Background refresh: fetch the data, then load it into the database or
+    publish it as a new snapshot file.
+    """
+    if not fetch_data.fetch_players_data(progress=job.update):
+        return False
+    job.update('loading', 0, 0, job.errors)
+    stages = metrics.StageTimer()
+    if SNAPSHOT_DIR:
+        with stages.stage('snapshot_build'):
+            load_data.build_snapshot(directory=SNAPSHOT_DIR)
+        # Other workers notice the new file on their next check
+        engine.check_data(force=True)
+    else:
+        with app.app_context():
+            # Loading bumps the data version, which drops every cached result
+            with stages.stage('db_load'):
+                load_data.load_players()
+    stages.observe()
+    return True
+
+# Refresh job state and the lock that keeps to one crawl at a time, shared by every worker
+JOBS_DIR = os.environ.get('JOBS_DIR') or os.path.join(app.instance_path, 'jobs')
+refresh_jobs = JobManager(run_refresh, JOBS_DIR)
+
+@app.route('/api/refresh-data', methods=['GET', 'POST'])
 def refresh_data():
-    success = fetch_data.fetch_players_data()
-    return jsonify({'success': success})
+    # The crawl takes minutes, so it runs in the background; concurrent requests share one job
+    job, created = refresh_jobs.submit()
+    return jsonify({
+        'job_id': job.id,
+        'created': created,
+        'status': job.status,
+        'status_url': f'/api/refresh-data/{job.id}'
+    }), 202
+
+@app.route('/api/refresh-data/<job_id>')
+def refresh_status(job_id):
+    job = refresh_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': f'No refresh job {job_id}'}), 404
+    return jsonify(job.to_dict())
+
+# Directory the JSON data files and their compressed/hashed copies are served from
+DATA_DIR = os.path.join(app.root_path, 'data')
 
 @app.route('/data/<path:filename>')
 def data_files(filename):
-    return send_from_directory('data', filename)
+    # Serve the precompressed sibling the client accepts instead of compressing per request
+    path, encoding = data_assets.negotiate(DATA_DIR, filename, request.accept_encodings)
+    mimetype = mimetypes.guess_type(filename)[0]
+    response = send_from_directory(DATA_DIR, path, mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+
+    if data_assets.is_hashed(filename):
+        # The name changes whenever the contents do
+        response.headers['Cache-Control'] = data_assets.IMMUTABLE_CACHE_CONTROL
+    else:
+        # Always revalidate the unhashed names (and manifest.json) against their ETag
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.cli.command('load-data')
+@click.argument('path', default='data/players.json')
+def load_data_command(path):
+    """Load a players.json file into the database."""
+    loaded = load_data.load_players(path)
+    click.echo(f"Loaded {loaded} players from {path}")
+
+@app.cli.command('build-snapshot')
+@click.argument('path', default='data/players.json')
+@click.option('--snapshot-dir', default=lambda: SNAPSHOT_DIR or load_data.DEFAULT_SNAPSHOT_DIR)
+def build_snapshot_command(path, snapshot_dir):
+    """Build a snapshot file from a players.json file and make it the current one."""
+    click.echo(f"Built {load_data.build_snapshot(path, snapshot_dir)} from {path}")
 
 if __name__ == '__main__':
-    # Create the database if it doesn't exist
-    if not os.path.exists('instance/baseball_stats.db'):
+    # Never crawl at startup; a missing database is loaded from the data files on disk
+    if not SNAPSHOT_DIR:
         with app.app_context():
             db.create_all()
-            fetch_data.fetch_players_data()  # Populate with sample data
+            if db.session.execute(db.select(Player.id).limit(1)).first() is None:
+                if os.path.exists('data/players.json'):
+                    load_data.load_players()
+                else:
+                    print("No player data yet: run fetch_data.py or POST /api/refresh-data")
     
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
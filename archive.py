@@ -0,0 +1,160 @@
+"""
+Archive of the raw MLB Stats API responses behind each fetch run.
+
+Every run writes one compressed NDJSON file: a header line with the run's
+settings, one line per response ({"path": ..., "body": raw response text}) and a
+closing summary. Files are zstd-compressed when the zstandard package is
+installed and gzipped otherwise, and are named after the run and whether it was
+a full refresh, e.g. 20250601T060000.full.ndjson.zst.
+
+An incremental run only archives what it re-fetched, so rebuilding its output
+takes the archives from the last full run onwards; see rebuild.py.
+"""
+import gzip
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_ARCHIVE_DIR = 'archive'
+ARCHIVE_FORMAT_VERSION = 1
+
+# Archives from this many full runs (and the incremental runs after them) are kept
+KEEP_FULL_RUNS = 2
+
+ARCHIVE_NAME = re.compile(r'^(?P<run>\d{8}T\d{6})\.(?P<kind>full|incremental)\.ndjson\.(?P<compression>zst|gz)$')
+
+
+def compression():
+    return 'zst' if zstandard is not None else 'gz'
+
+
+def open_archive(path, mode='rt', compression=None):
+    """
+    Open an archive file for reading ('rt') or writing ('wt') as text. The
+    compression ('zst' or 'gz') is taken from the file name unless given.
+    """
+    if compression is None:
+        compression = 'zst' if path.endswith('.zst') else 'gz'
+    if compression == 'zst':
+        if zstandard is None:
+            raise RuntimeError(f"Reading {path} needs the zstandard package")
+        if mode == 'wt':
+            return io.TextIOWrapper(zstandard.ZstdCompressor(level=10).stream_writer(open(path, 'wb')),
+                                    encoding='utf-8')
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb')), encoding='utf-8')
+    return gzip.open(path, mode, encoding='utf-8')
+
+
+class ArchiveWriter:
+    """
+    Appends responses to a run's archive from any number of threads.
+
+    The archive is written to a temp file and only gets its final name from
+    close(), so a failed run leaves nothing behind after abort().
+    """
+
+    def __init__(self, directory, **meta):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.started = datetime.now()
+        self.lock = threading.Lock()
+        self.records = 0
+        self.compression = compression()
+        fd, self.tmp_path = tempfile.mkstemp(prefix='.archive.', suffix='.tmp', dir=directory)
+        os.close(fd)
+        self.file = open_archive(self.tmp_path, 'wt', self.compression)
+        self._write({'type': 'meta', 'format': ARCHIVE_FORMAT_VERSION,
+                     'started_at': self.started.isoformat(), **meta})
+
+    def _write(self, record):
+        self.file.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def add(self, path, body):
+        """
+        Record the raw body of a successful response to `path` (relative to the API base URL).
+        """
+        with self.lock:
+            self._write({'path': path, 'body': body})
+            self.records += 1
+
+    def close(self, incremental, **summary):
+        """
+        Finish the archive and give it its final name, which is returned.
+        """
+        with self.lock:
+            self._write({'type': 'summary', 'incremental': incremental, 'responses': self.records,
+                         'finished_at': datetime.now().isoformat(), **summary})
+            self.file.close()
+            kind = 'incremental' if incremental else 'full'
+            path = os.path.join(self.directory,
+                                f"{self.started.strftime('%Y%m%dT%H%M%S')}.{kind}.ndjson.{self.compression}")
+            os.chmod(self.tmp_path, 0o644)
+            os.replace(self.tmp_path, path)
+        return path
+
+    def abort(self):
+        with self.lock:
+            self.file.close()
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+
+
+def read_archive(path):
+    """
+    Yield every record of an archive: the meta header, one per response and the summary.
+    """
+    with open_archive(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def list_archives(directory):
+    """
+    The archives in `directory` as (path, run, kind) tuples, oldest first.
+    """
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    archives = []
+    for name in names:
+        match = ARCHIVE_NAME.match(name)
+        if match:
+            archives.append((os.path.join(directory, name), match['run'], match['kind']))
+    return sorted(archives, key=lambda archive: archive[1])
+
+
+def latest_chain(directory):
+    """
+    Paths of the last full run's archive and every later one, oldest first:
+    everything needed to rebuild the latest output.
+    """
+    archives = list_archives(directory)
+    full_runs = [index for index, (_, _, kind) in enumerate(archives) if kind == 'full']
+    if not full_runs:
+        return []
+    return [path for path, _, _ in archives[full_runs[-1]:]]
+
+
+def prune_archives(directory, keep_full_runs=KEEP_FULL_RUNS):
+    """
+    Delete archives older than the last `keep_full_runs` full runs. Returns the deleted paths.
+    """
+    archives = list_archives(directory)
+    full_runs = [index for index, (_, _, kind) in enumerate(archives) if kind == 'full']
+    if len(full_runs) <= keep_full_runs:
+        return []
+    removed = [path for path, _, _ in archives[:full_runs[-keep_full_runs]]]
+    for path in removed:
+        os.remove(path)
+    return removed
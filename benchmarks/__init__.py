@@ -0,0 +1,3 @@
+"""
+Offline benchmarks for DiamondDraft. Nothing in here talks to the real MLB Stats API.
+"""
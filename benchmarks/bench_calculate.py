@@ -0,0 +1,120 @@
+"""
+Time POST /api/calculate through the Flask test client at several league sizes.
+
+    python -m benchmarks.bench_calculate --sizes 1000 10000 100000
+
+Each size is loaded into a throwaway SQLite database. The previous per-player
+ORM loop is timed alongside the scoring engine, and their points are compared.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+# app reads DATABASE_URL at import time, so point it at a scratch database first
+BENCH_DIR = tempfile.mkdtemp(prefix='diamonddraft-bench-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(BENCH_DIR, 'bench.db')}"
+
+from flask import jsonify, request  # noqa: E402
+
+from app import app, result_cache  # noqa: E402
+from benchmarks.synthetic import synthetic_player_rows  # noqa: E402
+from database import db, Player, PlayerSeasonStats  # noqa: E402
+from scoring import engine  # noqa: E402
+
+WEIGHTS = {'avg': 100, 'runs': 1, 'rbi': 1, 'steals': 2, 'hr': 4,
+           'wins': 5, 'era': 3, 'strikeouts': 1, 'walks': 2, 'saves': 5}
+
+
+def legacy_calculate():
+    """
+    The per-player loop /api/calculate used before the scoring engine.
+    """
+    weights = request.json
+    stat_set = engine.selection(weights.get('year'), weights.get('kind')).name
+    result = []
+    for player in Player.query.all():
+        player_dict = player.to_dict()
+        stats = player_dict[f'stats_{stat_set}']
+        points = 0
+        if not player.is_pitcher:
+            points += stats['avg'] * weights.get('avg', 0)
+            points += stats['runs'] * weights.get('runs', 0)
+            points += stats['rbi'] * weights.get('rbi', 0)
+            points += stats['steals'] * weights.get('steals', 0)
+            points += stats['hr'] * weights.get('hr', 0)
+        else:
+            points += stats['wins'] * weights.get('wins', 0)
+            if weights.get('era', 0) != 0:
+                points += (5.0 - stats['era']) * weights.get('era', 0)
+            points += stats['strikeouts'] * weights.get('strikeouts', 0)
+            if weights.get('walks', 0) != 0:
+                points += (100 - stats['walks']) * weights.get('walks', 0) / 100
+            points += stats['saves'] * weights.get('saves', 0)
+        player_dict['points'] = round(points, 2)
+        result.append(player_dict)
+    return jsonify(result)
+
+
+app.add_url_rule('/bench/legacy-calculate', 'legacy_calculate', legacy_calculate, methods=['POST'])
+
+
+def load_players(count):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        players, seasons = synthetic_player_rows(count)
+        db.session.execute(db.insert(Player), players)
+        db.session.execute(db.insert(PlayerSeasonStats), seasons)
+        db.session.commit()
+    engine.invalidate()
+
+
+def time_requests(client, path, repeat, cached=False):
+    timings = []
+    for _ in range(repeat):
+        if not cached:
+            result_cache.clear()
+        started = time.perf_counter()
+        response = client.post(path, json=WEIGHTS)
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+    return timings, response.get_json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    for size in args.sizes:
+        load_players(size)
+
+        # The first engine request builds the snapshot; report it separately
+        started = time.perf_counter()
+        client.post('/api/calculate', json=WEIGHTS)
+        cold = time.perf_counter() - started
+
+        engine_times, engine_result = time_requests(client, '/api/calculate', args.repeat)
+        cached_times, _ = time_requests(client, '/api/calculate', args.repeat, cached=True)
+        legacy_times, legacy_result = time_requests(client, '/bench/legacy-calculate', max(1, args.repeat // 2))
+
+        # Scoring alone, without the JSON encoding of the response
+        with app.app_context():
+            started = time.perf_counter()
+            engine.calculate(WEIGHTS)
+            scoring = time.perf_counter() - started
+
+        parity = [p['points'] for p in engine_result] == [p['points'] for p in legacy_result]
+        legacy, vectorized = statistics.median(legacy_times), statistics.median(engine_times)
+        print(f"players={size:<7} legacy={legacy * 1000:8.1f}ms engine={vectorized * 1000:7.1f}ms "
+              f"(cold {cold * 1000:7.1f}ms, scoring only {scoring * 1000:6.1f}ms, "
+              f"cached {statistics.median(cached_times) * 1000:5.1f}ms) "
+              f"speedup={legacy / vectorized:5.1f}x parity={parity}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Time fetch_data.fetch_players_data against the local stub server.
+
+    python -m benchmarks.bench_fetch --latency 0.05 --workers 1 8 16 --batch-size 1 50
+
+Each run writes into a temporary directory, so data/ is never touched.
+"""
+import argparse
+import tempfile
+import time
+
+import fetch_data
+from benchmarks.stub_server import StubServer
+from benchmarks.synthetic import SyntheticLeague
+
+
+def run(league, workers, batch_size, rps, latency, error_rate):
+    with StubServer(league, latency=latency, error_rate=error_rate) as server:
+        with tempfile.TemporaryDirectory() as output_dir:
+            started = time.perf_counter()
+            ok = fetch_data.fetch_players_data(server.base_url, output_dir, max_workers=workers,
+                                               requests_per_second=rps, batch_size=batch_size, archive_dir=None)
+            elapsed = time.perf_counter() - started
+        return ok, elapsed, server.request_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--teams', type=int, default=30)
+    parser.add_argument('--players-per-team', type=int, default=26)
+    parser.add_argument('--latency', type=float, default=0.05, help="Seconds added to every stub response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of stub requests that return 503")
+    parser.add_argument('--rps', type=float, default=0, help="Requests per second limit (0 = unlimited)")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 16])
+    parser.add_argument('--batch-size', type=int, nargs='+', default=[1, fetch_data.DEFAULT_BATCH_SIZE])
+    args = parser.parse_args()
+
+    league = SyntheticLeague(teams=args.teams, players_per_team=args.players_per_team)
+    print(f"League: {len(league.people)} players, latency {args.latency * 1000:.0f}ms")
+
+    baseline = None
+    for batch_size in args.batch_size:
+        for workers in args.workers:
+            ok, elapsed, requests_made = run(league, workers, batch_size, args.rps, args.latency, args.error_rate)
+            baseline = baseline or elapsed
+            print(f"batch={batch_size:<3} workers={workers:<3} ok={ok} requests={requests_made:<5} "
+                  f"time={elapsed:.2f}s speedup={baseline / elapsed:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
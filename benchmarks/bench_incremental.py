@@ -0,0 +1,62 @@
+"""
+Compare a full refresh with an incremental one after a simulated day of games.
+
+    python -m benchmarks.bench_incremental --fraction 0.1 --trades 3
+
+The incremental output is checked against a full refresh of the same league.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import fetch_data
+from benchmarks.stub_server import StubServer
+from benchmarks.synthetic import SyntheticLeague
+
+
+def refresh(server, output_dir, cache_dir, incremental=True):
+    started = time.perf_counter()
+    before = server.request_count
+    fetch_data.fetch_players_data(server.base_url, output_dir, requests_per_second=0,
+                                  cache_dir=cache_dir, incremental=incremental, archive_dir=None)
+    with open(os.path.join(output_dir, 'last_updated.json')) as f:
+        report = json.load(f)['refresh']
+    return time.perf_counter() - started, server.request_count - before, report
+
+
+def saved_players(output_dir):
+    with open(os.path.join(output_dir, 'players.json')) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--teams', type=int, default=30)
+    parser.add_argument('--latency', type=float, default=0.02, help="Seconds added to every stub response")
+    parser.add_argument('--fraction', type=float, default=0.1, help="Fraction of players who played that day")
+    parser.add_argument('--trades', type=int, default=3, help="Players moving team that day")
+    args = parser.parse_args()
+
+    league = SyntheticLeague(teams=args.teams)
+    with StubServer(league, latency=args.latency) as server, tempfile.TemporaryDirectory() as work_dir:
+        output_dir = os.path.join(work_dir, 'data')
+        cache_dir = os.path.join(work_dir, 'cache')
+
+        elapsed, made, report = refresh(server, output_dir, cache_dir)
+        print(f"initial:     {made:4d} requests in {elapsed:.2f}s")
+
+        league.advance_day(args.fraction, args.trades)
+        elapsed, made, report = refresh(server, output_dir, cache_dir)
+        print(f"incremental: {made:4d} requests in {elapsed:.2f}s, {report['requests_skipped']} skipped, "
+              f"{report['players_hydrated']} full + {report['players_current_season']} current-season hydrates")
+
+        full_dir = os.path.join(work_dir, 'full')
+        elapsed, made, report = refresh(server, full_dir, None, incremental=False)
+        print(f"full:        {made:4d} requests in {elapsed:.2f}s")
+        print(f"incremental output matches full refresh: {saved_players(output_dir) == saved_players(full_dir)}")
+
+
+if __name__ == '__main__':
+    main()
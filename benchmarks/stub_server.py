@@ -0,0 +1,143 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import SyntheticLeague
+
+ROSTER_PATH = re.compile(r'^/api/v1/teams/(\d+)/roster/active$')
+PERSON_PATH = re.compile(r'^/api/v1/people/(\d+)$')
+SEASON_HYDRATE = re.compile(r'type=\[season\],season=(\d+)')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Keep connections alive so pooled sessions behave like they do against the real API
+    protocol_version = 'HTTP/1.1'
+    # Send headers and body in one segment, otherwise Nagle + delayed ACK adds ~40ms per request
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+            if server.failures:
+                fail = server.failures.pop(0)
+            else:
+                fail = 503 if server.rng.random() < server.error_rate else None
+
+        time.sleep(server.latency)
+
+        if fail:
+            return self.send_json({'message': 'stub failure'}, status=fail)
+
+        parsed = urlparse(self.path)
+        path = parsed.path
+        query = parse_qs(parsed.query)
+        season = SEASON_HYDRATE.search(query.get('hydrate', [''])[0])
+        season = int(season.group(1)) if season else None
+
+        if path == '/api/v1/teams':
+            return self.send_json(server.league.teams_response())
+
+        match = ROSTER_PATH.match(path)
+        if match:
+            return self.send_json(server.league.roster_response(int(match.group(1))))
+
+        match = PERSON_PATH.match(path)
+        if match:
+            with server.lock:
+                server.people_requests.append([int(match.group(1))])
+            return self.send_json(server.league.people_response([int(match.group(1))], season))
+
+        if path == '/api/v1/people':
+            person_ids = query.get('personIds', [''])[0]
+            person_ids = [int(person_id) for person_id in person_ids.split(',') if person_id]
+            with server.lock:
+                server.people_requests.append(person_ids)
+            if server.max_batch_size and len(person_ids) > server.max_batch_size:
+                return self.send_json({'message': 'Too many personIds'}, status=400)
+            if server.batch_status is not None:
+                return self.send_json({'message': 'stub batch failure'}, status=server.batch_status)
+            person_ids = [person_id for person_id in person_ids if person_id not in server.missing_from_batches]
+            return self.send_json(server.league.people_response(person_ids, season))
+
+        if path == '/api/v1/stats':
+            return self.send_json(server.league.season_stats_response(int(query['season'][0])))
+
+        self.send_json({'message': f"Unknown path {path}"}, status=404)
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        if status == 429 and self.server.retry_after is not None:
+            self.send_header('Retry-After', str(self.server.retry_after))
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep benchmark output readable
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the MLB Stats API serving a SyntheticLeague.
+
+    `latency` adds a fixed delay (in seconds) to every response and `error_rate`
+    makes that fraction of requests fail with a 503 to exercise the retries.
+    `failures` are the statuses the first requests fail with, in order, and a
+    429 carries a Retry-After of `retry_after` seconds when that is set.
+    Multi-ID people requests larger than `max_batch_size` are rejected with a 400,
+    which exercises the fallback to single-player requests. `batch_status` fails
+    every multi-ID request with that status, and players in `missing_from_batches`
+    are left out of multi-ID responses. The ids of every people request are
+    recorded in `people_requests`.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, league=None, latency=0.05, error_rate=0.0, max_batch_size=None, port=0, seed=0,
+                 batch_status=None, missing_from_batches=(), failures=(), retry_after=None):
+        super().__init__(('127.0.0.1', port), StubHandler)
+        self.league = league or SyntheticLeague()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_batch_size = max_batch_size
+        self.batch_status = batch_status
+        self.missing_from_batches = set(missing_from_batches)
+        self.failures = list(failures)
+        self.retry_after = retry_after
+        self.people_requests = []
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.request_count = 0
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
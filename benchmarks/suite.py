@@ -0,0 +1,259 @@
+"""
+Time the hot paths at several league sizes and write the results as JSON.
+
+    python -m benchmarks.suite --sizes 1300 10000 100000 --output bench.json
+    python -m benchmarks.suite --sizes 1300 10000 --compare bench.json
+
+Benchmarks:
+    fetch        fetch_players_data end to end against the local stub server
+    parse        building player objects and projections from hydrated people JSON
+    to_dict      loading every Player row through the ORM and calling to_dict()
+    players_api  GET /api/players through the Flask test client
+    calculate    POST /api/calculate, uncached (the first, cold run is reported separately)
+
+Both API benchmarks also record the peak memory Python allocates while serving one request,
+and every benchmark records its 99th percentile time (meaningful with a large --repeat).
+    write_json   streaming the data files to disk, with their raw/gzip/brotli sizes
+
+With --compare, each median is compared to the same benchmark and size in an
+earlier results file, and the exit status is 1 if any got slower than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# app reads DATABASE_URL at import time, so point it at a scratch database first
+BENCH_DIR = tempfile.mkdtemp(prefix='diamonddraft-suite-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(BENCH_DIR, 'bench.db')}"
+
+import numpy as np  # noqa: E402
+
+import fetch_data  # noqa: E402
+import projections  # noqa: E402
+from app import app, result_cache  # noqa: E402
+from benchmarks.stub_server import StubServer  # noqa: E402
+from benchmarks.synthetic import SyntheticLeague, synthetic_player_rows, synthetic_players  # noqa: E402
+from data_writer import PlayerDataWriter  # noqa: E402
+from database import db, Player, PlayerSeasonStats  # noqa: E402
+from scoring import engine  # noqa: E402
+from stat_fields import stat_sets  # noqa: E402
+
+BENCHMARKS = ('fetch', 'parse', 'to_dict', 'players_api', 'calculate', 'write_json')
+
+WEIGHTS = {'avg': 100, 'runs': 1, 'rbi': 1, 'steals': 2, 'hr': 4,
+           'wins': 5, 'era': 3, 'strikeouts': 1, 'walks': 2, 'saves': 5}
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def peak_memory(function):
+    """
+    Peak bytes allocated by Python while `function` runs, above what was allocated before.
+    """
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_fetch(size, repeat):
+    league = SyntheticLeague.for_players(size)
+    with StubServer(league, latency=0) as server, tempfile.TemporaryDirectory() as output_dir:
+        def fetch():
+            assert fetch_data.fetch_players_data(server.base_url, output_dir, requests_per_second=0, cache_dir=None,
+                                                 archive_dir=None)
+        timings = timed(fetch, repeat)
+        requests_made = server.request_count // repeat
+    return timings, {'players': len(league.people), 'requests': requests_made}
+
+
+def bench_parse(size, repeat):
+    league = SyntheticLeague.for_players(size)
+    player_infos, persons = [], []
+    for team in league.teams:
+        for entry in league.roster_response(team['id'])['roster']:
+            player_infos.append({'id': entry['person']['id'], 'full_name': entry['person']['fullName'],
+                                 'position': entry['position']['abbreviation'],
+                                 'team_id': team['id'], 'team_name': team['name']})
+            persons.append(league.people[entry['person']['id']])
+    league_rates = projections.League.from_season_stats(
+        [league.season_stats_response(league.current_year - 1 - offset) for offset in range(3)])
+
+    timings = timed(lambda: fetch_data.build_players(player_infos, persons, league.current_year, league_rates),
+                    repeat)
+    return timings, {'players': len(persons)}
+
+
+def load_players(size):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        players, seasons = synthetic_player_rows(size)
+        db.session.execute(db.insert(Player), players)
+        db.session.execute(db.insert(PlayerSeasonStats), seasons)
+        db.session.commit()
+    engine.invalidate()
+    result_cache.clear()
+
+
+def bench_to_dict(size, repeat):
+    def to_dict():
+        with app.app_context():
+            [player.to_dict() for player in Player.query.all()]
+    return timed(to_dict, repeat), {}
+
+
+def bench_players_api(size, repeat):
+    client = app.test_client()
+    response = client.get('/api/players')
+    assert response.status_code == 200, response.status_code
+    return timed(lambda: client.get('/api/players'), repeat), {
+        'bytes': len(response.data),
+        'peak_bytes': peak_memory(lambda: client.get('/api/players'))
+    }
+
+
+def bench_calculate(size, repeat):
+    client = app.test_client()
+    engine.invalidate()
+    result_cache.clear()
+    started = time.perf_counter()
+    response = client.post('/api/calculate', json=WEIGHTS)
+    cold = time.perf_counter() - started
+    assert response.status_code == 200, response.status_code
+
+    def calculate():
+        result_cache.clear()
+        client.post('/api/calculate', json=WEIGHTS)
+    return timed(calculate, repeat), {'cold': cold, 'bytes': len(response.data), 'peak_bytes': peak_memory(calculate)}
+
+
+def bench_write_json(size, repeat):
+    # A fixed season keeps the file sizes comparable between runs
+    players = synthetic_players(size, current_year=2025)
+    with tempfile.TemporaryDirectory() as output_dir:
+        def write():
+            writer = PlayerDataWriter(output_dir, stat_sets(2025))
+            for player in players:
+                writer.write(player)
+            writer.commit([('last_updated.json', {'timestamp': 'benchmark', 'total_players': size})])
+        timings = timed(write, repeat)
+
+        sizes = {}
+        for filename in ('players.json', 'batters.json', 'pitchers.json', 'players.columns.json'):
+            path = os.path.join(output_dir, filename)
+            sizes[filename] = {'raw': os.path.getsize(path)}
+            for encoding, suffix in (('gzip', '.gz'), ('br', '.br')):
+                if os.path.exists(path + suffix):
+                    sizes[filename][encoding] = os.path.getsize(path + suffix)
+    return timings, {'file_sizes': sizes}
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, benchmarks, repeat, fetch_max_size):
+    results = []
+    for size in sizes:
+        loaded = False
+        for name in benchmarks:
+            if name == 'fetch' and size > fetch_max_size:
+                print(f"size={size:<7} {name:<12} skipped (over --fetch-max-size)")
+                continue
+            if name in ('to_dict', 'players_api', 'calculate') and not loaded:
+                load_players(size)
+                loaded = True
+
+            timings, extra = globals()[f'bench_{name}'](size, repeat)
+            result = {'benchmark': name, 'size': size, 'median': statistics.median(timings),
+                      'min': min(timings), 'p99': percentile(timings, 99), 'runs': timings, **extra}
+            results.append(result)
+            print(f"size={size:<7} {name:<12} median={result['median'] * 1000:9.1f}ms "
+                  f"min={result['min'] * 1000:9.1f}ms p99={result['p99'] * 1000:9.1f}ms")
+    return results
+
+
+def compare(results, previous, threshold):
+    """
+    Print each benchmark's change against an earlier run; returns the regressions.
+    """
+    before = {(result['benchmark'], result['size']): result['median'] for result in previous['results']}
+    regressions = []
+    for result in results:
+        key = (result['benchmark'], result['size'])
+        if key not in before or not before[key]:
+            continue
+        ratio = result['median'] / before[key]
+        flag = ''
+        if ratio > threshold:
+            regressions.append(key)
+            flag = '  REGRESSION'
+        print(f"size={key[1]:<7} {key[0]:<12} {before[key] * 1000:9.1f}ms -> {result['median'] * 1000:9.1f}ms "
+              f"({ratio:5.2f}x){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1300, 10000, 100000])
+    parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--fetch-max-size', type=int, default=20000,
+                        help="Skip the end-to-end fetch above this many players")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--compare', help="Results file from an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help="Slowdown (new / old median) reported as a regression")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.benchmarks, args.repeat, args.fetch_max_size)
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+import random
+from datetime import datetime
+
+# Roster shape of a real active roster: 13 position players and 13 pitchers
+POSITIONS = ['C', '1B', '2B', '3B', 'SS', 'LF', 'CF', 'RF', 'DH', 'C', 'SS', 'OF', '1B']
+PITCHER_SLOTS = 13
+
+
+class SyntheticLeague:
+    """
+    Deterministic fake league shaped like the MLB Stats API responses used by fetch_data.py.
+    """
+
+    def __init__(self, teams=30, players_per_team=26, seasons=4, seed=42, current_year=None):
+        self.current_year = current_year or datetime.now().year
+        self.seasons = [self.current_year - offset for offset in range(seasons)][::-1]
+        rng = random.Random(seed)
+
+        self.teams = [{'id': 100 + idx, 'name': f"Team {idx + 1}"} for idx in range(teams)]
+        self.rosters = {}
+        self.people = {}
+
+        next_id = 600000
+        for team in self.teams:
+            roster = []
+            for slot in range(players_per_team):
+                next_id += 1
+                if slot < players_per_team - PITCHER_SLOTS:
+                    position = POSITIONS[slot % len(POSITIONS)]
+                else:
+                    position = 'P'
+
+                roster.append({
+                    'person': {'id': next_id, 'fullName': f"Player {next_id}"},
+                    'position': {'abbreviation': position}
+                })
+                self.people[next_id] = self._person(rng, next_id, position == 'P')
+
+            self.rosters[team['id']] = roster
+
+    @classmethod
+    def for_players(cls, count, seed=42):
+        """
+        A league of at least `count` players, in full 26-man rosters.
+        """
+        return cls(teams=max(1, -(-count // 26)), players_per_team=26, seed=seed)
+
+    def _person(self, rng, player_id, is_pitcher):
+        splits = []
+        for season in self.seasons:
+            if is_pitcher:
+                splits.append({'season': str(season), 'stat': self._pitching(rng)})
+            else:
+                splits.append({'season': str(season), 'stat': self._hitting(rng)})
+
+        age = rng.randint(21, 38)
+        return {
+            'id': player_id,
+            'fullName': f"Player {player_id}",
+            'currentAge': age,
+            'birthDate': f"{self.current_year - age}-{player_id % 12 + 1:02d}-{player_id % 28 + 1:02d}",
+            'stats': [{
+                'type': {'displayName': 'yearByYear'},
+                'group': {'displayName': 'pitching' if is_pitcher else 'hitting'},
+                'splits': splits
+            }]
+        }
+
+    @staticmethod
+    def _hitting(rng):
+        at_bats = rng.randint(50, 620)
+        hits = int(at_bats * rng.uniform(0.19, 0.32))
+        return {
+            'gamesPlayed': rng.randint(20, 162),
+            'plateAppearances': int(at_bats * 1.12),
+            'atBats': at_bats,
+            'hits': hits,
+            'avg': f"{hits / at_bats:.3f}",
+            'runs': int(hits * rng.uniform(0.4, 0.7)),
+            'rbi': int(hits * rng.uniform(0.35, 0.75)),
+            'stolenBases': rng.randint(0, 40),
+            'homeRuns': int(hits * rng.uniform(0.0, 0.25)),
+            'strikeOuts': int(at_bats * rng.uniform(0.12, 0.32)),
+            'baseOnBalls': int(at_bats * rng.uniform(0.04, 0.14))
+        }
+
+    @staticmethod
+    def _pitching(rng):
+        innings = rng.randint(10, 200)
+        earned_runs = int(innings * rng.uniform(0.25, 0.65))
+        return {
+            'gamesPlayed': rng.randint(10, 70),
+            'gamesStarted': rng.randint(0, 32),
+            'inningsPitched': f"{innings}.0",
+            'wins': rng.randint(0, 18),
+            'era': f"{earned_runs * 9 / innings:.2f}",
+            'earnedRuns': earned_runs,
+            'runs': int(earned_runs * 1.08),
+            'strikeOuts': int(innings * rng.uniform(0.6, 1.3)),
+            'baseOnBalls': int(innings * rng.uniform(0.2, 0.5)),
+            'homeRuns': int(innings * rng.uniform(0.05, 0.17)),
+            'saves': rng.randint(0, 40) if innings < 80 else 0
+        }
+
+    def advance_day(self, fraction=0.1, trades=2, seed=0):
+        """
+        Simulate a day of games: a `fraction` of players add to their current season
+        and `trades` players move to another team.
+        """
+        rng = random.Random(seed)
+        player_ids = sorted(self.people)
+
+        for player_id in rng.sample(player_ids, int(len(player_ids) * fraction)):
+            for stat_group in self.people[player_id]['stats']:
+                split = stat_group['splits'][-1]
+                if split['season'] == str(self.current_year):
+                    split['stat'] = dict(split['stat'], gamesPlayed=split['stat']['gamesPlayed'] + 1)
+
+        for _ in range(trades):
+            from_team, to_team = rng.sample(self.teams, 2)
+            roster = self.rosters[from_team['id']]
+            if roster:
+                self.rosters[to_team['id']].append(roster.pop(rng.randrange(len(roster))))
+
+    def teams_response(self):
+        return {'teams': self.teams}
+
+    def roster_response(self, team_id):
+        return {'roster': self.rosters.get(team_id, [])}
+
+    def people_response(self, player_ids, season=None):
+        people = [self.people[pid] for pid in player_ids if pid in self.people]
+        if season is not None:
+            # hydrate=stats(type=[season],season=N) only returns that season's splits
+            people = [dict(person, stats=[
+                dict(stat_group, type={'displayName': 'season'},
+                     splits=[split for split in stat_group['splits'] if split['season'] == str(season)])
+                for stat_group in person['stats']
+            ]) for person in people]
+        return {'people': people}
+
+    def season_stats_response(self, season):
+        groups = {}
+        for player_id, person in self.people.items():
+            for stat_group in person['stats']:
+                for split in stat_group['splits']:
+                    if split['season'] == str(season):
+                        group = stat_group['group']['displayName']
+                        groups.setdefault(group, []).append({'player': {'id': player_id}, 'stat': split['stat']})
+        return {'stats': [{'group': {'displayName': group}, 'splits': splits} for group, splits in groups.items()]}
+
+
+def synthetic_players(count, seed=42, current_year=None):
+    """
+    Player dicts shaped like the entries of data/players.json, roughly half
+    batters and half pitchers, with the stat sets a fetch in `current_year` writes.
+    """
+    from stat_fields import STAT_NAMES, stat_sets
+
+    rng = random.Random(seed)
+    players = []
+    for idx in range(count):
+        is_pitcher = idx % 2 == 1
+        player = {
+            'id': idx + 1,
+            'name': f"Player {idx + 1}",
+            'team': f"Team {idx % 30 + 1}",
+            'position': 'P' if is_pitcher else POSITIONS[idx % len(POSITIONS)],
+            'is_pitcher': is_pitcher,
+        }
+        for suffix in stat_sets(current_year or datetime.now().year):
+            stats = dict.fromkeys(STAT_NAMES, 0)
+            if is_pitcher:
+                stats.update({
+                    'wins': rng.randint(0, 18),
+                    'era': round(rng.uniform(1.5, 7.5), 2),
+                    'strikeouts': rng.randint(5, 250),
+                    'walks': rng.randint(2, 90),
+                    'saves': rng.randint(0, 40),
+                    'runs_scored': rng.randint(5, 110),
+                    'fip': round(rng.uniform(2.0, 6.5), 2),
+                })
+            else:
+                stats.update({
+                    'avg': round(rng.uniform(0.18, 0.33), 3),
+                    'runs': rng.randint(0, 120),
+                    'rbi': rng.randint(0, 130),
+                    'steals': rng.randint(0, 45),
+                    'hr': rng.randint(0, 50),
+                    'hits': rng.randint(10, 200),
+                    'babip': round(rng.uniform(0.22, 0.38), 3),
+                })
+            player[f'stats_{suffix}'] = stats
+        players.append(player)
+    return players
+
+
+def synthetic_player_rows(count, seed=42, current_year=None):
+    """
+    (Player rows, PlayerSeasonStats rows) for the players synthetic_players() makes.
+    """
+    from load_data import player_row, season_rows
+
+    players = synthetic_players(count, seed, current_year)
+    return [player_row(player) for player in players], [row for player in players for row in season_rows(player)]
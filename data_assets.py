@@ -0,0 +1,212 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_VERSION = 1
+
+# Precompressed siblings, in order of preference: (Content-Encoding, file suffix)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Hashed files never change, so browsers and CDNs may keep them for a year
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# players.3fa2c1d04b9e.json and its .gz/.br siblings
+HASHED_NAME = re.compile(r'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{12})(?P<ext>\.[a-z]+)(?P<encoding>\.gz|\.br)?$')
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hashed_name(filename, digest):
+    """
+    players.json -> players.<first 12 hex digits of its sha256>.json
+    """
+    stem, ext = os.path.splitext(filename)
+    return f'{stem}.{digest[:12]}{ext}'
+
+
+def is_hashed(filename):
+    return HASHED_NAME.match(os.path.basename(filename)) is not None
+
+
+def available_encodings():
+    return [(encoding, suffix) for encoding, suffix in ENCODINGS if encoding != 'br' or brotli is not None]
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    # mtime=0 keeps the output byte-identical for identical input
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _write_temp(directory, filename, data):
+    fd, path = tempfile.mkstemp(prefix=f'.{filename}.', suffix='.tmp', dir=directory)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.chmod(path, 0o644)
+    return path
+
+
+def prepare_assets(directory, sources):
+    """
+    Build the compressed siblings, hashed copies and manifest for data files.
+
+    `sources` is a list of (filename, path) pairs, where path holds the file's
+    finished contents (a temp file about to be renamed, or the file itself).
+    Everything is written to temp files; returns (hashed, siblings, manifest):
+    the (temp path, filename) renames for the hashed files, a dict of the
+    renames for each source's .gz/.br siblings, and the manifest's rename.
+    """
+    encodings = available_encodings()
+    hashed, siblings = [], {}
+    files = {}
+    try:
+        for filename, path in sources:
+            with open(path, 'rb') as f:
+                data = f.read()
+            digest = content_hash(data)
+            name = hashed_name(filename, digest)
+
+            siblings[filename] = []
+            hashed.append((_write_temp(directory, name, data), name))
+            for encoding, suffix in encodings:
+                compressed = compress(data, encoding)
+                hashed.append((_write_temp(directory, name + suffix, compressed), name + suffix))
+                siblings[filename].append((_write_temp(directory, filename + suffix, compressed), filename + suffix))
+
+            files[filename] = {
+                'path': name,
+                'sha256': digest,
+                'size': len(data),
+                'encodings': [encoding for encoding, _ in encodings]
+            }
+
+        manifest = json.dumps({'version': MANIFEST_VERSION, 'files': files}, indent=2, sort_keys=True).encode()
+        manifest = (_write_temp(directory, MANIFEST_FILE, manifest), MANIFEST_FILE)
+    except BaseException:
+        for path, _ in hashed + [rename for renames in siblings.values() for rename in renames]:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+    return hashed, siblings, manifest
+
+
+def load_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def referenced_files(manifest):
+    names = set()
+    for entry in manifest.get('files', {}).values():
+        names.add(entry['path'])
+        names.update(entry['path'] + suffix for _, suffix in ENCODINGS)
+    return names
+
+
+def prune_hashed_files(directory, keep):
+    """
+    Remove hashed files that no manifest in `keep` refers to.
+
+    The previous manifest's files are normally kept too, so a page that loaded
+    the old manifest just before a refresh can still fetch what it points to.
+    """
+    referenced = set()
+    for manifest in keep:
+        referenced |= referenced_files(manifest)
+    for filename in os.listdir(directory):
+        if is_hashed(filename) and filename not in referenced:
+            os.remove(os.path.join(directory, filename))
+
+
+def publish(directory, filenames):
+    """
+    Build the assets for data files that are already in place, e.g. after
+    copying data files around by hand.
+    """
+    previous = load_manifest(directory)
+    hashed, siblings, manifest = prepare_assets(
+        directory, [(filename, os.path.join(directory, filename)) for filename in filenames])
+    for path, filename in hashed + [rename for renames in siblings.values() for rename in renames] + [manifest]:
+        os.replace(path, os.path.join(directory, filename))
+    prune_hashed_files(directory, [previous, load_manifest(directory)])
+
+
+def sibling_encoding(filename):
+    """
+    The Content-Encoding of a precompressed sibling such as players.json.gz, or None.
+    """
+    for encoding, suffix in ENCODINGS:
+        if filename.endswith(suffix):
+            return encoding
+    return None
+
+
+def ensure_sibling(directory, filename, encoding, suffix):
+    """
+    Make sure `filename` has an up-to-date `suffix` sibling, compressing it now
+    if it is missing or older than the file (the siblings aren't committed, so a
+    checkout or a pull leaves them missing or stale). Returns whether it exists.
+    """
+    path = os.path.join(directory, filename)
+    sibling = path + suffix
+    try:
+        if os.path.isfile(sibling) and os.path.getmtime(sibling) >= os.path.getmtime(path):
+            return True
+        if encoding == 'br' and brotli is None:
+            return False
+        with open(path, 'rb') as f:
+            data = compress(f.read(), encoding)
+        os.replace(_write_temp(directory, filename + suffix, data), sibling)
+        return True
+    except OSError:
+        # Missing file, or a read-only directory: serve the file as it is
+        return False
+
+
+def negotiate(directory, filename, accept_encodings):
+    """
+    Pick the precompressed sibling of `filename` the client accepts, preferring brotli.
+
+    `accept_encodings` is the request's parsed Accept-Encoding header. Returns
+    (filename to send, Content-Encoding), with None for the uncompressed file.
+    A sibling asked for by name is sent as it is, with its encoding.
+    """
+    encoding = sibling_encoding(filename)
+    if encoding:
+        return filename, encoding
+    path = os.path.realpath(os.path.join(directory, filename))
+    if not path.startswith(os.path.join(os.path.realpath(directory), '')) or not os.path.isfile(path):
+        # Left for send_from_directory to turn down
+        return filename, None
+    for encoding, suffix in ENCODINGS:
+        if accept_encodings[encoding] and ensure_sibling(directory, filename, encoding, suffix):
+            return filename + suffix, encoding
+    return filename, None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write compressed and content-hashed copies of data files.")
+    parser.add_argument('directory', nargs='?', default='data')
+    parser.add_argument('files', nargs='*', default=['players.json', 'batters.json', 'pitchers.json',
+                                                      'players.columns.json', 'last_updated.json'])
+    args = parser.parse_args()
+    publish(args.directory, [filename for filename in args.files
+                             if os.path.exists(os.path.join(args.directory, filename))])
+    print(f"Wrote {MANIFEST_FILE} for {len(load_manifest(args.directory).get('files', {}))} files in {args.directory}")
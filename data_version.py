@@ -0,0 +1,41 @@
+import threading
+import uuid
+
+# Incremented every time the player data changes (refresh, DB load)
+_version = 0
+# Distinguishes this process's versions from those of an earlier run, whose data may differ
+_boot = uuid.uuid4().hex[:8]
+_listeners = []
+_lock = threading.Lock()
+
+
+def current():
+    return _version
+
+
+def tag():
+    """
+    Version string that is unique across restarts, for use in ETags.
+    """
+    return f'{_boot}.{_version}'
+
+
+def subscribe(callback):
+    """
+    Register a callback to run after the data changes, e.g. to drop a cache.
+    """
+    _listeners.append(callback)
+    return callback
+
+
+def bump():
+    """
+    Mark the player data as changed and notify every subscriber.
+    """
+    global _version
+    with _lock:
+        _version += 1
+        version = _version
+    for callback in _listeners:
+        callback()
+    return version
@@ -0,0 +1,165 @@
+import json
+import os
+import shutil
+import tempfile
+
+import data_assets
+from stat_fields import BATTING_STATS, FLOAT_STATS, PITCHING_STATS, STAT_NAMES
+
+# Player fields stored alongside the stats in the columnar file
+PLAYER_FIELDS = ('id', 'name', 'team', 'position', 'is_pitcher')
+COLUMNS_FILE = 'players.columns.json'
+COLUMNS_FORMAT_VERSION = 1
+
+
+def compact_player(player):
+    """
+    Drop the stat group that doesn't apply to a player when it is all zeros:
+    pitching stats for batters, batting stats for pitchers. Two-way players keep both.
+    """
+    unused = BATTING_STATS if player['is_pitcher'] else PITCHING_STATS
+    compacted = dict(player)
+    for key, stats in player.items():
+        if key.startswith('stats_') and stats and not any(stats.get(stat) for stat in unused):
+            compacted[key] = {stat: value for stat, value in stats.items() if stat not in unused}
+    return compacted
+
+
+class PlayerDataWriter:
+    """
+    Streams player records into the data/*.json files as they are produced.
+
+    Each record is encoded once, into batters.json or pitchers.json. players.json
+    is then assembled by copying those two files' bytes, and players.columns.json
+    holds the same data as one array per field. Nothing is visible until commit()
+    renames every temp file into place.
+
+    `stat_sets` names the stats_<set> blocks of each record that go into the
+    columnar file, such as stat_fields.stat_sets(current_year).
+
+    The JSON files hold nothing back, but the columnar file can only be written
+    once every record is in, so `columns` keeps each field's values for the
+    whole league until commit(). That is a few values per stat rather than the
+    records themselves: about 50 per player.
+    """
+
+    def __init__(self, directory, stat_sets):
+        self.directory = directory
+        self.stat_sets = tuple(stat_sets)
+        self.counts = {'batters': 0, 'pitchers': 0}
+        self.columns = {group: {field: [] for field in self.column_names()} for group in self.counts}
+        self.temp_paths = {}
+        self.files = {}
+        for group in self.counts:
+            self.files[group] = self._open_temp(f'{group}.json')
+            self.files[group].write('[')
+
+    def _open_temp(self, filename):
+        fd, path = tempfile.mkstemp(prefix=f'.{filename}.', suffix='.tmp', dir=self.directory)
+        self.temp_paths[filename] = path
+        return os.fdopen(fd, 'w+')
+
+    def column_names(self):
+        return list(PLAYER_FIELDS) + [f'stats_{suffix}.{stat}' for suffix in self.stat_sets for stat in STAT_NAMES]
+
+    def write(self, player):
+        group = 'pitchers' if player['is_pitcher'] else 'batters'
+        f = self.files[group]
+        if self.counts[group]:
+            f.write(',')
+        f.write(json.dumps(compact_player(player), separators=(',', ':')))
+        self.counts[group] += 1
+
+        columns = self.columns[group]
+        for field in PLAYER_FIELDS:
+            columns[field].append(player[field])
+        for suffix in self.stat_sets:
+            stats = player.get(f'stats_{suffix}') or {}
+            for stat in STAT_NAMES:
+                # Stats dropped by compact_player come back as the zero the fetch wrote,
+                # so the file is byte-identical whether or not a record was reloaded
+                columns[f'stats_{suffix}.{stat}'].append(stats.get(stat, 0.0 if stat in FLOAT_STATS else 0))
+
+    def _write_combined(self):
+        # '[' + batters + ',' + pitchers + ']' built from the bytes already written
+        with self._open_temp('players.json') as out:
+            out.write('[')
+            first = True
+            for group in ('batters', 'pitchers'):
+                if not self.counts[group]:
+                    continue
+                if not first:
+                    out.write(',')
+                f = self.files[group]
+                f.seek(1)
+                shutil.copyfileobj(f, out)
+                first = False
+            out.write(']')
+
+    def _write_columns(self):
+        # Written one column at a time, so the batters' and pitchers' values are
+        # never all copied into combined lists at once
+        header = json.dumps({
+            'version': COLUMNS_FORMAT_VERSION,
+            'count': self.counts['batters'] + self.counts['pitchers'],
+            'fields': list(PLAYER_FIELDS),
+            'stat_sets': list(self.stat_sets),
+            'stats': list(STAT_NAMES)
+        }, separators=(',', ':'))
+        with self._open_temp(COLUMNS_FILE) as out:
+            out.write(header[:-1] + ',"columns":{')
+            for index, name in enumerate(self.column_names()):
+                values = self.columns['batters'].pop(name) + self.columns['pitchers'].pop(name)
+                out.write((',' if index else '') + json.dumps(name) + ':' + json.dumps(values, separators=(',', ':')))
+            out.write('}}')
+
+    def commit(self, extra_files=()):
+        """
+        Finish every file and rename them into place; `extra_files` are (filename, data)
+        pairs written last, such as last_updated.json. Returns the counts per group.
+
+        Each file also gets gzip/brotli siblings and a content-hashed copy listed in
+        manifest.json (see data_assets). The hashed copies go in first, then each
+        file with its siblings, then the manifest, then the extra files.
+        """
+        try:
+            for f in self.files.values():
+                f.flush()
+            self._write_combined()
+            self._write_columns()
+            for group, f in self.files.items():
+                f.seek(0, os.SEEK_END)
+                f.write(']')
+                f.close()
+            for filename, data in extra_files:
+                with self._open_temp(filename) as out:
+                    json.dump(data, out)
+            data_files = [COLUMNS_FILE, 'players.json', 'batters.json', 'pitchers.json']
+            extra_names = [filename for filename, _ in extra_files]
+            previous_manifest = data_assets.load_manifest(self.directory)
+            hashed, siblings, manifest = data_assets.prepare_assets(
+                self.directory, [(filename, self.temp_paths[filename]) for filename in data_files + extra_names])
+        except BaseException:
+            self.abort()
+            raise
+
+        renames = list(hashed)
+        for filename in data_files:
+            renames += siblings[filename] + [(self.temp_paths.pop(filename), filename)]
+        renames.append(manifest)
+        for filename in extra_names:
+            renames += siblings[filename] + [(self.temp_paths.pop(filename), filename)]
+
+        for path, filename in renames:
+            os.chmod(path, 0o644)
+            os.replace(path, os.path.join(self.directory, filename))
+        data_assets.prune_hashed_files(self.directory, [previous_manifest, data_assets.load_manifest(self.directory)])
+        return dict(self.counts)
+
+    def abort(self):
+        for f in self.files.values():
+            f.close()
+        for path in self.temp_paths.values():
+            if os.path.exists(path):
+                os.remove(path)
+        self.temp_paths = {}
@@ -1,76 +1,136 @@
+from collections import namedtuple
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+# Stats are stored one row per player, season and kind (actual or projected)
+from stat_fields import BATTING_STATS, FLOAT_STATS, PITCHING_STATS, STAT_KINDS, STAT_NAMES, stat_set_name
 
 db = SQLAlchemy()
 
 class Player(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    team = db.Column(db.String(50))
-    position = db.Column(db.String(20))
-    
-    # Batting stats - 2024 actual
-    avg_2024 = db.Column(db.Float, default=0.0)
-    runs_2024 = db.Column(db.Integer, default=0)
-    rbi_2024 = db.Column(db.Integer, default=0)
-    steals_2024 = db.Column(db.Integer, default=0)
-    hr_2024 = db.Column(db.Integer, default=0)
-    
-    # Batting stats - 2025 projected
-    avg_2025 = db.Column(db.Float, default=0.0)
-    runs_2025 = db.Column(db.Integer, default=0)
-    rbi_2025 = db.Column(db.Integer, default=0)
-    steals_2025 = db.Column(db.Integer, default=0)
-    hr_2025 = db.Column(db.Integer, default=0)
-    
-    # Pitching stats - 2024 actual
-    wins_2024 = db.Column(db.Integer, default=0)
-    era_2024 = db.Column(db.Float, default=0.0)
-    strikeouts_2024 = db.Column(db.Integer, default=0)
-    walks_2024 = db.Column(db.Integer, default=0)
-    saves_2024 = db.Column(db.Integer, default=0)
-    
-    # Pitching stats - 2025 projected
-    wins_2025 = db.Column(db.Integer, default=0)
-    era_2025 = db.Column(db.Float, default=0.0)
-    strikeouts_2025 = db.Column(db.Integer, default=0)
-    walks_2025 = db.Column(db.Integer, default=0)
-    saves_2025 = db.Column(db.Integer, default=0)
+    team = db.Column(db.String(50), index=True)
+    position = db.Column(db.String(20), index=True)
     
     # Flag to indicate if player is primarily a batter or pitcher
-    is_pitcher = db.Column(db.Boolean, default=False)
+    is_pitcher = db.Column(db.Boolean, default=False, index=True)
+    
+    season_stats = db.relationship('PlayerSeasonStats', backref='player', lazy='selectin',
+                                   order_by='(PlayerSeasonStats.season, PlayerSeasonStats.kind)')
     
     def __repr__(self):
         return f'<Player {self.name}>'
         
     def to_dict(self):
-        return {
+        player = {
             'id': self.id,
             'name': self.name,
             'team': self.team,
             'position': self.position,
-            'is_pitcher': self.is_pitcher,
-            'stats_2024': {
-                'avg': self.avg_2024,
-                'runs': self.runs_2024,
-                'rbi': self.rbi_2024,
-                'steals': self.steals_2024,
-                'hr': self.hr_2024,
-                'wins': self.wins_2024,
-                'era': self.era_2024,
-                'strikeouts': self.strikeouts_2024,
-                'walks': self.walks_2024,
-                'saves': self.saves_2024
-            },
-            'stats_2025': {
-                'avg': self.avg_2025,
-                'runs': self.runs_2025,
-                'rbi': self.rbi_2025,
-                'steals': self.steals_2025,
-                'hr': self.hr_2025,
-                'wins': self.wins_2025,
-                'era': self.era_2025,
-                'strikeouts': self.strikeouts_2025,
-                'walks': self.walks_2025,
-                'saves': self.saves_2025
-            }
-        }
\ No newline at end of file
+            'is_pitcher': self.is_pitcher
+        }
+        for stats in self.season_stats:
+            player[f'stats_{stats.stat_set}'] = {stat: getattr(stats, stat) for stat in STAT_NAMES}
+        return player
+
+class PlayerSeasonStats(db.Model):
+    """
+    One player's stats for one season, as played ('actual') or as projected.
+
+    Seasons are rows rather than columns, so loading another season (or decades
+    of them) needs no schema change.
+    """
+    __tablename__ = 'player_season_stats'
+    __table_args__ = (
+        # Every player's stats for a season, the lookup behind scoring and sorting
+        db.Index('ix_player_season_stats_season_kind', 'season', 'kind', 'player_id'),
+        # Each player's run of seasons in player order, so multi-season totals group without sorting
+        db.Index('ix_player_season_stats_kind_player', 'kind', 'player_id', 'season'),
+    )
+    
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), primary_key=True)
+    season = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True)
+    
+    # Batting stats
+    avg = db.Column(db.Float, default=0.0)
+    runs = db.Column(db.Integer, default=0)
+    rbi = db.Column(db.Integer, default=0)
+    steals = db.Column(db.Integer, default=0)
+    hr = db.Column(db.Integer, default=0)
+    hits = db.Column(db.Integer, default=0)
+    babip = db.Column(db.Float, default=0.0)
+    
+    # Pitching stats
+    wins = db.Column(db.Integer, default=0)
+    era = db.Column(db.Float, default=0.0)
+    strikeouts = db.Column(db.Integer, default=0)
+    walks = db.Column(db.Integer, default=0)
+    saves = db.Column(db.Integer, default=0)
+    runs_scored = db.Column(db.Integer, default=0)
+    fip = db.Column(db.Float, default=0.0)
+    
+    @property
+    def stat_set(self):
+        return stat_set_name(self.season, self.kind)
+
+class DataVersion(db.Model):
+    """
+    The version of the player data in the tables, a single row. Every load writes
+    a new one, so each process serving the database can tell when another
+    process (a CLI load, another worker's refresh) replaced the data.
+    """
+    __tablename__ = 'data_version'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.String(32), nullable=False)
+    loaded_at = db.Column(db.DateTime)
+
+def stored_data_version():
+    """
+    The version of the last load, or None when the database has none stored
+    (empty, or loaded before versions were stored).
+    """
+    try:
+        return db.session.execute(db.select(DataVersion.version).where(DataVersion.id == 1)).scalar()
+    except (OperationalError, ProgrammingError):
+        # No data_version table yet
+        db.session.rollback()
+        return None
+
+class StatSelection(namedtuple('StatSelection', ('first', 'last', 'kind'))):
+    """
+    Seasons `first` to `last` (inclusive) of one kind of stats.
+    """
+    __slots__ = ()
+    
+    @property
+    def name(self):
+        seasons = str(self.first) if self.first == self.last else f'{self.first}-{self.last}'
+        return stat_set_name(seasons, self.kind)
+
+def season_stats_query(selection):
+    """
+    SELECT player_id and every stat for a StatSelection. A single season is read
+    as stored. Over several seasons each player gets one row: counting stats are
+    summed and rate stats averaged over the seasons where they aren't zero (the
+    table holds no at-bats or innings to weight them by).
+    """
+    table = PlayerSeasonStats
+    query = db.select(table.player_id).where(table.kind == selection.kind)
+    if selection.first == selection.last:
+        return query.add_columns(*[getattr(table, stat) for stat in STAT_NAMES]) \
+            .where(table.season == selection.first)
+    
+    columns = []
+    for stat in STAT_NAMES:
+        column = getattr(table, stat)
+        if stat in FLOAT_STATS:
+            columns.append(db.func.coalesce(db.func.avg(db.func.nullif(column, 0)), 0).label(stat))
+        else:
+            columns.append(db.func.sum(column).label(stat))
+    return query.add_columns(*columns) \
+        .where(table.season.between(selection.first, selection.last)) \
+        .group_by(table.player_id)
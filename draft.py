@@ -0,0 +1,259 @@
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Starting lineup used when a request doesn't give its own
+DEFAULT_SLOTS = {'C': 1, '1B': 1, '2B': 1, '3B': 1, 'SS': 1, 'OF': 3, 'UTIL': 1, 'P': 9}
+DEFAULT_BENCH = 4
+
+# Roster slots a player can fill, by their position; every batter can also play UTIL.
+# Two-way players are scored as batters, so they go in UTIL like a DH.
+POSITION_SLOTS = {
+    'C': ('C',), '1B': ('1B',), '2B': ('2B',), '3B': ('3B',), 'SS': ('SS',),
+    'LF': ('OF',), 'CF': ('OF',), 'RF': ('OF',), 'OF': ('OF',), 'DH': (), 'TWP': ()
+}
+SLOT_NAMES = ('C', '1B', '2B', '3B', 'SS', 'OF', 'UTIL', 'P')
+
+# Opponent models: 'adp' drafts from a consensus board whose ranks are jittered by
+# `noise` picks (standard deviation); 'points' drafts by value, scaled by 1 + N(0, noise)
+OPPONENTS = {'adp': 6.0, 'points': 0.15}
+
+# Simulations per seeded chunk; results don't depend on how chunks are spread over workers
+CHUNK_SIZE = 250
+
+MAX_SIMULATIONS = 20000
+MAX_TEAMS = 30
+# Starting slots plus bench
+MAX_ROUNDS = 40
+# Picks simulated per request (simulations x teams x rounds): 20,000 drafts of the default league
+MAX_SIMULATED_PICKS = MAX_SIMULATIONS * 12 * 25
+
+
+def eligible_slots(position, is_pitcher, slots):
+    """
+    The slots in `slots` a player can fill, specific positions before UTIL.
+    """
+    if is_pitcher:
+        names = ('P',)
+    else:
+        names = POSITION_SLOTS.get(position, ()) + ('UTIL',)
+    return tuple(name for name in names if slots.get(name))
+
+
+def replacement_levels(points, eligible, teams, slots):
+    """
+    Fill every team's starting slots with the best players available, then
+    return the points of the best player left over for each slot, which is
+    what a team could pick up for free. `eligible` is per player, in the
+    order of `points`.
+    """
+    capacity = {name: count * teams for name, count in slots.items()}
+    replacement = {}
+    for row in np.argsort(-points, kind='stable').tolist():
+        for name in eligible[row]:
+            if capacity[name] > 0:
+                capacity[name] -= 1
+                break
+        else:
+            # Undrafted: the first one seen for their main slot sets its replacement level
+            if eligible[row]:
+                replacement.setdefault(eligible[row][0], float(points[row]))
+    return {name: replacement.get(name, 0.0) for name in slots}
+
+
+def snake_order(teams, rounds):
+    order = []
+    for round_number in range(rounds):
+        picks = range(teams) if round_number % 2 == 0 else range(teams - 1, -1, -1)
+        order.extend(picks)
+    return order
+
+
+def simulate_chunk(seed, simulations, board_values, our_values, eligible, slot_counts, bench,
+                   teams, our_team, opponents, noise, our_picks):
+    """
+    Run `simulations` drafts and count, for every candidate, how often they were
+    still on the board at each of our picks and how often we drafted them.
+
+    `board_values` is what opponents rank candidates by (a consensus rank for
+    'adp', value for 'points') and `our_values` the value we pick by. `eligible`
+    holds each candidate's slot indexes into `slot_counts`. Every team takes the
+    best player on its board that fills an open starting slot, or the best player
+    overall while it has bench spots left.
+    """
+    rng = np.random.default_rng(seed)
+    count = len(eligible)
+    order = snake_order(teams, sum(slot_counts) + bench)
+    our_board = np.argsort(-our_values, kind='stable').tolist()
+
+    pick_of = np.empty((simulations, count), dtype=np.int64)
+    drafted = np.zeros(count, dtype=np.int64)
+
+    for simulation in range(simulations):
+        jitter = rng.standard_normal(count) * noise
+        if opponents == 'adp':
+            board = np.argsort(board_values + jitter, kind='stable').tolist()
+        else:
+            board = np.argsort(-(board_values * (1 + jitter)), kind='stable').tolist()
+
+        taken = [False] * count
+        picked_at = [len(order)] * count
+        open_slots = [list(slot_counts) for _ in range(teams)]
+        bench_left = [bench] * teams
+        heads = [0, 0]  # First possibly untaken position on the opponents' board and on ours
+
+        for pick, team in enumerate(order):
+            ours = team == our_team
+            candidates = our_board if ours else board
+            head = heads[ours]
+            while head < count and taken[candidates[head]]:
+                head += 1
+            heads[ours] = head
+            if head == count:
+                break  # Every candidate is gone
+
+            slots_open = open_slots[team]
+            has_bench = bench_left[team] > 0
+            choice, slot = candidates[head], None
+            for position in range(head, count):
+                player = candidates[position]
+                if taken[player]:
+                    continue
+                for index in eligible[player]:
+                    if slots_open[index]:
+                        slot = index
+                        break
+                if slot is not None or has_bench:
+                    choice = player
+                    break
+
+            taken[choice] = True
+            picked_at[choice] = pick
+            if slot is not None:
+                slots_open[slot] -= 1
+            elif bench_left[team]:
+                bench_left[team] -= 1
+            if ours:
+                drafted[choice] += 1
+
+        pick_of[simulation] = picked_at
+
+    available = np.stack([(pick_of >= pick).sum(axis=0) for pick in our_picks]) if our_picks else \
+        np.zeros((0, count), dtype=np.int64)
+    return available, drafted
+
+
+class DraftSimulator:
+    """
+    Runs simulated snake drafts in chunks on a process pool shared between requests.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pool = None
+        self.workers = None
+
+    def get_pool(self, workers):
+        with self.lock:
+            if self.pool is None or self.workers != workers:
+                if self.pool is not None:
+                    self.pool.shutdown(wait=False)
+                self.pool = ProcessPoolExecutor(max_workers=workers)
+                self.workers = workers
+                atexit.register(self.pool.shutdown, wait=False)
+            return self.pool
+
+    def run(self, points, players, teams=12, slots=None, bench=DEFAULT_BENCH, draft_position=1,
+            simulations=1000, opponents='adp', noise=None, seed=0, workers=None, limit=None):
+        """
+        Simulate `simulations` snake drafts and return the players worth drafting.
+
+        `points` are every player's points (as from the scoring engine) and
+        `players` their dicts, in the same order. Each returned player has
+        `vor`, their points over the replacement level of their slot,
+        `availability`, the share of drafts in which they were still
+        there at each of our picks, and `drafted`, how often we took them.
+        The same seed always gives the same result, whatever the worker count.
+        """
+        slots = {name: int(count) for name, count in (DEFAULT_SLOTS if slots is None else slots).items()}
+        unknown = [name for name in slots if name not in SLOT_NAMES]
+        if unknown:
+            raise ValueError(f"Unknown roster slots: {', '.join(unknown)}; use {', '.join(SLOT_NAMES)}")
+        if opponents not in OPPONENTS:
+            raise ValueError(f"opponents must be one of: {', '.join(OPPONENTS)}")
+        if not 2 <= teams <= MAX_TEAMS or not 1 <= draft_position <= teams:
+            raise ValueError(f"teams must be between 2 and {MAX_TEAMS}, and draft_position between 1 and teams")
+        if not 1 <= simulations <= MAX_SIMULATIONS:
+            raise ValueError(f"simulations must be between 1 and {MAX_SIMULATIONS}")
+        rounds = sum(slots.values()) + bench
+        if any(count < 0 for count in slots.values()) or bench < 0 or not 1 <= rounds <= MAX_ROUNDS:
+            raise ValueError(f"Roster slots and bench must be non-negative and add up to between 1 and {MAX_ROUNDS}")
+        if simulations * teams * rounds > MAX_SIMULATED_PICKS:
+            raise ValueError(f"simulations x teams x rounds must be at most {MAX_SIMULATED_PICKS}")
+        if limit is not None and limit < 0:
+            raise ValueError("limit must not be negative")
+        noise = OPPONENTS[opponents] if noise is None else float(noise)
+
+        points = np.asarray(points, dtype=np.float64)
+        eligible = [eligible_slots(player['position'], player['is_pitcher'], slots) for player in players]
+        replacement = replacement_levels(points, eligible, teams, slots)
+        # Players who can't start anywhere are only worth a bench spot
+        bench_level = max(replacement.values(), default=0.0)
+        vor = np.array([value - (replacement[player_slots[0]] if player_slots else bench_level)
+                        for value, player_slots in zip(points.tolist(), eligible)])
+
+        # Only players someone could plausibly draft are simulated
+        pool_size = min(len(players), teams * rounds + max(50, teams * rounds // 2))
+        candidates = np.argsort(-vor, kind='stable')[:pool_size]
+        candidate_vor = vor[candidates]
+        slot_index = {name: index for index, name in enumerate(slots)}
+        candidate_slots = [tuple(slot_index[name] for name in eligible[row]) for row in candidates.tolist()]
+
+        our_team = draft_position - 1
+        order = snake_order(teams, rounds)
+        our_picks = [pick for pick, team in enumerate(order) if team == our_team]
+        board_values = np.arange(len(candidates), dtype=np.float64) if opponents == 'adp' else candidate_vor
+
+        chunks = [CHUNK_SIZE] * (simulations // CHUNK_SIZE)
+        if simulations % CHUNK_SIZE:
+            chunks.append(simulations % CHUNK_SIZE)
+        seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+        jobs = [(chunk_seed, size, board_values, candidate_vor, candidate_slots, list(slots.values()), bench,
+                 teams, our_team, opponents, noise, our_picks) for chunk_seed, size in zip(seeds, chunks)]
+
+        if workers == 1 or len(jobs) == 1:
+            results = [simulate_chunk(*job) for job in jobs]
+        else:
+            results = list(self.get_pool(workers).map(_simulate_job, jobs))
+        available = sum(result[0] for result in results)
+        drafted = sum(result[1] for result in results)
+
+        ranked = []
+        for position, row in enumerate(candidates.tolist()[:limit]):
+            ranked.append(dict(players[row],
+                               points=round(float(points[row]), 2),
+                               vor=round(float(vor[row]), 2),
+                               availability=[round(count / simulations, 4) for count in available[:, position].tolist()],
+                               drafted=round(int(drafted[position]) / simulations, 4)))
+        return {
+            'teams': teams,
+            'slots': slots,
+            'bench': bench,
+            'draft_position': draft_position,
+            'our_picks': [pick + 1 for pick in our_picks],
+            'simulations': simulations,
+            'opponents': opponents,
+            'noise': noise,
+            'seed': seed,
+            'replacement': {name: round(value, 2) for name, value in replacement.items()},
+            'players': ranked
+        }
+
+
+def _simulate_job(job):
+    return simulate_chunk(*job)
+
+
+simulator = DraftSimulator()
@@ -1,30 +1,96 @@
-import requests
+import argparse
+import hashlib
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import os
-import random
+import tempfile
+
+import requests
+
+from archive import ArchiveWriter, DEFAULT_ARCHIVE_DIR, prune_archives
+from data_writer import PlayerDataWriter
+import metrics
+import projections
+from stat_fields import stat_set_name, stat_sets
+from stat_parser import build_player
+from mlb_api import BASE_URL, MLBClient
+from response_cache import FOREVER, ResponseCache
+
+# Hydration used when fetching a player's full year-by-year history
+PLAYER_HYDRATE = "stats(group=[hitting,pitching],type=[yearByYear])"
+
+# Hydration used to refresh only the current season for players we already have
+CURRENT_SEASON_HYDRATE = "stats(group=[hitting,pitching],type=[season],season={season})"
+
+# Number of players hydrated per people?personIds= request
+DEFAULT_BATCH_SIZE = 50
 
-def fetch_players_data():
+# Where HTTP responses and the per-player refresh state are kept between runs
+DEFAULT_CACHE_DIR = '.cache'
+REFRESH_STATE_FILE = 'refresh_state.json'
+
+# The team list barely changes; rosters and season stats are always revalidated (ttl 0)
+TEAMS_TTL = 24 * 60 * 60
+
+# Timings and HTTP traffic of the last run, written next to last_updated.json
+RUN_REPORT_FILE = 'run_report.json'
+
+
+def fetch_players_data(base_url=BASE_URL, output_dir='data', max_workers=8, requests_per_second=10,
+                       batch_size=DEFAULT_BATCH_SIZE, cache_dir=DEFAULT_CACHE_DIR, incremental=True,
+                       progress=None, archive_dir=DEFAULT_ARCHIVE_DIR):
     """
     Fetch real MLB player data from the MLB Stats API and save as JSON files.
+
+    Rosters and players are fetched concurrently by a pool of `max_workers` threads
+    sharing one keep-alive session, limited to `requests_per_second` overall.
+    Passing max_workers=1 fetches everything serially.
+
+    Players are hydrated `batch_size` at a time through the multi-ID people
+    endpoint; a batch_size of 1 requests each player individually.
+
+    With `incremental` on, responses are cached in `cache_dir` and only players whose
+    roster entry or current-season splits changed since the last run are re-hydrated;
+    everyone else is carried over from the previous players.json. Passing
+    cache_dir=None disables the cache and forces a full refresh.
+
+    `progress`, if given, is called as progress(stage, processed, total, errors)
+    while the players are fetched. The JSON files are only swapped in, by rename,
+    once all of them have been written.
+
+    Every run, successful or not, writes its stage timings and per-endpoint HTTP
+    stats to run_report.json in `output_dir` and records them in the metrics.
+
+    The raw responses a successful run used are saved to a compressed archive in
+    `archive_dir` (None disables it), from which rebuild.py can regenerate the
+    data files offline.
     """
+    cache = ResponseCache(cache_dir) if cache_dir else None
+    client = MLBClient(base_url, requests_per_second=requests_per_second, pool_size=max_workers, cache=cache)
+    started = time.monotonic()
+    started_at = datetime.now()
+    stages = metrics.StageTimer()
+    run = {'status': 'failed'}
+    archive = None
+
     try:
         # Create data directory if it doesn't exist
-        os.makedirs('data', exist_ok=True)
+        os.makedirs(output_dir, exist_ok=True)
         
-        # Lists to store batters and pitchers
-        batters = []
-        pitchers = []
+        # Current year for stats
+        current_year = datetime.now().year
+        batch_size = max(1, batch_size)
+        if archive_dir:
+            archive = client.archive = ArchiveWriter(archive_dir, base_url=base_url, current_year=current_year,
+                                                     batch_size=batch_size)
         
         print("Fetching active MLB players...")
         
-        # MLB Stats API base URL
-        base_url = "https://statsapi.mlb.com/api"
-        
         # First, get all teams to get player IDs
-        teams_url = f"{base_url}/v1/teams?sportId=1"
-        teams_response = requests.get(teams_url)
+        with stages.stage('teams'):
+            teams_response = client.get("v1/teams?sportId=1", ttl=TEAMS_TTL)
         
         if teams_response.status_code != 200:
             print(f"Error fetching teams: {teams_response.status_code}")
@@ -32,316 +98,459 @@ def fetch_players_data():
             
         teams_data = teams_response.json()
         all_player_ids = []
+        report = progress or (lambda stage, processed, total, errors: None)
+        report('rosters', 0, len(teams_data['teams']), 0)
         
-        # Collect player IDs from each team
-        for team in teams_data['teams']:
-            team_id = team['id']
-            roster_url = f"{base_url}/v1/teams/{team_id}/roster/active"
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Collect player IDs from each team, keeping the team order of the API response
+            with stages.stage('rosters'):
+                for roster in executor.map(lambda team: fetch_roster(client, team), teams_data['teams']):
+                    all_player_ids.extend(roster)
             
-            roster_response = requests.get(roster_url)
-            if roster_response.status_code == 200:
-                roster_data = roster_response.json()
-                
-                for player in roster_data.get('roster', []):
-                    all_player_ids.append({
-                        'id': player['person']['id'],
-                        'full_name': player['person']['fullName'],
-                        'position': player.get('position', {}).get('abbreviation', ''),
-                        'team_id': team_id,
-                        'team_name': team['name']
-                    })
+            print(f"Found {len(all_player_ids)} active players")
+            
+            # Work out which players actually need to be hydrated
+            with stages.stage('season_stats'):
+                season_hashes = fetch_season_fingerprints(client, current_year)
+                league = fetch_league(client, current_year)
+            if incremental and cache is not None and season_hashes is not None:
+                previous_players = load_previous_players(output_dir, current_year)
+                state = load_refresh_state(cache_dir)
             else:
-                print(f"Error fetching roster for team {team_id}: {roster_response.status_code}")
+                previous_players, state = {}, {}
+            full, current_only, unchanged = plan_refresh(all_player_ids, previous_players, state,
+                                                         season_hashes, current_year)
+            print(f"Hydrating {len(full)} players fully and {len(current_only)} for the current season only, "
+                  f"{len(unchanged)} unchanged")
             
-            # Be nice to the API with a small delay
-            time.sleep(0.1)
-        
-        print(f"Found {len(all_player_ids)} active players")
+            # Process the players in batches
+            current_hydrate = CURRENT_SEASON_HYDRATE.format(season=current_year)
+            batches = [(batch, PLAYER_HYDRATE) for batch in chunks(full, batch_size)]
+            batches += [(batch, current_hydrate) for batch in chunks(current_only, batch_size)]
+            
+            def process(job):
+                batch, hydrate = job
+                # Only full histories are projected; current-season refreshes keep last run's projection
+                batch_league = league if hydrate == PLAYER_HYDRATE else None
+                # Both stages run in the worker threads, so their times add up over the workers
+                with stages.stage('people_requests'):
+                    persons = fetch_people(client, batch, hydrate)
+                with stages.stage('parse'):
+                    return batch, build_players(batch, persons, current_year, batch_league)
+            
+            current_only_ids = {player_info['id'] for player_info in current_only}
+            pending = current_only_ids | {player_info['id'] for player_info in full}
+            failed_ids = set()
+            fetched = {}
+            
+            # Players are streamed to disk in roster order: everything up to the first
+            # player still being fetched is written as soon as its result arrives
+            writer = PlayerDataWriter(output_dir, stat_sets(current_year))
+            cursor = 0
+            
+            def write_ready():
+                nonlocal cursor
+                while cursor < len(all_player_ids) and all_player_ids[cursor]['id'] not in pending:
+                    player_id = all_player_ids[cursor]['id']
+                    cursor += 1
+                    # Written records are dropped, so only results that arrived out of order wait in memory
+                    if player_id in current_only_ids and player_id in fetched:
+                        player_obj = merge_current_season(previous_players[player_id], fetched.pop(player_id),
+                                                          current_year)
+                    elif player_id in fetched:
+                        player_obj = fetched.pop(player_id)
+                    elif player_id in previous_players:
+                        # Unchanged, or the fetch failed and last run's record is the best we have
+                        player_obj = previous_players[player_id]
+                    else:
+                        continue
+                    with stages.stage('serialization'):
+                        writer.write(player_obj)
+            
+            processed = 0
+            errors = 0
+            to_fetch = len(full) + len(current_only)
+            report('players', 0, to_fetch, 0)
+            hydration_started = time.perf_counter()
+            try:
+                write_ready()
+                for batch, player_objs in executor.map(process, batches):
+                    for player_info, player_obj in zip(batch, player_objs):
+                        if player_obj is not None:
+                            fetched[player_info['id']] = player_obj
+                        else:
+                            failed_ids.add(player_info['id'])
+                            errors += 1
+                        pending.discard(player_info['id'])
+                        
+                        # Log progress
+                        if processed % 50 == 0:
+                            print(f"Processed {processed} players...")
+                        processed += 1
+                        report('players', processed, to_fetch, errors)
+                    write_ready()
+            except BaseException:
+                writer.abort()
+                raise
+            stages.add('hydration', time.perf_counter() - hydration_started)
         
-        # Current year for stats
-        current_year = datetime.now().year
-        previous_year = current_year - 1
+        report('writing', processed, to_fetch, errors)
         
-        # Process each player
-        for idx, player_info in enumerate(all_player_ids):
-            try:
-                player_id = player_info['id']
-                
-                # Get detailed player info
-                player_url = f"{base_url}/v1/people/{player_id}?hydrate=stats(group=[hitting,pitching],type=[yearByYear])"
-                player_response = requests.get(player_url)
-                
-                if player_response.status_code != 200:
-                    print(f"Error fetching player {player_id}: {player_response.status_code}")
-                    continue
-                    
-                player_data = player_response.json()
-                if not player_data.get('people'):
-                    print(f"No data found for player {player_id}")
-                    continue
-                
-                person = player_data['people'][0]
-                
-                # Determine if player is a pitcher based on position
-                is_pitcher = player_info['position'] in ['P', 'SP', 'RP', 'CL']
-                
-                # Initialize stats dictionaries
-                batting_stats_2024 = {
-                    'avg': 0.0, 'runs': 0, 'rbi': 0, 'steals': 0, 'hr': 0, 'hits': 0, 'babip': 0.0
-                }
-                
-                pitching_stats_2024 = {
-                    'wins': 0, 'era': 0.0, 'strikeouts': 0, 'walks': 0, 'saves': 0, 'runs_scored': 0, 'fip': 0.0
-                }
-                
-                # Initialize 2025 actual stats (will be populated from API)
-                batting_stats_2025_actual = {
-                    'avg': 0.0, 'runs': 0, 'rbi': 0, 'steals': 0, 'hr': 0, 'hits': 0, 'babip': 0.0
-                }
-                
-                pitching_stats_2025_actual = {
-                    'wins': 0, 'era': 0.0, 'strikeouts': 0, 'walks': 0, 'saves': 0, 'runs_scored': 0, 'fip': 0.0
-                }
-                
-                # Make simple projections for 2025 based on 2024 data (or previous years)
-                batting_stats_2025_projected = dict(batting_stats_2024)
-                pitching_stats_2025_projected = dict(pitching_stats_2024)
-                
-                # Extract stats if available
-                if 'stats' in person:
-                    for stat_group in person['stats']:
-                        if stat_group['group']['displayName'] == 'hitting':
-                            for season_stat in stat_group['splits']:
-                                stat_year = season_stat.get('season')
-                                
-                                # Get 2024 stats (previous year)
-                                if stat_year == str(previous_year):
-                                    stats = season_stat['stat']
-                                    batting_stats_2024['avg'] = float(stats.get('avg', 0)) or 0
-                                    batting_stats_2024['runs'] = int(stats.get('runs', 0)) or 0
-                                    batting_stats_2024['rbi'] = int(stats.get('rbi', 0)) or 0
-                                    batting_stats_2024['steals'] = int(stats.get('stolenBases', 0)) or 0
-                                    batting_stats_2024['hr'] = int(stats.get('homeRuns', 0)) or 0
-                                    batting_stats_2024['hits'] = int(stats.get('hits', 0)) or 0
-                                    
-                                    # Calculate BABIP
-                                    at_bats = int(stats.get('atBats', 0)) or 1  # Avoid division by zero
-                                    hits = int(stats.get('hits', 0)) or 0
-                                    hr = int(stats.get('homeRuns', 0)) or 0
-                                    strikeouts = int(stats.get('strikeOuts', 0)) or 0
-                                    
-                                    # BABIP = (H - HR) / (AB - K - HR + SF)
-                                    # Note: SF (sacrifice flies) isn't always available, so we'll use an approximation
-                                    denominator = at_bats - strikeouts - hr
-                                    if denominator > 0:
-                                        batting_stats_2024['babip'] = round((hits - hr) / denominator, 3)
-                                    else:
-                                        batting_stats_2024['babip'] = 0.0
-                                    
-                                    # Simple projection: last year + small random adjustment
-                                    factor = random.uniform(0.9, 1.1)  # ±10% variation
-                                    
-                                    batting_stats_2025_projected['avg'] = round(batting_stats_2024['avg'] * factor, 3)
-                                    batting_stats_2025_projected['runs'] = int(batting_stats_2024['runs'] * factor)
-                                    batting_stats_2025_projected['rbi'] = int(batting_stats_2024['rbi'] * factor)
-                                    batting_stats_2025_projected['steals'] = int(batting_stats_2024['steals'] * factor)
-                                    batting_stats_2025_projected['hr'] = int(batting_stats_2024['hr'] * factor)
-                                    batting_stats_2025_projected['hits'] = int(batting_stats_2024['hits'] * factor)
-                                    batting_stats_2025_projected['babip'] = round(batting_stats_2024['babip'] * factor, 3)
-                                
-                                # Get 2025 stats (current year)
-                                elif stat_year == str(current_year):
-                                    stats = season_stat['stat']
-                                    batting_stats_2025_actual['avg'] = float(stats.get('avg', 0)) or 0
-                                    batting_stats_2025_actual['runs'] = int(stats.get('runs', 0)) or 0
-                                    batting_stats_2025_actual['rbi'] = int(stats.get('rbi', 0)) or 0
-                                    batting_stats_2025_actual['steals'] = int(stats.get('stolenBases', 0)) or 0
-                                    batting_stats_2025_actual['hr'] = int(stats.get('homeRuns', 0)) or 0
-                                    batting_stats_2025_actual['hits'] = int(stats.get('hits', 0)) or 0
-                                    
-                                    # Calculate BABIP for 2025
-                                    at_bats = int(stats.get('atBats', 0)) or 1
-                                    hits = int(stats.get('hits', 0)) or 0
-                                    hr = int(stats.get('homeRuns', 0)) or 0
-                                    strikeouts = int(stats.get('strikeOuts', 0)) or 0
-                                    
-                                    denominator = at_bats - strikeouts - hr
-                                    if denominator > 0:
-                                        batting_stats_2025_actual['babip'] = round((hits - hr) / denominator, 3)
-                                    else:
-                                        batting_stats_2025_actual['babip'] = 0.0
-                                    
-                        if stat_group['group']['displayName'] == 'pitching':
-                            for season_stat in stat_group['splits']:
-                                stat_year = season_stat.get('season')
-                                
-                                # Get 2024 stats (previous year)
-                                if stat_year == str(previous_year):
-                                    stats = season_stat['stat']
-                                    pitching_stats_2024['wins'] = int(stats.get('wins', 0)) or 0
-                                    pitching_stats_2024['era'] = float(stats.get('era', 0)) or 0
-                                    pitching_stats_2024['strikeouts'] = int(stats.get('strikeOuts', 0)) or 0
-                                    pitching_stats_2024['walks'] = int(stats.get('baseOnBalls', 0)) or 0
-                                    pitching_stats_2024['saves'] = int(stats.get('saves', 0)) or 0
-                                    pitching_stats_2024['runs_scored'] = int(stats.get('runs', 0)) or 0
-                                    
-                                    # Calculate FIP (Fielding Independent Pitching)
-                                    hr_allowed = int(stats.get('homeRuns', 0)) or 0
-                                    bb = int(stats.get('baseOnBalls', 0)) or 0
-                                    so = int(stats.get('strikeOuts', 0)) or 0
-                                    innings_pitched = float(stats.get('inningsPitched', 0)) or 1.0
-                                    
-                                    # FIP constant varies by year, but we'll use a standard approximation
-                                    fip_constant = 3.10
-                                    
-                                    # FIP = ((13*HR) + (3*BB) - (2*K)) / IP + FIP_constant
-                                    fip = ((13 * hr_allowed) + (3 * bb) - (2 * so)) / innings_pitched + fip_constant
-                                    pitching_stats_2024['fip'] = round(fip, 2)
-                                    
-                                    # Simple projection: last year + small random adjustment
-                                    factor = random.uniform(0.9, 1.1)  # ±10% variation
-                                    
-                                    pitching_stats_2025_projected['wins'] = int(pitching_stats_2024['wins'] * factor)
-                                    # ERA is better when lower, so invert factor
-                                    era_factor = 2 - factor  # This will be between 0.9 and 1.1
-                                    pitching_stats_2025_projected['era'] = round(pitching_stats_2024['era'] * era_factor, 2)
-                                    pitching_stats_2025_projected['strikeouts'] = int(pitching_stats_2024['strikeouts'] * factor)
-                                    pitching_stats_2025_projected['walks'] = int(pitching_stats_2024['walks'] * era_factor)
-                                    pitching_stats_2025_projected['saves'] = int(pitching_stats_2024['saves'] * factor)
-                                    pitching_stats_2025_projected['runs_scored'] = int(pitching_stats_2024['runs_scored'] * factor)
-                                    
-                                    # FIP is better when lower, so invert factor like ERA
-                                    pitching_stats_2025_projected['fip'] = round(pitching_stats_2024['fip'] * era_factor, 2)
-                                
-                                # Get 2025 stats (current year)
-                                elif stat_year == str(current_year):
-                                    stats = season_stat['stat']
-                                    pitching_stats_2025_actual['wins'] = int(stats.get('wins', 0)) or 0
-                                    pitching_stats_2025_actual['era'] = float(stats.get('era', 0)) or 0
-                                    pitching_stats_2025_actual['strikeouts'] = int(stats.get('strikeOuts', 0)) or 0
-                                    pitching_stats_2025_actual['walks'] = int(stats.get('baseOnBalls', 0)) or 0
-                                    pitching_stats_2025_actual['saves'] = int(stats.get('saves', 0)) or 0
-                                    pitching_stats_2025_actual['runs_scored'] = int(stats.get('runs', 0)) or 0
-                                    
-                                    # Calculate FIP for 2025
-                                    hr_allowed = int(stats.get('homeRuns', 0)) or 0
-                                    bb = int(stats.get('baseOnBalls', 0)) or 0
-                                    so = int(stats.get('strikeOuts', 0)) or 0
-                                    innings_pitched = float(stats.get('inningsPitched', 0)) or 1.0
-                                    
-                                    fip_constant = 3.10
-                                    fip = ((13 * hr_allowed) + (3 * bb) - (2 * so)) / innings_pitched + fip_constant
-                                    pitching_stats_2025_actual['fip'] = round(fip, 2)
-                
-                # Create player object
-                player_obj = {
-                    'id': player_id,
-                    'name': player_info['full_name'],
-                    'team': player_info['team_name'],
-                    'position': player_info['position'],
-                    'is_pitcher': is_pitcher,
-                    'stats_2024': {
-                        'avg': batting_stats_2024['avg'],
-                        'runs': batting_stats_2024['runs'],
-                        'rbi': batting_stats_2024['rbi'],
-                        'steals': batting_stats_2024['steals'],
-                        'hr': batting_stats_2024['hr'],
-                        'hits': batting_stats_2024['hits'],
-                        'babip': batting_stats_2024['babip'],
-                        'wins': pitching_stats_2024['wins'],
-                        'era': pitching_stats_2024['era'],
-                        'strikeouts': pitching_stats_2024['strikeouts'],
-                        'walks': pitching_stats_2024['walks'],
-                        'saves': pitching_stats_2024['saves'],
-                        'runs_scored': pitching_stats_2024['runs_scored'],
-                        'fip': pitching_stats_2024['fip']
-                    },
-                    'stats_2025_projected': {
-                        'avg': batting_stats_2025_projected['avg'],
-                        'runs': batting_stats_2025_projected['runs'],
-                        'rbi': batting_stats_2025_projected['rbi'],
-                        'steals': batting_stats_2025_projected['steals'],
-                        'hr': batting_stats_2025_projected['hr'],
-                        'hits': batting_stats_2025_projected['hits'],
-                        'babip': batting_stats_2025_projected['babip'],
-                        'wins': pitching_stats_2025_projected['wins'],
-                        'era': pitching_stats_2025_projected['era'],
-                        'strikeouts': pitching_stats_2025_projected['strikeouts'],
-                        'walks': pitching_stats_2025_projected['walks'],
-                        'saves': pitching_stats_2025_projected['saves'],
-                        'runs_scored': pitching_stats_2025_projected['runs_scored'],
-                        'fip': pitching_stats_2025_projected['fip']
-                    },
-                    'stats_2025_actual': {
-                        'avg': batting_stats_2025_actual['avg'],
-                        'runs': batting_stats_2025_actual['runs'],
-                        'rbi': batting_stats_2025_actual['rbi'],
-                        'steals': batting_stats_2025_actual['steals'],
-                        'hr': batting_stats_2025_actual['hr'],
-                        'hits': batting_stats_2025_actual['hits'],
-                        'babip': batting_stats_2025_actual['babip'],
-                        'wins': pitching_stats_2025_actual['wins'],
-                        'era': pitching_stats_2025_actual['era'],
-                        'strikeouts': pitching_stats_2025_actual['strikeouts'],
-                        'walks': pitching_stats_2025_actual['walks'],
-                        'saves': pitching_stats_2025_actual['saves'],
-                        'runs_scored': pitching_stats_2025_actual['runs_scored'],
-                        'fip': pitching_stats_2025_actual['fip']
-                    }
-                }
-                
-                # Add to appropriate list
-                if is_pitcher:
-                    pitchers.append(player_obj)
-                else:
-                    batters.append(player_obj)
-                
-                # Log progress
-                if idx % 50 == 0:
-                    print(f"Processed {idx} players...")
-                
-                # Be nice to the API with a small delay
-                time.sleep(0.1)
-                
-            except Exception as e:
-                print(f"Error processing player {player_info['full_name']}: {str(e)}")
+        # Requests a full, uncached refresh would have made: teams, rosters, this season's stats,
+        # the league stats behind the projections and every batch
+        full_requests = (2 + len(teams_data['teams']) + len(projections.SEASON_WEIGHTS)
+                         + len(chunks(all_player_ids, batch_size)))
+        refresh = {
+            'incremental': bool(previous_players),
+            'players_hydrated': len(full),
+            'players_current_season': len(current_only),
+            'players_unchanged': len(unchanged),
+            'http_requests': client.counts['requests'],
+            'cache_hits': client.counts['cache_hits'],
+            'not_modified': client.counts['not_modified'],
+            'requests_skipped': max(0, full_requests - client.counts['requests'])
+        }
         
-        # Create a combined player list
-        all_players = batters + pitchers
+        # Finish the data files, with the last updated timestamp swapped in last
+        counts = writer.counts
+        total_players = counts['batters'] + counts['pitchers']
+        run.update(players=total_players, batters=counts['batters'], pitchers=counts['pitchers'],
+                   errors=errors, refresh=refresh)
+        with stages.stage('serialization'):
+            writer.commit([
+                ('last_updated.json', {
+                    'timestamp': datetime.now().isoformat(),
+                    'total_players': total_players,
+                    'batters': counts['batters'],
+                    'pitchers': counts['pitchers'],
+                    'stat_sets': list(stat_sets(current_year)),
+                    'refresh': refresh
+                })
+            ])
         
-        # Save data as JSON files
-        with open('data/players.json', 'w') as f:
-            json.dump(all_players, f)
-            
-        with open('data/batters.json', 'w') as f:
-            json.dump(batters, f)
-            
-        with open('data/pitchers.json', 'w') as f:
-            json.dump(pitchers, f)
-            
-        # Save last updated timestamp
-        with open('data/last_updated.json', 'w') as f:
-            json.dump({
-                'timestamp': datetime.now().isoformat(),
-                'total_players': len(all_players),
-                'batters': len(batters),
-                'pitchers': len(pitchers)
-            }, f)
+        if cache is not None and season_hashes is not None:
+            # Players whose fetch failed are left out so the next run hydrates them again
+            save_refresh_state(cache_dir, [player_info for player_info in all_player_ids
+                                           if player_info['id'] not in failed_ids],
+                               season_hashes, current_year)
             
-        print(f"Saved {len(all_players)} players ({len(batters)} batters, {len(pitchers)} pitchers)")
+        print(f"Saved {total_players} players ({counts['batters']} batters, {counts['pitchers']} pitchers) "
+              f"in {time.monotonic() - started:.1f}s")
+        print(f"Made {refresh['http_requests']} HTTP requests, skipped {refresh['requests_skipped']} "
+              f"({refresh['cache_hits']} served from cache, {refresh['not_modified']} not modified)")
+        if archive is not None:
+            run['archive'] = archive.close(bool(previous_players), players=total_players)
+            archive = None
+            prune_archives(archive_dir)
+        run['status'] = 'ok'
         return True
         
     except Exception as e:
         print(f"Error fetching players data: {str(e)}")
+        run['error'] = str(e)
         return False
+    finally:
+        client.close()
+        if archive is not None:
+            archive.abort()
+        write_run_report(output_dir, run, started_at, time.monotonic() - started, stages, client)
+
+def write_run_report(output_dir, run, started_at, duration, stages, client):
+    """
+    Record a finished run in the metrics and write it to run_report.json.
+    """
+    stages.observe()
+    metrics.fetch_runs.inc(status=run['status'])
+    metrics.fetch_last_run.set(time.time())
+    
+    run_report = dict(run,
+                      started_at=started_at.isoformat(),
+                      finished_at=datetime.now().isoformat(),
+                      duration_seconds=round(duration, 3),
+                      stages=stages.to_dict(),
+                      http=dict(client.counts, endpoints=client.endpoint_report()))
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        write_json_files(output_dir, [(RUN_REPORT_FILE, run_report)])
+    except OSError as e:
+        print(f"Error writing {RUN_REPORT_FILE}: {str(e)}")
+
+def chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def write_json_files(directory, files):
+    """
+    Write (filename, data) pairs as JSON so readers never see a half-written file.
+
+    Every file is first written to a temp file in the same directory; only when
+    all of them succeeded are they renamed over the originals, in order.
+    """
+    written = []
+    try:
+        for filename, data in files:
+            fd, tmp_path = tempfile.mkstemp(prefix=f'.{filename}.', suffix='.tmp', dir=directory)
+            written.append((tmp_path, os.path.join(directory, filename)))
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+    except BaseException:
+        for tmp_path, _ in written:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        raise
+    
+    for tmp_path, path in written:
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+
+def fetch_season_stats(client, season):
+    """
+    Fetch every player's stats for a season in one request. Returns the response JSON, or None on failure.
+    """
+    # Completed seasons can never change, so they are cached for good
+    ttl = FOREVER if season < datetime.now().year else 0
+    try:
+        response = client.get(f"v1/stats?stats=season&group=hitting,pitching&season={season}"
+                              f"&sportId=1&playerPool=ALL&limit=10000", ttl=ttl)
+    except requests.RequestException as e:
+        print(f"Error fetching {season} season stats: {str(e)}")
+        return None
+    
+    if response.status_code != 200:
+        print(f"Error fetching {season} season stats: {response.status_code}")
+        return None
+    
+    return response.json()
+
+def fetch_league(client, target_year):
+    """
+    League totals for the seasons a projection for `target_year` is based on.
+    """
+    seasons = [target_year - 1 - offset for offset in range(len(projections.SEASON_WEIGHTS))]
+    return projections.League.from_season_stats([fetch_season_stats(client, season) for season in seasons])
+
+def fetch_season_fingerprints(client, season):
+    """
+    Hash each player's splits from the league-wide season stats, so changed
+    players can be found without hydrating everyone.
+
+    Returns {player_id: hash}, or None if the stats could not be fetched.
+    """
+    season_stats = fetch_season_stats(client, season)
+    if season_stats is None:
+        return None
+    
+    hashes = {}
+    for stat_group in season_stats.get('stats', []):
+        group = stat_group.get('group', {}).get('displayName', '')
+        for split in stat_group.get('splits', []):
+            player_id = split['player']['id']
+            digest = hashlib.sha1(json.dumps([group, split['stat']], sort_keys=True).encode()).hexdigest()
+            hashes[player_id] = hashes.get(player_id, '') + digest
+    
+    return {player_id: hashlib.sha1(value.encode()).hexdigest() for player_id, value in hashes.items()}
+
+def plan_refresh(all_player_ids, previous_players, state, season_hashes, current_year):
+    """
+    Split the roster into players needing a full hydrate, players needing only
+    their current season re-fetched, and unchanged players that can be reused.
+    """
+    if state.get('season') != current_year:
+        # A new season (or no usable state) invalidates everything we kept
+        return list(all_player_ids), [], []
+    
+    full, current_only, unchanged = [], [], []
+    known = state.get('players', {})
+    for player_info in all_player_ids:
+        player_id = player_info['id']
+        previous_state = known.get(str(player_id))
+        
+        if player_id not in previous_players or previous_state is None:
+            full.append(player_info)
+        elif previous_state['roster'] != [player_info['team_id'], player_info['position']]:
+            full.append(player_info)
+        elif previous_state['season_hash'] != season_hashes.get(player_id):
+            current_only.append(player_info)
+        else:
+            unchanged.append(player_info)
+    
+    return full, current_only, unchanged
+
+def merge_current_season(previous, fresh, current_year):
+    """
+    Combine a previously saved player with a freshly fetched current-season record.
+    """
+    key = f"stats_{stat_set_name(current_year, 'actual')}"
+    player_obj = dict(previous)
+    player_obj[key] = fresh[key]
+    return player_obj
+
+def load_previous_players(output_dir, current_year):
+    """
+    The players of the last run's players.json by id. Records without this
+    season's stat sets (written under other season labels) are left out, so
+    those players are hydrated again.
+    """
+    keys = [f'stats_{name}' for name in stat_sets(current_year)]
+    try:
+        with open(os.path.join(output_dir, 'players.json')) as f:
+            return {player['id']: player for player in json.load(f) if all(key in player for key in keys)}
+    except (OSError, ValueError):
+        return {}
+
+def load_refresh_state(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, REFRESH_STATE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_refresh_state(cache_dir, all_player_ids, season_hashes, current_year):
+    state = {
+        'season': current_year,
+        'players': {
+            str(player_info['id']): {
+                'roster': [player_info['team_id'], player_info['position']],
+                'season_hash': season_hashes.get(player_info['id'])
+            } for player_info in all_player_ids
+        }
+    }
+    write_json_files(cache_dir, [(REFRESH_STATE_FILE, state)])
+
+def fetch_roster(client, team):
+    """
+    Fetch the active roster for a team and return the basic info for each player.
+    """
+    team_id = team['id']
+    try:
+        roster_response = client.get(f"v1/teams/{team_id}/roster/active", ttl=0)
+    except requests.RequestException as e:
+        print(f"Error fetching roster for team {team_id}: {str(e)}")
+        return []
+    
+    if roster_response.status_code != 200:
+        print(f"Error fetching roster for team {team_id}: {roster_response.status_code}")
+        return []
+    
+    return roster_players(team, roster_response.json())
+
+def roster_players(team, roster_data):
+    """
+    The basic info of each player in a team's roster response.
+    """
+    return [{
+        'id': player['person']['id'],
+        'full_name': player['person']['fullName'],
+        'position': player.get('position', {}).get('abbreviation', ''),
+        'team_id': team['id'],
+        'team_name': team['name']
+    } for player in roster_data.get('roster', [])]
+
+def fetch_person(client, player_info, hydrate=PLAYER_HYDRATE):
+    """
+    Fetch a single hydrated person record, or None on failure.
+    """
+    try:
+        player_id = player_info['id']
+        
+        # Get detailed player info
+        player_response = client.get(f"v1/people/{player_id}?hydrate={hydrate}")
+        
+        if player_response.status_code != 200:
+            print(f"Error fetching player {player_id}: {player_response.status_code}")
+            return None
+            
+        player_data = player_response.json()
+        if not player_data.get('people'):
+            print(f"No data found for player {player_id}")
+            return None
+        
+        return player_data['people'][0]
+        
+    except Exception as e:
+        print(f"Error processing player {player_info['full_name']}: {str(e)}")
+        return None
+
+def fetch_player(client, player_info, current_year, hydrate=PLAYER_HYDRATE, league=None):
+    """
+    Fetch a single player's stats history and build the player object, or None on failure.
+    """
+    return build_players([player_info], [fetch_person(client, player_info, hydrate)], current_year, league)[0]
+
+def fetch_player_batch(client, batch, current_year, hydrate=PLAYER_HYDRATE, league=None):
+    """
+    Hydrate a batch of players and build their player objects, one entry per player in `batch`.
+    """
+    return build_players(batch, fetch_people(client, batch, hydrate), current_year, league)
+
+def fetch_people(client, batch, hydrate=PLAYER_HYDRATE):
+    """
+    Hydrate a batch of players with one people?personIds= request.
+
+    Returns one person record (or None) per player in `batch`, in the same order. If the batch
+    request fails, or a player is missing from its response, those players are fetched one at a
+    time instead. A batch of one uses the single-person endpoint.
+    """
+    if len(batch) == 1:
+        return [fetch_person(client, batch[0], hydrate)]
+    
+    person_ids = ','.join(str(player_info['id']) for player_info in batch)
+    people = {}
+    
+    try:
+        batch_response = client.get(f"v1/people?personIds={person_ids}&hydrate={hydrate}")
+        if batch_response.status_code == 200:
+            people = {person['id']: person for person in batch_response.json().get('people', [])}
+        else:
+            print(f"Error fetching batch of {len(batch)} players: {batch_response.status_code}, "
+                  f"falling back to single requests")
+    except Exception as e:
+        print(f"Error fetching batch of {len(batch)} players: {str(e)}, falling back to single requests")
+    
+    return [people.get(player_info['id']) or fetch_person(client, player_info, hydrate) for player_info in batch]
+
+def build_players(player_infos, persons, current_year, league=None):
+    """
+    Build the player objects for hydrated person records (None where the fetch failed).
+
+    With a `league`, every player's current season is projected from their
+    history in one vectorized pass; see projections.py.
+    """
+    player_objs = []
+    histories = []
+    for player_info, person in zip(player_infos, persons):
+        if person is None:
+            player_objs.append(None)
+            continue
+        
+        try:
+            player_obj = build_player(player_info, person, current_year)
+            history = projections.player_history(person) if league is not None else None
+        except Exception as e:
+            print(f"Error processing player {player_info['full_name']}: {str(e)}")
+            player_objs.append(None)
+            continue
+        
+        player_objs.append(player_obj)
+        histories.append((player_obj, history))
+    
+    if league is not None and histories:
+        projected = projections.project([history for _, history in histories],
+                                        [player_obj['is_pitcher'] for player_obj, _ in histories],
+                                        league, current_year)
+        for (player_obj, _), stats in zip(histories, projected):
+            player_obj[f"stats_{stat_set_name(current_year, 'projected')}"] = stats
+    
+    return player_objs
 
 def fetch_player_by_name(player_name):
     """
-    Search for a player by name in the MLB Stats API
+    Search for a player by name in the MLB Stats API.
+
+    /api/search only falls back to this for players that aren't in the local index.
     """
     try:
-        search_url = f"https://statsapi.mlb.com/api/v1/people/search?names={player_name}"
-        response = requests.get(search_url)
+        search_url = f"{BASE_URL}/v1/people/search"
+        response = requests.get(search_url, params={'names': player_name}, timeout=10)
         
         if response.status_code != 200:
             return None
@@ -354,5 +563,19 @@ def fetch_player_by_name(player_name):
 
 if __name__ == "__main__":
     # This allows running this script directly for testing
+    parser = argparse.ArgumentParser(description="Fetch MLB player data into JSON files.")
+    parser.add_argument('--base-url', default=BASE_URL, help="MLB Stats API base URL")
+    parser.add_argument('--output-dir', default='data', help="Directory to write the JSON files to")
+    parser.add_argument('--workers', type=int, default=8, help="Number of concurrent fetch workers (1 = serial)")
+    parser.add_argument('--rps', type=float, default=10, help="Maximum requests per second (0 = unlimited)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Players hydrated per request (1 = one request per player)")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="Directory for the HTTP response cache")
+    parser.add_argument('--full', action='store_true', help="Ignore the previous run and re-hydrate every player")
+    parser.add_argument('--archive-dir', default=DEFAULT_ARCHIVE_DIR,
+                        help="Directory for the raw response archives ('' to disable)")
+    args = parser.parse_args()
+    
     print("Running fetch_data.py to update player data...")
-    fetch_players_data()
\ No newline at end of file
+    fetch_players_data(args.base_url, args.output_dir, args.workers, args.rps, args.batch_size,
+                       args.cache_dir, incremental=not args.full, archive_dir=args.archive_dir or None)
\ No newline at end of file
@@ -0,0 +1,13 @@
+# gunicorn settings for serving the app, e.g. `gunicorn` from the repo root.
+# With SNAPSHOT_DIR set every worker maps the same snapshot file read-only, so
+# adding workers adds little memory; see snapshot_file.py.
+import os
+
+wsgi_app = 'app:app'
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = 60
+
+# Import the app once in the master; workers fork from it and open the snapshot on their first request
+preload_app = True
@@ -0,0 +1,232 @@
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+# Progress is written to the job's file at most this often (seconds); stage changes and the end always are
+SAVE_INTERVAL = 0.5
+
+JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class RefreshJob:
+    """
+    State of one background data refresh, as reported by the status endpoint.
+    """
+
+    FIELDS = ('id', 'status', 'stage', 'processed', 'total', 'errors', 'error', 'created_at', 'started_at',
+              'finished_at', 'stage_started_at')
+
+    def __init__(self, save=None):
+        self.id = uuid.uuid4().hex
+        self.status = 'queued'
+        self.stage = None
+        self.processed = 0
+        self.total = 0
+        self.errors = 0
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.stage_started_at = None
+        self.save = save or (lambda job: None)
+        self.saved_at = 0
+
+    @classmethod
+    def from_state(cls, state):
+        job = cls()
+        for field in cls.FIELDS:
+            setattr(job, field, state.get(field))
+        return job
+
+    def state(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @property
+    def active(self):
+        return self.status in ('queued', 'running')
+
+    def update(self, stage, processed, total, errors):
+        stage_changed = stage != self.stage
+        if stage_changed:
+            self.stage = stage
+            self.stage_started_at = time.time()
+        self.processed = processed
+        self.total = total
+        self.errors = errors
+        if stage_changed or time.time() - self.saved_at >= SAVE_INTERVAL:
+            self.save(self)
+
+    def eta(self):
+        """
+        Seconds left in the current stage, extrapolated from its progress so far.
+        """
+        if not self.active or not self.processed or not self.total or self.stage_started_at is None:
+            return None
+        elapsed = time.time() - self.stage_started_at
+        return round(elapsed / self.processed * (self.total - self.processed), 1)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'stage': self.stage,
+            'processed': self.processed,
+            'total': self.total,
+            'errors': self.errors,
+            'eta_seconds': self.eta(),
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class JobManager:
+    """
+    Runs data refreshes on a background thread, one at a time across every
+    process sharing `directory` (each gunicorn worker has its own manager).
+
+    `run(job)` does the actual work and returns True on success; it can call
+    job.update() to report progress. Submitting while a refresh is queued or
+    running, in this process or another, returns that job instead of starting
+    another. Each job's state is a JSON file in `directory`, so any process
+    can report on it, and the last `history` jobs are kept.
+
+    The process running a refresh holds an exclusive lock on `refresh.lock`
+    until it finishes. A job left queued or running without that lock held
+    belonged to a process that died, and is reported as failed.
+    """
+
+    def __init__(self, run, directory, history=20):
+        self.run = run
+        self.directory = directory
+        self.history = history
+        self.lock = threading.Lock()
+
+    def submit(self):
+        """
+        Start a refresh, or join the active one. Returns (job, created).
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with self.lock:
+            submitting = lock_file(self._lock_path('submit'), blocking=True)
+            try:
+                refresh_lock = lock_file(self._lock_path('refresh'))
+                if refresh_lock is None:
+                    # A refresh is running somewhere; join it
+                    active = [job for job in self._jobs() if job.active]
+                    if active:
+                        return active[-1], False
+                    # It has just saved its final state; wait the moment it takes to let go
+                    refresh_lock = lock_file(self._lock_path('refresh'), blocking=True)
+
+                self._fail_abandoned()
+                job = RefreshJob(save=self._save)
+                self._save(job)
+                self._evict()
+            finally:
+                submitting.close()
+
+        threading.Thread(target=self._run, args=(job, refresh_lock), name=f'refresh-{job.id[:8]}',
+                         daemon=True).start()
+        return job, True
+
+    def get(self, job_id):
+        if not JOB_ID.match(job_id):
+            return None
+        job = self._load(self._path(job_id))
+        if job is not None and job.active and not self._refresh_running():
+            # Re-read: it may have finished between the two checks
+            job = self._load(self._path(job_id))
+            if job is not None and job.active:
+                self._abandon(job)
+        return job
+
+    def _run(self, job, refresh_lock):
+        job.status = 'running'
+        job.started_at = time.time()
+        self._save(job)
+        try:
+            job.status = 'succeeded' if self.run(job) else 'failed'
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            self._save(job)
+            refresh_lock.close()
+
+    def _path(self, job_id):
+        return os.path.join(self.directory, f'{job_id}.json')
+
+    def _save(self, job):
+        job.saved_at = time.time()
+        path = self._path(job.id)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(job.state(), f)
+        os.replace(temp_path, path)
+
+    def _load(self, path):
+        try:
+            with open(path) as f:
+                return RefreshJob.from_state(json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def _jobs(self):
+        """
+        Every job on file, oldest first.
+        """
+        jobs = [self._load(os.path.join(self.directory, name)) for name in os.listdir(self.directory)
+                if name.endswith('.json')]
+        return sorted((job for job in jobs if job is not None), key=lambda job: job.created_at)
+
+    def _evict(self):
+        jobs = self._jobs()
+        for job in jobs[:max(0, len(jobs) - self.history)]:
+            try:
+                os.remove(self._path(job.id))
+            except FileNotFoundError:
+                pass
+
+    def _abandon(self, job):
+        job.status = 'failed'
+        job.error = job.error or 'The process running this refresh stopped before it finished'
+        job.finished_at = job.finished_at or time.time()
+        self._save(job)
+
+    def _fail_abandoned(self):
+        # Only called with the refresh lock held, so no active job is really running
+        for job in self._jobs():
+            if job.active:
+                self._abandon(job)
+
+    def _refresh_running(self):
+        refresh_lock = lock_file(self._lock_path('refresh'))
+        if refresh_lock is None:
+            return True
+        refresh_lock.close()
+        return False
+
+    def _lock_path(self, name):
+        return os.path.join(self.directory, f'{name}.lock')
+
+
+def lock_file(path, blocking=False):
+    """
+    Open `path` and take an exclusive flock on it. Returns the open file, which
+    holds the lock until it is closed, or None when `blocking` is false and the
+    lock is held by another process (or another open of the file in this one).
+    """
+    f = open(path, 'a')
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        return None
+    return f
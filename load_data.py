@@ -0,0 +1,188 @@
+import argparse
+import json
+import os
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+
+import data_version
+import snapshot_file
+from database import STAT_NAMES, db, DataVersion, Player, PlayerSeasonStats
+from stat_fields import parse_stat_set
+
+# Where build_snapshot() publishes snapshot files by default
+DEFAULT_SNAPSHOT_DIR = 'snapshots'
+
+# Rows sent to the database per executemany call
+INSERT_BATCH_SIZE = 1000
+
+
+def iter_json_array(path, chunk_size=1 << 16):
+    """
+    Yield the items of a top-level JSON array one at a time without reading the whole file into memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path) as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} does not contain a JSON array")
+        buffer = buffer[1:]
+
+        while True:
+            buffer = buffer.lstrip().lstrip(',').lstrip()
+            if buffer.startswith(']'):
+                return
+
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except ValueError:
+                # The next item isn't complete yet, read more of the file
+                more = f.read(chunk_size)
+                if not more:
+                    raise
+                buffer += more
+                continue
+
+            yield item
+            buffer = buffer[end:]
+
+
+def player_row(player):
+    """
+    The row for the Player table of one player from players.json.
+    """
+    return {
+        'id': player['id'],
+        'name': player['name'],
+        'team': player.get('team'),
+        'position': player.get('position'),
+        'is_pitcher': bool(player.get('is_pitcher'))
+    }
+
+
+def season_rows(player):
+    """
+    Rows for the PlayerSeasonStats table, one per stats_<set> block of a player
+    from players.json, whichever seasons the file holds.
+    """
+    rows = []
+    for key, stats in player.items():
+        if not key.startswith('stats_'):
+            continue
+        season, kind = parse_stat_set(key[len('stats_'):])
+        row = {'player_id': player['id'], 'season': season, 'kind': kind}
+        for stat in STAT_NAMES:
+            row[stat] = (stats or {}).get(stat, 0)
+        rows.append(row)
+    return rows
+
+
+def insert_rows(connection, players, seasons):
+    if players:
+        connection.execute(Player.__table__.insert(), players)
+    if seasons:
+        connection.execute(PlayerSeasonStats.__table__.insert(), seasons)
+    return len(players)
+
+
+def ensure_tables(tables):
+    """
+    Create any of the tables that don't exist yet. A table whose columns no
+    longer match the model (a database from before a schema change) is dropped
+    and recreated empty, with the tables after it, once.
+    """
+    inspector = db.inspect(db.engine)
+    stale = [table for table in tables if inspector.has_table(table.name)
+             and {column['name'] for column in inspector.get_columns(table.name)} != set(table.columns.keys())]
+    if stale:
+        dropped = tables[tables.index(stale[0]):]
+        print(f"Recreating {', '.join(table.name for table in dropped)} for the current schema")
+        for table in reversed(dropped):
+            table.drop(db.engine, checkfirst=True)
+    for table in tables:
+        table.create(db.engine, checkfirst=True)
+
+
+def load_players(path='data/players.json', batch_size=INSERT_BATCH_SIZE):
+    """
+    Replace the players in the Player and PlayerSeasonStats tables with those in a players.json file.
+
+    The tables are created first if needed. The old rows are then deleted and
+    the new ones bulk-inserted with executemany inside a single transaction, so
+    readers see either the old league or the new one, and a load that fails
+    part way (a truncated file, say) leaves the old league in place. The same
+    transaction stores a new DataVersion, which tells other processes serving
+    the database to drop what they built from the old league. Must be called
+    inside an app context. Returns the number of players loaded.
+    """
+    tables = [Player.__table__, PlayerSeasonStats.__table__]
+    count = 0
+
+    # DDL stays out of the transaction below: SQLite commits it as it runs
+    ensure_tables(tables + [DataVersion.__table__])
+
+    with db.engine.begin() as connection:
+        for table in reversed(tables):
+            connection.execute(table.delete())
+
+        players, seasons = [], []
+        for player in iter_json_array(path):
+            players.append(player_row(player))
+            seasons.extend(season_rows(player))
+            if len(players) >= batch_size:
+                count += insert_rows(connection, players, seasons)
+                players, seasons = [], []
+        count += insert_rows(connection, players, seasons)
+
+        connection.execute(DataVersion.__table__.delete())
+        connection.execute(DataVersion.__table__.insert(),
+                           {'id': 1, 'version': uuid.uuid4().hex[:12], 'loaded_at': datetime.now()})
+
+    # Cached snapshots and results were built from the old data
+    db.session.expire_all()
+    data_version.bump()
+    return count
+
+
+def build_snapshot(path='data/players.json', directory=DEFAULT_SNAPSHOT_DIR):
+    """
+    Build a snapshot file (see snapshot_file) from a players.json file and make it
+    the current one in `directory`. The file holds the same players, stats and
+    payloads the scoring engine would read from the tables after load_players(),
+    and building it needs no database. Returns its path.
+    """
+    from scoring import Snapshot
+
+    players = []
+    seasons = defaultdict(list)
+    for player in iter_json_array(path):
+        row = player_row(player)
+        players.append((row['id'], row['name'], row['team'], row['position'], row['is_pitcher']))
+        for season in season_rows(player):
+            seasons[season['season'], season['kind']].append(
+                (season['player_id'],) + tuple(season[stat] for stat in STAT_NAMES))
+
+    # Single seasons are all a snapshot file stores; ranges are totalled when served
+    players.sort(key=lambda row: row[0])
+    snapshot = Snapshot(players, seasons, lambda selection: seasons.get((selection.first, selection.kind), []))
+    return snapshot_file.publish(directory, snapshot.to_arrays(), source=os.path.basename(path),
+                                 players=snapshot.size)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load players.json into the Player and PlayerSeasonStats tables.")
+    parser.add_argument('path', nargs='?', default='data/players.json')
+    parser.add_argument('--snapshot-dir', help="Build a snapshot file in this directory instead of loading the database")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.snapshot_dir:
+        snapshot_path = build_snapshot(args.path, args.snapshot_dir)
+        print(f"Built {snapshot_path} from {args.path} in {time.perf_counter() - started:.3f}s")
+    else:
+        from app import app
+
+        with app.app_context():
+            loaded = load_players(args.path)
+            print(f"Loaded {loaded} players from {args.path} in {time.perf_counter() - started:.3f}s")
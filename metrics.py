@@ -0,0 +1,261 @@
+"""
+In-process metrics, exposed at /metrics in the Prometheus text format.
+
+Flask routes record their latency, response size and the database queries they
+ran; the fetch pipeline records its stage timings and MLB API traffic. Everything
+lives in this process, so with several server processes each one reports its own.
+
+Flask and SQLAlchemy are only imported by init_app(), so fetch_data.py can record
+its metrics without them installed.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Histogram buckets: seconds for latencies, bytes for payloads, counts for queries per request
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = tuple(256 * 4 ** power for power in range(9))  # 256 B to 16 MB
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500, 1000)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Metric:
+    """
+    One named metric with a fixed set of label names; values are kept per label combination.
+    """
+    type = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes the labels {', '.join(self.labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.extend(self.samples(key, value))
+        return lines
+
+    def samples(self, key, value):
+        return [f'{self.name}{format_labels(self.labels, key)} {format_value(value)}']
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    """
+    Cumulative-bucket histogram; each value is [per-bucket counts, sum, count].
+    """
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self, key, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            labels = format_labels(self.labels, key, [('le', format_value(float(bound)))])
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = format_labels(self.labels, key)
+        lines.append(f'{self.name}_sum{labels} {format_value(total)}')
+        lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+# Flask routes, labelled by the route pattern rather than the URL so ids don't create new series
+http_requests = registry.counter(
+    'http_requests_total', "HTTP requests handled.", ('method', 'route', 'status'))
+http_latency = registry.histogram(
+    'http_request_duration_seconds', "Time spent handling a request.", ('method', 'route'))
+http_response_size = registry.histogram(
+    'http_response_size_bytes', "Response body size.", ('method', 'route'), SIZE_BUCKETS)
+http_db_queries = registry.histogram(
+    'http_request_db_queries', "Database queries run per request.", ('method', 'route'), COUNT_BUCKETS)
+http_db_time = registry.histogram(
+    'http_request_db_seconds', "Time spent in database queries per request.", ('method', 'route'))
+
+# Every database query, in or out of a request
+db_queries = registry.counter('db_queries_total', "Database queries executed.")
+db_query_latency = registry.histogram('db_query_duration_seconds', "Time spent executing one query.")
+
+# The fetch pipeline and the MLB API requests it makes
+fetch_stage_time = registry.histogram(
+    'fetch_stage_duration_seconds', "Time spent in each stage of a data refresh.", ('stage',),
+    LATENCY_BUCKETS + (60.0, 120.0, 300.0, 600.0))
+fetch_runs = registry.counter('fetch_runs_total', "Data refreshes run.", ('status',))
+fetch_last_run = registry.gauge('fetch_last_run_timestamp_seconds', "When the last data refresh finished.")
+api_requests = registry.counter(
+    'mlb_api_requests_total', "Requests sent to the MLB Stats API, retries included.", ('endpoint', 'status'))
+api_retries = registry.counter('mlb_api_retries_total', "MLB Stats API requests retried.", ('endpoint',))
+api_bytes = registry.counter('mlb_api_response_bytes_total', "Bytes downloaded from the MLB Stats API.",
+                             ('endpoint',))
+api_latency = registry.histogram(
+    'mlb_api_request_duration_seconds', "Time from sending an MLB Stats API request to its full response.",
+    ('endpoint',))
+
+
+class StageTimer:
+    """
+    Adds up the time spent in named stages of one run, from any number of threads.
+
+    Stages timed in worker threads add up the time of every worker, so they can
+    exceed the wall-clock time of the stage that ran them.
+    """
+
+    def __init__(self):
+        self.seconds = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        with self.lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def observe(self):
+        """
+        Record the run's stage totals in the fetch_stage_duration_seconds histogram.
+        """
+        with self.lock:
+            for name, seconds in self.seconds.items():
+                fetch_stage_time.observe(seconds, stage=name)
+
+    def to_dict(self):
+        with self.lock:
+            return {name: round(seconds, 4) for name, seconds in self.seconds.items()}
+
+
+def init_app(app, endpoint='/metrics'):
+    """
+    Time every request to `app`, count the database queries it runs and serve the metrics at `endpoint`.
+    """
+    from flask import Response, g, has_request_context, request
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        db_queries.inc()
+        db_query_latency.observe(elapsed)
+        if has_request_context() and 'metrics_db_queries' in g:
+            g.metrics_db_queries += 1
+            g.metrics_db_seconds += elapsed
+
+    # Listening on the Engine class covers every engine, including ones created later
+    event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+
+    @app.before_request
+    def start_request():
+        g.metrics_started = time.perf_counter()
+        g.metrics_db_queries = 0
+        g.metrics_db_seconds = 0.0
+
+    @app.after_request
+    def finish_request(response):
+        if 'metrics_started' not in g:
+            return response
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        labels = {'method': request.method, 'route': route}
+        http_requests.inc(status=response.status_code, **labels)
+        http_latency.observe(time.perf_counter() - g.metrics_started, **labels)
+        # A streamed body has its Content-Length set; measuring it would read it all into memory
+        size = response.content_length
+        http_response_size.observe(size if size is not None else response.calculate_content_length() or 0,
+                                   **labels)
+        http_db_queries.observe(g.metrics_db_queries, **labels)
+        http_db_time.observe(g.metrics_db_seconds, **labels)
+        return response
+
+    @app.route(endpoint)
+    def metrics():
+        return Response(registry.render(), content_type=CONTENT_TYPE)
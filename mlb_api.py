@@ -0,0 +1,189 @@
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from response_cache import CachedResponse
+
+# MLB Stats API base URL
+BASE_URL = "https://statsapi.mlb.com/api"
+
+# Status codes that are worth retrying (rate limited or server side errors)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+NUMERIC_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+
+def endpoint_name(url):
+    """
+    The API path of a URL with its ids replaced, to group requests by:
+    ".../api/v1/teams/147/roster/active" -> "v1/teams/{id}/roster/active".
+    """
+    path = NUMERIC_SEGMENT.sub('/{id}', urlsplit(url).path)
+    return path.split('/api/', 1)[-1].lstrip('/')
+
+
+class RateLimiter:
+    """
+    Token bucket limiting how many requests per second are sent, shared by all worker threads.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        # A rate of 0 or less disables limiting
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class MLBClient:
+    """
+    Thin wrapper around a pooled keep-alive requests.Session for the MLB Stats API.
+
+    Every request waits for a token from the rate limiter and is retried with
+    exponential backoff on connection errors, 429 and 5xx responses. When a
+    ResponseCache is given, requests made with a ttl go through it.
+
+    Requests, retries, bytes downloaded and latency are kept per endpoint in
+    `endpoints` and recorded in the process-wide metrics. With an `archive`
+    (an archive.ArchiveWriter), the body of every successful response, cached
+    or not, is also recorded there.
+    """
+
+    def __init__(self, base_url=BASE_URL, requests_per_second=10, pool_size=8,
+                 max_retries=3, backoff=0.5, timeout=30, cache=None, archive=None):
+        self.base_url = base_url.rstrip('/')
+        self.cache = cache
+        self.archive = archive
+        self.lock = threading.Lock()
+        self.counts = {'requests': 0, 'cache_hits': 0, 'not_modified': 0}
+        self.endpoints = {}
+        self.limiter = RateLimiter(requests_per_second)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def record(self, endpoint, status, seconds=0.0, size=0, retried=False):
+        with self.lock:
+            stats = self.endpoints.setdefault(endpoint, {'requests': 0, 'retries': 0, 'errors': 0,
+                                                         'bytes': 0, 'seconds': 0.0})
+            stats['requests'] += 1
+            stats['retries'] += retried
+            stats['errors'] += status == 'error' or status >= 400
+            stats['bytes'] += size
+            stats['seconds'] += seconds
+        metrics.api_requests.inc(endpoint=endpoint, status=status)
+        metrics.api_latency.observe(seconds, endpoint=endpoint)
+        metrics.api_bytes.inc(size, endpoint=endpoint)
+        if retried:
+            metrics.api_retries.inc(endpoint=endpoint)
+
+    def endpoint_report(self):
+        """
+        Per-endpoint totals, with the mean latency in milliseconds.
+        """
+        with self.lock:
+            return {endpoint: dict(stats, seconds=round(stats['seconds'], 4),
+                                   mean_ms=round(stats['seconds'] * 1000 / stats['requests'], 2))
+                    for endpoint, stats in sorted(self.endpoints.items())}
+
+    def url(self, path):
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def get(self, path, ttl=None):
+        """
+        GET a path relative to the base URL. Returns the last response received,
+        which may still be an error response once the retries are used up.
+
+        With a ttl (in seconds, or response_cache.FOREVER) the response cache is
+        consulted first: fresh entries are returned without a request and stale
+        ones are revalidated with a conditional request.
+        """
+        response = self._get(path, ttl)
+        if self.archive is not None and response.status_code == 200:
+            self.archive.add(path, response.text)
+        return response
+
+    def _get(self, path, ttl):
+        url = self.url(path)
+        if self.cache is None or ttl is None:
+            return self._request(url)
+
+        entry = self.cache.get(url)
+        if self.cache.is_fresh(entry, ttl):
+            self.count('cache_hits')
+            return CachedResponse(entry)
+
+        response = self._request(url, self.cache.validators(entry))
+        if response.status_code == 304 and entry is not None:
+            self.count('not_modified')
+            self.cache.touch(url, entry)
+            return CachedResponse(entry)
+
+        if response.status_code == 200:
+            self.cache.put(url, response)
+        return response
+
+    def _request(self, url, headers=None):
+        endpoint = endpoint_name(url)
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            self.count('requests')
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+                size = len(response.content)
+            except (requests.ConnectionError, requests.Timeout):
+                self.record(endpoint, 'error', time.perf_counter() - started, retried=attempt > 0)
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.backoff * (2 ** attempt))
+                continue
+            self.record(endpoint, response.status_code, time.perf_counter() - started, size, retried=attempt > 0)
+
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+
+            # Honour Retry-After when the API sends one, otherwise back off exponentially
+            delay = self.backoff * (2 ** attempt)
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            time.sleep(delay)
+
+        return response
+
+    def close(self):
+        self.session.close()
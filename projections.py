@@ -0,0 +1,268 @@
+"""
+Marcel-style projections computed for a whole league at once with NumPy.
+
+A player's projected rate for each stat is their last three seasons weighted
+5/4/3 (most recent first), regressed toward the league rate by adding
+REGRESSION_PA plate appearances (or REGRESSION_OUTS outs) of league-average
+play, then adjusted for age. Playing time is half of last season plus a tenth
+of the season before, plus a baseline. Everything is plain arithmetic on the
+inputs, so the same history always gives byte-identical output.
+"""
+import numpy as np
+
+# Season weights, most recent season first
+SEASON_WEIGHTS = np.array([5.0, 4.0, 3.0])
+
+# Counting stats kept per season from the API splits
+HITTING_COMPONENTS = ('plateAppearances', 'atBats', 'hits', 'homeRuns', 'runs', 'rbi', 'stolenBases', 'strikeOuts')
+PITCHING_COMPONENTS = ('outs', 'gamesPlayed', 'gamesStarted', 'wins', 'saves', 'earnedRuns', 'runs',
+                       'strikeOuts', 'baseOnBalls', 'homeRuns')
+
+# League-average playing time mixed into every player's rates
+REGRESSION_PA = 1200
+REGRESSION_OUTS = 134 * 3
+
+# Playing time added on top of the weighted previous seasons
+BASELINE_PA = 200
+BASELINE_RELIEVER_OUTS = 25 * 3
+BASELINE_STARTER_OUTS = 60 * 3
+
+# Players improve by 0.6% a year up to PEAK_AGE and decline 0.3% a year after it
+PEAK_AGE = 29
+YOUNG_AGE_RATE = 0.006
+OLD_AGE_RATE = 0.003
+
+# Rates that get better (+1) or worse (-1) with the age adjustment; anything else isn't adjusted
+HITTING_AGING = {'hits': 1, 'homeRuns': 1, 'runs': 1, 'rbi': 1, 'stolenBases': 1, 'strikeOuts': -1}
+PITCHING_AGING = {'wins': 1, 'strikeOuts': 1, 'earnedRuns': -1, 'runs': -1, 'baseOnBalls': -1, 'homeRuns': -1}
+
+# Same approximation fetch_data uses for a season's FIP
+FIP_CONSTANT = 3.10
+
+
+def innings_to_outs(innings):
+    """
+    "123.2" innings pitched -> 371 outs.
+    """
+    whole, _, partial = str(innings or '0').partition('.')
+    return int(whole or 0) * 3 + int(partial or 0)
+
+
+def split_components(stat, components):
+    values = []
+    for component in components:
+        if component == 'outs':
+            values.append(float(innings_to_outs(stat.get('inningsPitched'))))
+        else:
+            values.append(float(stat.get(component) or 0))
+    return values
+
+
+def season_totals(splits, components):
+    """
+    One list of counting stats per season from a group's splits.
+
+    A player who changed teams can have a split per team and an aggregate split
+    without a team; the aggregate is used when there is one, otherwise the
+    per-team splits are added up.
+    """
+    seasons = {}
+    for split in splits:
+        seasons.setdefault(split.get('season'), []).append(split)
+
+    totals = {}
+    for season, season_splits in seasons.items():
+        if season is None:
+            continue
+        combined = [split for split in season_splits if 'team' not in split]
+        if combined:
+            totals[int(season)] = split_components(combined[0]['stat'], components)
+        else:
+            totals[int(season)] = [sum(values) for values in
+                                   zip(*(split_components(split['stat'], components) for split in season_splits))]
+    return totals
+
+
+def player_history(person):
+    """
+    Every season of a hydrated person's yearByYear stats, as
+    {'hitting': {season: components}, 'pitching': {...}, 'birth_year': int or None}.
+    """
+    history = {'hitting': {}, 'pitching': {}, 'birth_year': None}
+    for stat_group in person.get('stats', []):
+        group = stat_group.get('group', {}).get('displayName')
+        if group == 'hitting':
+            history['hitting'] = season_totals(stat_group.get('splits', []), HITTING_COMPONENTS)
+        elif group == 'pitching':
+            history['pitching'] = season_totals(stat_group.get('splits', []), PITCHING_COMPONENTS)
+
+    if person.get('birthDate'):
+        history['birth_year'] = int(person['birthDate'][:4])
+    return history
+
+
+def history_matrix(histories, group, components, target_year):
+    """
+    Stack the three seasons before `target_year` into a players x seasons x components array.
+    """
+    matrix = np.zeros((len(histories), len(SEASON_WEIGHTS), len(components)))
+    for row, history in enumerate(histories):
+        seasons = history[group]
+        for offset in range(len(SEASON_WEIGHTS)):
+            values = seasons.get(target_year - 1 - offset)
+            if values is not None:
+                matrix[row, offset] = values
+    return matrix
+
+
+class League:
+    """
+    League-wide rates per unit of playing time over the same three weighted seasons.
+
+    `hitting` and `pitching` are seasons x components arrays of league totals.
+    """
+
+    def __init__(self, hitting, pitching):
+        self.hitting = self._rates(hitting, HITTING_COMPONENTS.index('plateAppearances'))
+        self.pitching = self._rates(pitching, PITCHING_COMPONENTS.index('outs'))
+
+    @staticmethod
+    def _rates(totals, playing_time):
+        weighted = SEASON_WEIGHTS @ totals
+        if weighted[playing_time] <= 0:
+            return None
+        return weighted / weighted[playing_time]
+
+    @classmethod
+    def from_season_stats(cls, responses):
+        """
+        Build from the league-wide season stats responses for the three seasons
+        before the target year, most recent first. A missing season (None) counts as empty.
+        """
+        totals = {'hitting': np.zeros((len(SEASON_WEIGHTS), len(HITTING_COMPONENTS))),
+                  'pitching': np.zeros((len(SEASON_WEIGHTS), len(PITCHING_COMPONENTS)))}
+        components = {'hitting': HITTING_COMPONENTS, 'pitching': PITCHING_COMPONENTS}
+        for offset, response in enumerate(responses):
+            for stat_group in (response or {}).get('stats', []):
+                group = stat_group.get('group', {}).get('displayName')
+                if group not in totals:
+                    continue
+                by_player = {}
+                for split in stat_group.get('splits', []):
+                    by_player.setdefault(split['player']['id'], []).append(dict(split, season=0))
+                for splits in by_player.values():
+                    totals[group][offset] += season_totals(splits, components[group])[0]
+        return cls(totals['hitting'], totals['pitching'])
+
+
+def age_factors(birth_years, target_year):
+    ages = target_year - birth_years
+    factors = np.where(ages < PEAK_AGE, 1 + (PEAK_AGE - ages) * YOUNG_AGE_RATE,
+                       1 + (PEAK_AGE - ages) * OLD_AGE_RATE)
+    return np.where(np.isnan(ages), 1.0, factors)
+
+
+def regressed_rates(matrix, playing_time, league_rates, regression, aging, components, factors):
+    """
+    Weighted, regressed and age-adjusted rates per unit of playing time.
+    """
+    weighted = np.einsum('s,psc->pc', SEASON_WEIGHTS, matrix)
+    if league_rates is None:
+        league_rates, regression = np.zeros(len(components)), 0
+    denominator = weighted[:, playing_time] + regression
+    rates = np.divide(weighted + league_rates * regression, denominator[:, None],
+                      out=np.zeros_like(weighted), where=denominator[:, None] > 0)
+
+    for component, direction in aging.items():
+        column = components.index(component)
+        rates[:, column] = rates[:, column] * factors if direction > 0 else rates[:, column] / factors
+    return rates
+
+
+def project_hitting(matrix, league, factors):
+    pa = HITTING_COMPONENTS.index('plateAppearances')
+    rates = regressed_rates(matrix, pa, league.hitting, REGRESSION_PA, HITTING_AGING, HITTING_COMPONENTS, factors)
+    playing_time = 0.5 * matrix[:, 0, pa] + 0.1 * matrix[:, 1, pa] + BASELINE_PA
+    counts = rates * playing_time[:, None]
+
+    column = {name: counts[:, idx] for idx, name in enumerate(HITTING_COMPONENTS)}
+    at_bats, hits, hr = column['atBats'], column['hits'], column['homeRuns']
+    babip_denominator = at_bats - column['strikeOuts'] - hr
+    return {
+        'avg': np.round(np.divide(hits, at_bats, out=np.zeros_like(hits), where=at_bats > 0), 3),
+        'runs': np.rint(column['runs']).astype(np.int64),
+        'rbi': np.rint(column['rbi']).astype(np.int64),
+        'steals': np.rint(column['stolenBases']).astype(np.int64),
+        'hr': np.rint(hr).astype(np.int64),
+        'hits': np.rint(hits).astype(np.int64),
+        'babip': np.round(np.divide(hits - hr, babip_denominator, out=np.zeros_like(hits),
+                                    where=babip_denominator > 0), 3)
+    }
+
+
+def project_pitching(matrix, league, factors):
+    outs = PITCHING_COMPONENTS.index('outs')
+    rates = regressed_rates(matrix, outs, league.pitching, REGRESSION_OUTS, PITCHING_AGING,
+                            PITCHING_COMPONENTS, factors)
+
+    # Baseline innings scale from a reliever's to a starter's by the share of games started
+    games = matrix[:, :, PITCHING_COMPONENTS.index('gamesPlayed')].sum(axis=1)
+    starts = matrix[:, :, PITCHING_COMPONENTS.index('gamesStarted')].sum(axis=1)
+    start_share = np.divide(starts, games, out=np.zeros_like(games), where=games > 0).clip(0, 1)
+    baseline = BASELINE_RELIEVER_OUTS + (BASELINE_STARTER_OUTS - BASELINE_RELIEVER_OUTS) * start_share
+    playing_time = 0.5 * matrix[:, 0, outs] + 0.1 * matrix[:, 1, outs] + baseline
+    counts = rates * playing_time[:, None]
+
+    column = {name: counts[:, idx] for idx, name in enumerate(PITCHING_COMPONENTS)}
+    innings = column['outs'] / 3
+    # No projected innings (no history and no league rates to regress to) gives no ERA or FIP, not NaN
+    pitched = innings > 0
+    fip = np.divide(13 * column['homeRuns'] + 3 * column['baseOnBalls'] - 2 * column['strikeOuts'], innings,
+                    out=np.zeros_like(innings), where=pitched)
+    fip[pitched] += FIP_CONSTANT
+    era = np.divide(column['earnedRuns'] * 9, innings, out=np.zeros_like(innings), where=pitched)
+    return {
+        'wins': np.rint(column['wins']).astype(np.int64),
+        'era': np.round(era, 2),
+        'strikeouts': np.rint(column['strikeOuts']).astype(np.int64),
+        'walks': np.rint(column['baseOnBalls']).astype(np.int64),
+        'saves': np.rint(column['saves']).astype(np.int64),
+        'runs_scored': np.rint(column['runs']).astype(np.int64),
+        'fip': np.round(fip, 2)
+    }
+
+
+def project(histories, is_pitcher, league, target_year):
+    """
+    Project every player's stats for `target_year` in one pass.
+
+    `histories` come from player_history() and `is_pitcher` says which group a
+    player with no history at all is projected in (at league-average rates).
+    Otherwise a group is projected for players with playing time in it during
+    the three previous seasons, and left at zero for everyone else.
+    Returns one stats dict per player with the keys of the JSON stats blocks.
+    """
+    if not histories:
+        return []
+    hitting = history_matrix(histories, 'hitting', HITTING_COMPONENTS, target_year)
+    pitching = history_matrix(histories, 'pitching', PITCHING_COMPONENTS, target_year)
+    birth_years = np.array([np.nan if history['birth_year'] is None else history['birth_year']
+                            for history in histories], dtype=np.float64)
+    factors = age_factors(birth_years, target_year)
+    is_pitcher = np.asarray(is_pitcher, dtype=bool)
+
+    has_hitting = hitting[:, :, HITTING_COMPONENTS.index('plateAppearances')].sum(axis=1) > 0
+    has_pitching = pitching[:, :, PITCHING_COMPONENTS.index('outs')].sum(axis=1) > 0
+    no_history = ~has_hitting & ~has_pitching
+    groups = (
+        (project_hitting(hitting, league, factors), has_hitting | (no_history & ~is_pitcher)),
+        (project_pitching(pitching, league, factors), has_pitching | (no_history & is_pitcher))
+    )
+
+    projected = [{} for _ in histories]
+    for stats, projected_rows in groups:
+        for stat, values in stats.items():
+            zero = 0.0 if values.dtype.kind == 'f' else 0
+            for row, (value, keep) in enumerate(zip(values.tolist(), projected_rows.tolist())):
+                projected[row][stat] = value if keep else zero
+    return projected
@@ -0,0 +1,158 @@
+"""
+Rebuild the data files from archived API responses, without any HTTP requests.
+
+    python rebuild.py                          # the latest full run and the runs since, from archive/
+    python rebuild.py archive/20250601T060000.full.ndjson.zst --output-dir data
+
+Players are parsed and projected in chunks on a process pool, then written in
+roster order exactly as fetch_data.py writes them, so a rebuild of an unchanged
+archive produces the same files as the run that made it.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+import projections
+from archive import DEFAULT_ARCHIVE_DIR, latest_chain, read_archive
+from data_writer import PlayerDataWriter
+from fetch_data import build_players, merge_current_season, roster_players
+from stat_fields import stat_sets
+from stat_parser import build_player
+
+# Players parsed per task sent to the process pool
+CHUNK_SIZE = 200
+
+
+class ArchivedRun:
+    """
+    The responses of one or more archived runs, later runs replacing earlier ones.
+    """
+
+    def __init__(self):
+        self.meta = None
+        self.teams = None
+        self.rosters = {}
+        self.season_stats = {}
+        # Full histories by player id, and current-season records fetched after them
+        self.people = {}
+        self.current_season = {}
+
+    def add(self, path, body):
+        url = urlsplit(path)
+        parts = url.path.strip('/').split('/')
+        query = parse_qs(url.query)
+        data = json.loads(body)
+
+        if parts[1:] == ['teams']:
+            self.teams = data
+        elif parts[1] == 'teams' and 'roster' in parts:
+            self.rosters[int(parts[2])] = data
+        elif parts[1] == 'stats':
+            self.season_stats[int(query['season'][0])] = data
+        elif parts[1] == 'people':
+            full = 'yearByYear' in query.get('hydrate', [''])[0]
+            for person in data.get('people', []):
+                if full:
+                    self.people[person['id']] = person
+                    self.current_season.pop(person['id'], None)
+                else:
+                    self.current_season[person['id']] = person
+
+    @classmethod
+    def load(cls, paths):
+        run = cls()
+        for path in paths:
+            for record in read_archive(path):
+                if record.get('type') == 'meta':
+                    run.meta = record
+                elif 'path' in record:
+                    run.add(record['path'], record['body'])
+        if run.meta is None or run.teams is None:
+            raise ValueError("The archives hold no complete run")
+        return run
+
+
+def build_chunk(job):
+    player_infos, persons, current_season, current_year, league = job
+    player_objs = build_players(player_infos, persons, current_year, league)
+    for index, (player_info, person) in enumerate(zip(player_infos, current_season)):
+        if person is not None and player_objs[index] is not None:
+            fresh = build_player(player_info, person, current_year)
+            player_objs[index] = merge_current_season(player_objs[index], fresh, current_year)
+    return player_objs
+
+
+def rebuild(paths, output_dir='data', workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Rebuild the data files in `output_dir` from the archives at `paths`, oldest
+    first. Returns the writer's counts.
+    """
+    started = time.monotonic()
+    run = ArchivedRun.load(paths)
+    current_year = run.meta['current_year']
+
+    all_player_ids = []
+    for team in run.teams['teams']:
+        if team['id'] in run.rosters:
+            all_player_ids.extend(roster_players(team, run.rosters[team['id']]))
+    league = projections.League.from_season_stats(
+        [run.season_stats.get(current_year - 1 - offset) for offset in range(len(projections.SEASON_WEIGHTS))])
+
+    players = [player_info for player_info in all_player_ids if player_info['id'] in run.people]
+    jobs = []
+    for start in range(0, len(players), chunk_size):
+        chunk = players[start:start + chunk_size]
+        jobs.append((chunk,
+                     [run.people[player_info['id']] for player_info in chunk],
+                     [run.current_season.get(player_info['id']) for player_info in chunk],
+                     current_year, league))
+
+    os.makedirs(output_dir, exist_ok=True)
+    writer = PlayerDataWriter(output_dir, stat_sets(current_year))
+    pool = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+    try:
+        # Chunks come back in order, so players are written in roster order as they arrive
+        for player_objs in (pool.map(build_chunk, jobs) if pool else map(build_chunk, jobs)):
+            for player_obj in player_objs:
+                if player_obj is not None:
+                    writer.write(player_obj)
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    counts = writer.counts
+    writer.commit([
+        ('last_updated.json', {
+            'timestamp': datetime.now().isoformat(),
+            'total_players': counts['batters'] + counts['pitchers'],
+            'batters': counts['batters'],
+            'pitchers': counts['pitchers'],
+            'stat_sets': list(stat_sets(current_year)),
+            'rebuilt_from': [os.path.basename(path) for path in paths]
+        })
+    ])
+    print(f"Rebuilt {counts['batters'] + counts['pitchers']} players ({counts['batters']} batters, "
+          f"{counts['pitchers']} pitchers) from {len(paths)} archive(s) in {time.monotonic() - started:.1f}s")
+    return counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('archives', nargs='*',
+                        help="Archive files, oldest first (default: the latest chain in --archive-dir)")
+    parser.add_argument('--archive-dir', default=DEFAULT_ARCHIVE_DIR)
+    parser.add_argument('--output-dir', default='data', help="Directory to write the JSON files to")
+    parser.add_argument('--workers', type=int, default=None, help="Processes to parse with (default: one per CPU)")
+    args = parser.parse_args()
+
+    paths = args.archives or latest_chain(args.archive_dir)
+    if not paths:
+        parser.error(f"No archives given and no full run archived in {args.archive_dir}")
+    rebuild(paths, args.output_dir, args.workers)
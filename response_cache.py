@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+# TTL for responses that can never change again, such as completed seasons
+FOREVER = float('inf')
+
+
+class CachedResponse:
+    """
+    Stand-in for a requests.Response served from the cache.
+    """
+
+    def __init__(self, entry, status_code=200):
+        self.status_code = status_code
+        self.text = entry['body']
+        self.headers = {}
+        self.from_cache = True
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class ResponseCache:
+    """
+    On-disk HTTP response cache keyed by URL.
+
+    Each entry keeps the response body together with its ETag/Last-Modified
+    validators and a TTL. While an entry is younger than its TTL it is served
+    without touching the network; once it expires the validators are used for
+    a conditional request so an unchanged resource only costs a 304.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest() + '.json')
+
+    def get(self, url):
+        try:
+            with open(self.path(url)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def is_fresh(entry, ttl):
+        if entry is None or not ttl:
+            return False
+        return time.time() - entry['fetched_at'] < ttl
+
+    @staticmethod
+    def validators(entry):
+        """
+        Conditional request headers for a cached entry.
+        """
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url, response):
+        entry = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+            'body': response.text
+        }
+        self._write(url, entry)
+        return entry
+
+    def touch(self, url, entry):
+        """
+        Mark an entry as fresh again after the server answered 304 Not Modified.
+        """
+        entry['fetched_at'] = time.time()
+        self._write(url, entry)
+
+    def _write(self, url, entry):
+        # Write to a temp file first so concurrent readers never see a partial entry
+        # (a unique one, since several threads can be writing the same URL)
+        fd, tmp_path = tempfile.mkstemp(prefix='.entry.', suffix='.tmp', dir=self.directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self.path(url))
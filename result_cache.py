@@ -0,0 +1,94 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import data_version
+
+
+def canonical_weights(weights, names):
+    """
+    Normalise a posted weight set into a hashable key.
+
+    Only the scoring weights in `names` count, values become floats and zero
+    weights are dropped (a zero weight scores the same as a missing one), so
+    {'hr': 4, 'runs': 0} and {'hr': 4.0} share one cache entry.
+    """
+    key = []
+    for name in sorted(names):
+        value = float(weights.get(name) or 0)
+        if value != 0:
+            key.append((name, value))
+    return tuple(key)
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of encoded /api/calculate responses.
+
+    Keys include the version of the snapshot the response was scored from (a
+    snapshot file's content hash, or the version stored with a database load),
+    so a key and its ETag mean the same data in every process serving it. The
+    whole cache is also cleared whenever data_version.bump() is called.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        data_version.subscribe(self.clear)
+
+    @staticmethod
+    def key(version, weights, names, year, options):
+        return (version, str(year), canonical_weights(weights, names),
+                tuple(sorted((name, tuple(value) if isinstance(value, list) else value)
+                             for name, value in options.items())))
+
+    @staticmethod
+    def etag(key):
+        # The same key always produces the same body, so the key itself can be hashed
+        return hashlib.sha1(json.dumps(key).encode()).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def count_not_modified(self):
+        with self.lock:
+            self.not_modified += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'not_modified': self.not_modified,
+                'evictions': self.evictions,
+                'data_version': data_version.current()
+            }
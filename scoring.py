@@ -0,0 +1,606 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+import data_version
+import snapshot_file
+from database import (FLOAT_STATS, STAT_KINDS, STAT_NAMES, StatSelection, db, Player, PlayerSeasonStats,
+                      season_stats_query, stored_data_version)
+from serialization import MappedPayloads, PlayerPayloads, dumps, encode_numbers
+from stat_fields import parse_stat_set, stat_set_name, stat_sets
+
+# Names of every scoring weight the engine reads
+WEIGHT_NAMES = ('avg', 'runs', 'rbi', 'steals', 'hr', 'wins', 'era', 'strikeouts', 'walks', 'saves')
+
+# Scoring terms in the order the per-player formula adds them up:
+# (weight name, stat column, baseline, divisor). A baseline means lower is better,
+# so the term is (baseline - stat) * weight / divisor and is skipped for a zero weight.
+BATTING_TERMS = (
+    ('avg', 'avg', None, None),
+    ('runs', 'runs', None, None),
+    ('rbi', 'rbi', None, None),
+    ('steals', 'steals', None, None),
+    ('hr', 'hr', None, None),
+)
+PITCHING_TERMS = (
+    ('wins', 'wins', None, None),
+    ('era', 'era', 5.0, None),  # 5.0 is a baseline ERA
+    ('strikeouts', 'strikeouts', None, None),
+    ('walks', 'walks', 100, 100),  # Normalize walks
+    ('saves', 'saves', None, None),
+)
+
+
+# Decimal places of rate stats averaged over several seasons
+RATE_DECIMALS = {'avg': 3, 'babip': 3, 'era': 2, 'fip': 2}
+
+# Stat columns kept per snapshot for selections other than the ones every player payload holds
+MAX_CACHED_SELECTIONS = 32
+
+# Seconds between checks for data changed by another process: a newly
+# published snapshot file, or a load into the database
+DATA_CHECK_INTERVAL = 1.0
+
+
+def parse_year(year=None, kind=None):
+    """
+    Parse the `year` and `kind` a client asked for into (first, last, kind),
+    None standing for whatever was left out. `year` is a season ('2025'), a
+    stat set ('2025_projected') or a range of seasons ('2021-2025', '2021-2025_actual').
+    Raises ValueError with a message for the client on bad input.
+    """
+    first = last = suffix = None
+    if year is not None and year != '':
+        seasons, _, suffix = str(year).partition('_')
+        start, _, end = seasons.partition('-')
+        end = end or start
+        if not start.isdigit() or not end.isdigit() or (suffix and suffix not in STAT_KINDS):
+            raise ValueError(f"year must be a season, a range of seasons such as 2021-2025 or a season "
+                             f"and kind such as 2025_projected, not {year}")
+        first, last = sorted((int(start), int(end)))
+    if kind is not None and kind != '':
+        if kind not in STAT_KINDS:
+            raise ValueError(f"kind must be one of: {', '.join(STAT_KINDS)}")
+        if suffix and suffix != kind:
+            raise ValueError(f"year {year} and kind {kind} disagree")
+        suffix = kind
+    return first, last, suffix or None
+
+
+class StatGroup:
+    """
+    One group of players (batters or pitchers) of a snapshot.
+
+    `rows` holds each player's position in the snapshot so points can be
+    written back in the original player order.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def points(self, columns, terms, weights):
+        """
+        Points for every player in the group from `columns`, the group's slice of a StatColumns.
+        """
+        # Terms are accumulated one column at a time in formula order rather than with
+        # np.dot, which keeps the floating point result identical to the per-player loop.
+        points = np.zeros(len(self.rows))
+        for weight_name, stat, baseline, divisor in terms:
+            weight = weights.get(weight_name, 0)
+            column = columns[stat]
+            if baseline is None:
+                points += column * weight
+            elif weight != 0:
+                term = (baseline - column) * weight
+                points += term / divisor if divisor else term
+        return points
+
+
+class StatColumns:
+    """
+    Every stat of one StatSelection as an array in snapshot row order. Players
+    without stats for the selection have zeros.
+    """
+
+    def __init__(self, snapshot, selection, stats):
+        if selection.first != selection.last:
+            stats = {stat: np.round(column, RATE_DECIMALS[stat]) if stat in RATE_DECIMALS else column
+                     for stat, column in stats.items()}
+        self.stats = stats
+        self.snapshot = snapshot
+        self._groups = {}
+        self._encoded = None
+
+    @classmethod
+    def from_rows(cls, snapshot, selection, rows):
+        """
+        Columns from the (player_id, *stats) rows of database.season_stats_query().
+        """
+        rows = [row for row in rows if row[0] in snapshot.row_of]
+        index = np.array([snapshot.row_of[row[0]] for row in rows], dtype=np.intp)
+        values = list(zip(*rows))
+
+        stats = {}
+        for position, stat in enumerate(STAT_NAMES, start=1):
+            column = np.zeros(snapshot.size, dtype=np.float64 if stat in FLOAT_STATS else np.int64)
+            if rows:
+                column[index] = [value or 0 for value in values[position]]
+            stats[stat] = column
+        return cls(snapshot, selection, stats)
+
+    def group(self, group):
+        # The columns of one StatGroup, sliced on first use
+        columns = self._groups.get(group)
+        if columns is None:
+            columns = self._groups[group] = {stat: column[group.rows] for stat, column in self.stats.items()}
+        return columns
+
+    def as_dicts(self):
+        """
+        Each player's stats as a {stat: value} dict, in snapshot row order.
+        """
+        columns = [self.stats[stat].tolist() for stat in STAT_NAMES]
+        return [dict(zip(STAT_NAMES, values)) for values in zip(*columns)]
+
+    @property
+    def encoded(self):
+        # Each player's stats as a JSON object; encoded on first use like Snapshot.payloads
+        if self._encoded is None:
+            self._encoded = [dumps(stats) for stats in self.as_dicts()]
+        return self._encoded
+
+
+class Snapshot:
+    """
+    Columnar copy of the Player table used to score every player in one pass.
+
+    `rows` are (id, name, team, position, is_pitcher) in player id order and
+    `available` the (season, kind) pairs stored. Stats are read per StatSelection
+    with `load_stats`, which returns database.season_stats_query() rows, when
+    first asked for. Player payloads hold the stat sets a fetch writes for the
+    latest season loaded (see stat_fields.stat_sets), named stats_<season>_<kind>.
+    """
+
+    def __init__(self, rows, available=(), load_stats=None, version=None):
+        columns = ['id', 'name', 'team', 'position', 'is_pitcher']
+        data = dict(zip(columns, zip(*rows))) if rows else {column: () for column in columns}
+        self.load_stats = load_stats or (lambda selection: [])
+        self.setup(np.array(data['id'], dtype=np.int64),
+                   {column: np.array([value or '' for value in data[column]], dtype=str)
+                    for column in ('name', 'team', 'position')},
+                   np.array([bool(value) for value in data['is_pitcher']], dtype=bool),
+                   available, version)
+
+    def setup(self, ids, text, is_pitcher, available, version):
+        self.size = len(ids)
+        self.version = version
+        self.ids = ids
+
+        # Columns used for filtering and sorting
+        self.is_pitcher = is_pitcher
+        self.text = text
+
+        self.batters = StatGroup(np.flatnonzero(~is_pitcher))
+        self.pitchers = StatGroup(np.flatnonzero(is_pitcher))
+
+        # The (season, kind) pairs stored
+        self.available = {(season, kind) for season, kind in available}
+        self.current_season = max((season for season, _ in self.available), default=datetime.now().year)
+        self.lock = threading.Lock()
+        self.cached_columns = OrderedDict()
+
+        # Built on first use: response payloads once per snapshot instead of per request
+        self._players = None
+        self._payloads = None
+        self._row_of = None
+
+        self.stat_sets = [StatSelection(season, season, kind) for season, kind in
+                          map(parse_stat_set, stat_sets(self.current_season))]
+        self.stat_set_columns = {selection: self.read_columns(selection) for selection in self.stat_sets}
+
+    def read_columns(self, selection):
+        return StatColumns.from_rows(self, selection, self.load_stats(selection))
+
+    @property
+    def row_of(self):
+        if self._row_of is None:
+            self._row_of = {player_id: row for row, player_id in enumerate(self.ids.tolist())}
+        return self._row_of
+
+    @property
+    def players(self):
+        # Every player's dict in snapshot row order, as the payloads encode them
+        if self._players is None:
+            self._players = self._player_dicts()
+        return self._players
+
+    def player(self, row):
+        return self.players[row]
+
+    @property
+    def payloads(self):
+        # Encoded on first use; building it twice from two threads is harmless
+        if self._payloads is None:
+            self._payloads = PlayerPayloads(self.players)
+        return self._payloads
+
+    def _player_dicts(self):
+        ids, is_pitcher = self.ids.tolist(), self.is_pitcher.tolist()
+        text = {column: values.tolist() for column, values in self.text.items()}
+        stat_set_stats = {selection.name: columns.as_dicts() for selection, columns in self.stat_set_columns.items()}
+        players = []
+        for idx in range(self.size):
+            player = {
+                'id': ids[idx],
+                'name': text['name'][idx],
+                'team': text['team'][idx],
+                'position': text['position'][idx],
+                'is_pitcher': is_pitcher[idx],
+            }
+            for name, stats in stat_set_stats.items():
+                player[f'stats_{name}'] = stats[idx]
+            players.append(player)
+        return players
+
+    def identities(self):
+        """
+        Each player's id, name, team, position and is_pitcher as a dict, in snapshot row order.
+        """
+        columns = [self.ids.tolist()] + [self.text[column].tolist() for column in ('name', 'team', 'position')] + \
+            [self.is_pitcher.tolist()]
+        return [dict(zip(('id', 'name', 'team', 'position', 'is_pitcher'), values)) for values in zip(*columns)]
+
+    def to_arrays(self):
+        """
+        The arrays a snapshot file holds (see snapshot_file and FileSnapshot): the
+        player columns, every stored season's stats and the encoded payloads.
+        """
+        arrays = {'id': self.ids, 'is_pitcher': self.is_pitcher}
+        for column, values in self.text.items():
+            arrays[f'text.{column}'] = values
+        for season, kind in sorted(self.available):
+            columns = self.stat_columns(StatSelection(season, season, kind)).stats
+            for stat in STAT_NAMES:
+                arrays[f'stats.{season}_{kind}.{stat}'] = columns[stat]
+        body, bounds = self.payloads.layout()
+        arrays['payloads'] = np.frombuffer(body, dtype=np.uint8)
+        arrays['payload_bounds'] = bounds
+        return arrays
+
+    def selection(self, year=None, kind=None):
+        """
+        Resolve a requested year and kind (see parse_year) to a StatSelection.
+
+        Without a year the latest season loaded is used. A single season without
+        a kind means its projection when there is one and its actual stats
+        otherwise; a range of seasons without one means actual stats. Raises
+        ValueError when a requested year has no stats stored.
+        """
+        first, last, kind = parse_year(year, kind)
+        if first is None:
+            first = last = self.current_season
+        if kind is None:
+            kind = 'projected' if first == last and (first, 'projected') in self.available else 'actual'
+        selection = StatSelection(first, last, kind)
+        if year and not any(first <= season <= last and stored == kind for season, stored in self.available):
+            raise ValueError(f"No {kind} stats for {year}")
+        return selection
+
+    def stat_columns(self, selection):
+        """
+        The StatColumns of a selection, read on first use.
+        """
+        columns = self.stat_set_columns.get(selection)
+        if columns is not None:
+            return columns
+        with self.lock:
+            columns = self.cached_columns.get(selection)
+            if columns is not None:
+                self.cached_columns.move_to_end(selection)
+                return columns
+        # Read outside the lock; two threads loading the same selection is harmless
+        columns = self.read_columns(selection)
+        with self.lock:
+            self.cached_columns[selection] = columns
+            while len(self.cached_columns) > MAX_CACHED_SELECTIONS:
+                self.cached_columns.popitem(last=False)
+        return columns
+
+    def selection_fields(self, selection, rows):
+        """
+        Fields to add to the payloads of `rows` for a selection: its stats, unless
+        the payloads already hold them as one of the stat sets.
+        """
+        if selection in self.stat_set_columns:
+            return []
+        encoded = self.stat_columns(selection).encoded
+        return [('stats', [encoded[row] for row in rows])]
+
+    def body(self, selection, rows=None):
+        """
+        The encoded JSON array of the players at `rows` (every player when None),
+        with their stats for `selection` added where the payloads don't hold them.
+        """
+        if selection in self.stat_set_columns:
+            return self.payloads.body(rows)
+        rows = range(self.size) if rows is None else rows
+        return self.payloads.body_with(rows, self.selection_fields(selection, rows))
+
+    def points(self, weights, selection):
+        columns = self.stat_columns(selection)
+        points = np.zeros(self.size)
+        points[self.batters.rows] = self.batters.points(columns.group(self.batters), BATTING_TERMS, weights)
+        points[self.pitchers.rows] = self.pitchers.points(columns.group(self.pitchers), PITCHING_TERMS, weights)
+        return points
+
+    def filter_rows(self, positions=None, team=None, is_pitcher=None):
+        """
+        Indexes of the players matching every given filter, in snapshot order.
+        """
+        mask = np.ones(self.size, dtype=bool)
+        if positions:
+            mask &= np.isin(self.text['position'], positions)
+        if team:
+            mask &= self.text['team'] == team
+        if is_pitcher is not None:
+            mask &= self.is_pitcher == is_pitcher
+        return np.flatnonzero(mask)
+
+    def sort_key(self, sort, selection, points):
+        if sort == 'points':
+            return points
+        if sort in self.text:
+            return self.text[sort]
+        if sort in STAT_NAMES:
+            return self.stat_columns(selection).stats[sort]
+        raise KeyError(sort)
+
+    def page(self, selection, points=None, positions=None, team=None, is_pitcher=None,
+             sort=None, descending=True, offset=0, limit=None):
+        """
+        Filter, sort and page the players; returns (total, rows) with `total` the
+        number of players matching the filters and `rows` the snapshot rows of the
+        page. Without a sort the players stay in player id order.
+        """
+        rows = self.filter_rows(positions, team, is_pitcher)
+        total = len(rows)
+        if sort is not None:
+            rows = select_rows(rows, self.sort_key(sort, selection, points), descending, offset, limit)
+        else:
+            rows = rows[offset:None if limit is None else offset + limit]
+        return total, rows
+
+
+class FileSnapshot(Snapshot):
+    """
+    A Snapshot served from a memory-mapped snapshot file (see snapshot_file).
+
+    Columns, stats and payloads are read-only views on the mapping, so opening
+    one takes milliseconds and processes serving the same file share its memory.
+    Stats over several seasons are totalled with NumPy the way
+    database.season_stats_query() totals them in SQL.
+    """
+
+    def __init__(self, mapped):
+        self.mapped = mapped
+        arrays = mapped.arrays
+        available = [parse_stat_set(name.split('.')[1]) for name in arrays
+                     if name.startswith('stats.') and name.endswith(f'.{STAT_NAMES[0]}')]
+        self.setup(arrays['id'], {column: arrays[f'text.{column}'] for column in ('name', 'team', 'position')},
+                   arrays['is_pitcher'], available, mapped.version)
+        self._payloads = MappedPayloads(arrays['payloads'], arrays['payload_bounds'])
+
+    def read_columns(self, selection):
+        seasons = [season for season in range(selection.first, selection.last + 1)
+                   if (season, selection.kind) in self.available]
+        stats = {}
+        for stat in STAT_NAMES:
+            columns = [self.mapped.arrays[f'stats.{stat_set_name(season, selection.kind)}.{stat}']
+                       for season in seasons]
+            if not columns:
+                stats[stat] = np.zeros(self.size, dtype=np.float64 if stat in FLOAT_STATS else np.int64)
+            elif len(columns) == 1:
+                stats[stat] = columns[0]
+            elif stat in FLOAT_STATS:
+                # Rates are averaged over the seasons where they aren't zero
+                stacked = np.vstack(columns)
+                counts = np.count_nonzero(stacked, axis=0)
+                stats[stat] = np.divide(stacked.sum(axis=0), counts, out=np.zeros(self.size), where=counts > 0)
+            else:
+                stats[stat] = np.sum(columns, axis=0)
+        return StatColumns(self, selection, stats)
+
+    @property
+    def players(self):
+        if self._players is None:
+            self._players = [self.player(row) for row in range(self.size)]
+        return self._players
+
+    def player(self, row):
+        # The payload fragment is the player's JSON without its closing brace
+        return json.loads(bytes(self.payloads.fragments[row]) + b'}')
+
+
+def load_season_stats(selection):
+    return db.session.execute(season_stats_query(selection)).all()
+
+
+class ScoringEngine:
+    """
+    Scores every player with the weights posted to /api/calculate.
+
+    The Player table is read into a Snapshot the first time it is needed and
+    reused until the data version changes. After use_snapshots() the engine
+    serves the current snapshot file of a directory instead. Either way it
+    checks at most every DATA_CHECK_INTERVAL seconds whether another process
+    changed the data (see check_data) and bumps the data version when it did.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.snapshot_dir = None
+        self.snapshot_path = None
+        self.database_version = None
+        self.checked_at = None
+        data_version.subscribe(self.invalidate)
+
+    def use_snapshots(self, directory):
+        """
+        Serve the snapshot files published to `directory` (see snapshot_file) instead of the database.
+        """
+        self.snapshot_dir = directory
+        self.checked_at = None
+        self.invalidate()
+
+    def check_data(self, force=False):
+        """
+        Bump the data version if another process changed the data since the last
+        check: published a new snapshot file, or loaded the database (see
+        database.DataVersion). Must be called inside an app context when
+        serving the database.
+        """
+        now = time.monotonic()
+        if not force and self.checked_at is not None and now - self.checked_at < DATA_CHECK_INTERVAL:
+            return
+        self.checked_at = now
+        if self.snapshot_dir is not None:
+            path = snapshot_file.current_snapshot(self.snapshot_dir)
+            changed = path != self.snapshot_path
+            self.snapshot_path = path
+        else:
+            version = stored_data_version()
+            changed = self.database_version is not None and version != self.database_version
+            self.database_version = version
+        if changed:
+            # Everything cached from the previous data is dropped, this engine's snapshot included
+            data_version.bump()
+
+    def get_snapshot(self):
+        self.check_data()
+        with self.lock:
+            if self.snapshot is None:
+                if self.snapshot_dir is not None:
+                    if self.snapshot_path is None:
+                        raise snapshot_file.NoSnapshotError(f"No snapshot published in {self.snapshot_dir}")
+                    self.snapshot = FileSnapshot(snapshot_file.MappedSnapshot(self.snapshot_path))
+                else:
+                    # Read before the players: should a load land in between, the next
+                    # check_data() sees the version move on and the snapshot is rebuilt
+                    version = stored_data_version() or data_version.tag()
+                    columns = [Player.id, Player.name, Player.team, Player.position, Player.is_pitcher]
+                    rows = db.session.execute(db.select(*columns).order_by(Player.id)).all()
+                    available = db.session.execute(
+                        db.select(PlayerSeasonStats.season, PlayerSeasonStats.kind).distinct()).all()
+                    self.snapshot = Snapshot(rows, available, load_season_stats, version=version)
+            return self.snapshot
+
+    def invalidate(self):
+        with self.lock:
+            self.snapshot = None
+
+    def selection(self, year=None, kind=None):
+        """
+        The StatSelection for a requested year and kind; see Snapshot.selection().
+        """
+        return self.get_snapshot().selection(year, kind)
+
+    def points(self, weights, selection=None, snapshot=None):
+        """
+        Score every player of `snapshot` (the current one by default); returns
+        (snapshot, points) with points in snapshot row order. Without a
+        selection the latest season is scored.
+        """
+        snapshot = snapshot or self.get_snapshot()
+        weights = {name: float(weights.get(name) or 0) for name, _, _, _ in BATTING_TERMS + PITCHING_TERMS}
+        return snapshot, snapshot.points(weights, selection or snapshot.selection())
+
+    def select(self, weights, selection=None, positions=None, team=None, is_pitcher=None,
+               sort=None, descending=True, offset=0, limit=None, snapshot=None):
+        """
+        Score the players and pick the requested page; returns (snapshot, total, rows, points).
+
+        `total` is the number of players matching the filters, `rows` the snapshot
+        rows of the page and `points` their points, rounded to 2 places. Without a
+        sort the players stay in player id order.
+        """
+        snapshot = snapshot or self.get_snapshot()
+        selection = selection or snapshot.selection()
+        _, points = self.points(weights, selection, snapshot)
+        total, rows = snapshot.page(selection, points, positions, team, is_pitcher, sort, descending, offset, limit)
+        return snapshot, total, rows.tolist(), [round(value, 2) for value in points[rows].tolist()]
+
+    def calculate(self, weights, selection=None, **options):
+        """
+        Score the players and return (total, players), the requested page of
+        player dicts with their points. Takes the options of select().
+
+        When the selection isn't one of the stat sets every player dict holds,
+        each also gets its stats for the selection as `stats`.
+        """
+        snapshot, total, rows, points = self.select(weights, selection, **options)
+        selection = selection or snapshot.selection()
+        extra = snapshot.selection_fields(selection, rows)
+        stats = snapshot.stat_columns(selection).as_dicts() if extra else None
+        players = []
+        for row, value in zip(rows, points):
+            player = dict(snapshot.player(row))
+            if stats is not None:
+                player['stats'] = stats[row]
+            player['points'] = value
+            players.append(player)
+        return total, players
+
+    def calculate_json(self, weights, selection=None, **options):
+        """
+        Like calculate(), but returns (total, body) with the page already encoded as a JSON array.
+        Pass `snapshot` to score the snapshot a cache key was made for.
+        """
+        snapshot, total, rows, points = self.select(weights, selection, **options)
+        fields = snapshot.selection_fields(selection or snapshot.selection(), rows)
+        return total, snapshot.payloads.body_with(rows, fields + [('points', encode_numbers(points))])
+
+
+def select_rows(rows, keys, descending=True, offset=0, limit=None):
+    """
+    Sort `rows` by `keys` and return the requested page.
+
+    When only a page is wanted, numeric keys go through np.partition so just
+    the top offset + limit rows are fully sorted. Ties keep snapshot order.
+    """
+    values = keys[rows]
+    wanted = None if limit is None else offset + limit
+    numeric = values.dtype.kind in 'biuf'
+    if numeric and descending:
+        # Sorting the negated values ascending is a descending sort that keeps ties in order
+        values = -values
+
+    if numeric and wanted is not None and wanted < len(rows):
+        # Everything up to the wanted-th smallest value, including all its ties
+        cutoff = np.partition(values, wanted - 1)[wanted - 1]
+        top = np.flatnonzero(values <= cutoff)
+        top = top[np.argsort(values[top], kind='stable')][:wanted]
+        return rows[top][offset:]
+
+    order = np.argsort(values, kind='stable')
+    if descending and not numeric:
+        order = descending_order(values, order)
+    return rows[order][offset:wanted]
+
+
+def descending_order(values, ascending_order):
+    """
+    Reverse a stable ascending order while keeping equal values in their original order.
+    """
+    sorted_values = values[ascending_order]
+    starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]]) if len(values) else []
+    ends = np.r_[starts[1:], len(values)] if len(values) else []
+    groups = [ascending_order[start:end] for start, end in zip(starts[::-1], ends[::-1])]
+    return np.concatenate(groups) if groups else ascending_order
+
+
+engine = ScoringEngine()
@@ -0,0 +1,215 @@
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+import data_version
+from database import db, Player
+from scoring import engine
+
+# Fields kept for each indexed player and returned with every match
+RESULT_FIELDS = ('id', 'name', 'team', 'position', 'is_pitcher')
+
+# Scores for the ways a player can match, best first; fuzzy matches score their trigram similarity (< 1)
+EXACT_NAME = 4.0
+NAME_PREFIX = 3.0
+NAME_TOKENS = 2.0
+TEAM_TOKENS = 1.0
+
+# Fuzzy matches need at least this share of the query's trigrams in their name
+MIN_SIMILARITY = 0.5
+
+NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(text):
+    """
+    Fold accents and case and turn punctuation into spaces: "José Ramírez Jr." -> "jose ramirez jr".
+    """
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    folded = ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+    return NON_ALNUM.sub(' ', folded).strip()
+
+
+def trigrams(text):
+    """
+    Trigrams of each word, padded so word starts weigh more: "al" -> {"  a", " al", "al "}.
+    """
+    grams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SearchIndex:
+    """
+    Prefix and trigram index over player names and teams.
+
+    Name and team words are kept in one sorted list of (word, kind, player id),
+    so the words starting with a prefix are a bisect and a short scan away. Name
+    words are also split into trigrams for typo-tolerant matches when no word matches.
+    """
+
+    def __init__(self):
+        self.players = {}
+        self.names = {}
+        self.words = []
+        self.trigrams = defaultdict(set)
+
+    def __len__(self):
+        return len(self.players)
+
+    def _entries(self, player_id):
+        player = self.players[player_id]
+        entries = [(word, 'name', player_id) for word in set(self.names[player_id].split())]
+        entries += [(word, 'team', player_id) for word in set(normalize(player['team']).split())]
+        return entries
+
+    def add(self, player):
+        player_id = player['id']
+        self.players[player_id] = {field: player.get(field) for field in RESULT_FIELDS}
+        self.names[player_id] = normalize(player['name'])
+        for entry in self._entries(player_id):
+            bisect.insort(self.words, entry)
+        for trigram in trigrams(self.names[player_id]):
+            self.trigrams[trigram].add(player_id)
+
+    def remove(self, player_id):
+        for entry in self._entries(player_id):
+            position = bisect.bisect_left(self.words, entry)
+            if position < len(self.words) and self.words[position] == entry:
+                del self.words[position]
+        for trigram in trigrams(self.names[player_id]):
+            self.trigrams[trigram].discard(player_id)
+            if not self.trigrams[trigram]:
+                del self.trigrams[trigram]
+        del self.players[player_id]
+        del self.names[player_id]
+
+    def update(self, players):
+        """
+        Bring the index in line with `players`, touching only the players that
+        were added, removed or changed. Returns (added, changed, removed).
+        """
+        current = {player['id']: player for player in players}
+        removed = [player_id for player_id in self.players if player_id not in current]
+        changed = [player_id for player_id, player in current.items() if player_id in self.players and
+                   self.players[player_id] != {field: player.get(field) for field in RESULT_FIELDS}]
+        added = [player_id for player_id in current if player_id not in self.players]
+
+        if len(removed) + len(changed) + len(added) > len(current) // 2:
+            # Mostly new data: a fresh build beats many list insertions
+            self.__init__()
+            for player in current.values():
+                self.add(player)
+        else:
+            for player_id in removed + changed:
+                self.remove(player_id)
+            for player_id in changed + added:
+                self.add(current[player_id])
+        return len(added), len(changed), len(removed)
+
+    def prefix_matches(self, prefix, kind):
+        start = bisect.bisect_left(self.words, (prefix,))
+        matches = set()
+        # Index from `start` rather than slice: a slice would copy the rest of the list on every keystroke
+        for position in range(start, len(self.words)):
+            word, word_kind, player_id = self.words[position]
+            if not word.startswith(prefix):
+                break
+            if word_kind == kind:
+                matches.add(player_id)
+        return matches
+
+    def word_matches(self, tokens, kind):
+        """
+        Players with a word starting with every query token.
+        """
+        matches = None
+        for token in sorted(tokens, key=len, reverse=True):
+            found = self.prefix_matches(token, kind)
+            matches = found if matches is None else matches & found
+            if not matches:
+                return set()
+        return matches or set()
+
+    def fuzzy_matches(self, query):
+        query_trigrams = trigrams(query)
+        shared = defaultdict(int)
+        for trigram in query_trigrams:
+            for player_id in self.trigrams.get(trigram, ()):
+                shared[player_id] += 1
+
+        return {player_id: count / len(query_trigrams) for player_id, count in shared.items()
+                if count / len(query_trigrams) >= MIN_SIMILARITY}
+
+    def search(self, query, limit=10):
+        """
+        Return up to `limit` (score, player) pairs for `query`, best first.
+
+        Exact names rank above names starting with the query, then players whose
+        name words start with every query word, then team matches. Only when
+        none of those match are misspellings looked up by trigram.
+        """
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+        tokens = query.split()
+
+        scores = {}
+        for player_id in self.word_matches(tokens, 'team'):
+            scores[player_id] = TEAM_TOKENS
+        for player_id in self.word_matches(tokens, 'name'):
+            name = self.names[player_id]
+            if name == query:
+                scores[player_id] = EXACT_NAME
+            elif name.startswith(query):
+                scores[player_id] = NAME_PREFIX
+            else:
+                scores[player_id] = NAME_TOKENS
+        if not scores:
+            scores = self.fuzzy_matches(query)
+
+        best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], self.names[item[0]], item[0]))
+        return [(round(score, 3), self.players[player_id]) for player_id, score in best]
+
+
+class PlayerSearch:
+    """
+    Search index over the Player table (or the snapshot file being served), kept
+    up to date with the data version.
+
+    The first search after a data refresh reconciles the index with the table,
+    re-indexing only the players that changed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = SearchIndex()
+        self.version = None
+
+    def get_index(self):
+        # Served from a snapshot file there is no table to read. Either way, data
+        # changed by another process is noticed before the version is compared
+        engine.check_data()
+        snapshot = engine.get_snapshot() if engine.snapshot_dir is not None else None
+        with self.lock:
+            if self.version != data_version.current():
+                version = data_version.current()
+                if snapshot is not None:
+                    players = snapshot.identities()
+                else:
+                    columns = [getattr(Player, field) for field in RESULT_FIELDS]
+                    players = [dict(zip(RESULT_FIELDS, row)) for row in db.session.execute(db.select(*columns))]
+                self.index.update(players)
+                self.version = version
+            return self.index
+
+    def search(self, query, limit=10):
+        return self.get_index().search(query, limit)
+
+
+player_search = PlayerSearch()
@@ -0,0 +1,177 @@
+"""
+JSON encoding for the player API responses.
+
+Each player's JSON is encoded once per scoring snapshot, which is rebuilt when
+the data version changes. Responses are assembled by joining those bytes, with
+computed fields such as `points` appended to each player's object, so a request
+never builds or encodes per-player dicts.
+
+orjson or msgspec is used when installed, otherwise the standard library
+encoder; set JSON_ENCODER=json (or orjson/msgspec) to choose one. Keys keep
+their insertion order and non-ASCII text is written as UTF-8.
+"""
+import json
+import os
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+EMPTY_LIST = b'[]'
+
+# Bytes sent per write when streaming a body from a snapshot file
+STREAM_CHUNK_SIZE = 1 << 16
+
+
+def get_encoder(name=None):
+    """
+    Return (name, dumps) for the named encoder, or the fastest one installed.
+    `dumps` turns an object into JSON bytes.
+    """
+    if name in (None, '', 'orjson') and orjson is not None:
+        return 'orjson', orjson.dumps
+    if name in (None, '', 'msgspec') and msgspec is not None:
+        return 'msgspec', msgspec.json.Encoder().encode
+    if name not in (None, '', 'json', 'orjson', 'msgspec'):
+        raise ValueError(f"Unknown JSON encoder {name}; use orjson, msgspec or json")
+
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    return 'json', lambda obj: encoder.encode(obj).encode()
+
+
+ENCODER, dumps = get_encoder(os.environ.get('JSON_ENCODER'))
+
+
+class PlayerPayloads:
+    """
+    Encoded JSON for every player of a snapshot, in snapshot row order.
+
+    A fragment is a player's object without its closing brace, so fields can be
+    appended before it is closed. The body listing every player is built on first
+    use and kept.
+    """
+
+    def __init__(self, players):
+        self.fragments = [dumps(player)[:-1] for player in players]
+        self.all_players = None
+
+    def body(self, rows=None):
+        """
+        A JSON array of the players at `rows` (every player when None).
+        """
+        if rows is None:
+            if self.all_players is None:
+                self.all_players = self.join(self.fragments)
+            return self.all_players
+        return self.join([self.fragments[row] for row in rows])
+
+    def layout(self):
+        """
+        (body, bounds): the body listing every player and the (start, end) offsets
+        of each player's fragment within it, as MappedPayloads reads them back.
+        """
+        bounds = np.zeros((len(self.fragments), 2), dtype=np.int64)
+        start = 1
+        for row, fragment in enumerate(self.fragments):
+            bounds[row] = start, start + len(fragment)
+            start += len(fragment) + 2
+        return self.body(), bounds
+
+    @staticmethod
+    def join(fragments):
+        if not fragments:
+            return EMPTY_LIST
+        return b'[' + b'},'.join(fragments) + b'}]'
+
+    def body_with(self, rows, fields):
+        """
+        A JSON array of the players at `rows` with fields appended to each one.
+        `fields` is a list of (name, values), `values` holding one encoded JSON
+        value per row, such as encode_numbers() returns.
+        """
+        if not rows:
+            return EMPTY_LIST
+        names = [b',' + dumps(name) + b':' for name, _ in fields]
+        # One join over references to the cached fragments, so no per-player bytes are copied
+        parts = [b'[']
+        fragments = self.fragments
+        if len(fields) == 1:
+            name, (_, values) = names[0], fields[0]
+            for row, value in zip(rows, values):
+                parts += (fragments[row], name, value, b'},')
+        else:
+            for row, values in zip(rows, zip(*[values for _, values in fields])):
+                parts.append(fragments[row])
+                for name, value in zip(names, values):
+                    parts += (name, value)
+                parts.append(b'},')
+        parts[-1] = b'}]'
+        return b''.join(parts)
+
+
+class MappedFragments:
+    """
+    Sequence of the fragments within a mapped body, as memoryviews of the mapping.
+    """
+
+    def __init__(self, data, bounds):
+        self.view = memoryview(data)
+        self.bounds = bounds.tolist()
+
+    def __len__(self):
+        return len(self.bounds)
+
+    def __getitem__(self, row):
+        start, end = self.bounds[row]
+        return self.view[start:end]
+
+
+class MappedBody:
+    """
+    A response body held in a memory mapping. Iterating it yields the bytes
+    STREAM_CHUNK_SIZE at a time, so sending it never copies the whole body;
+    len() is its size.
+    """
+
+    def __init__(self, data):
+        self.view = memoryview(data)
+
+    def __len__(self):
+        return len(self.view)
+
+    def __iter__(self):
+        for start in range(0, len(self.view), STREAM_CHUNK_SIZE):
+            yield self.view[start:start + STREAM_CHUNK_SIZE].tobytes()
+
+
+class MappedPayloads(PlayerPayloads):
+    """
+    Player payloads read from a snapshot file. `data` is the body listing every
+    player, as PlayerPayloads.layout() returns it, and `bounds` the offsets of
+    each player's fragment within it. Fragments are slices of the mapping and
+    the body listing every player is a MappedBody over it, so a process holds
+    no copy of the payloads beyond the responses it builds.
+    """
+
+    def __init__(self, data, bounds):
+        self.data = data
+        self.fragments = MappedFragments(data, bounds)
+        self.all_players = MappedBody(data)
+
+
+def encode_numbers(values):
+    """
+    Each of a list of numbers as JSON bytes.
+    """
+    if not values:
+        return []
+    # Numbers never contain commas, so one encoded list splits into the encoded values
+    return dumps(values)[1:-1].split(b',')
@@ -0,0 +1,119 @@
+import threading
+
+import numpy as np
+
+import data_version
+from database import BATTING_STATS, PITCHING_STATS
+from scoring import engine
+
+
+class StatMatrix:
+    """
+    Z-scored stat vectors for one group of players (batters or pitchers).
+
+    Each row holds the group's stats from every stat set, so players are
+    compared on last season, the projection and the current season at once.
+    """
+
+    def __init__(self, snapshot, rows, stats):
+        self.rows = rows
+        self.columns = [(selection, stat) for selection in snapshot.stat_sets for stat in stats]
+        matrix = np.column_stack([snapshot.stat_columns(selection).stats[stat][rows].astype(np.float64)
+                                  for selection, stat in self.columns]) \
+            if len(rows) else np.zeros((0, len(self.columns)))
+
+        mean = matrix.mean(axis=0) if len(rows) else np.zeros(len(self.columns))
+        std = matrix.std(axis=0) if len(rows) else np.ones(len(self.columns))
+        std[std == 0] = 1  # A stat everyone shares says nothing about similarity
+        self.vectors = (matrix - mean) / std
+        self.norms = (self.vectors ** 2).sum(axis=1)
+        self.positions = snapshot.text['position'][rows]
+
+    def distances(self, members):
+        """
+        Euclidean distances from the players at group indexes `members` to every
+        player in the group, as a len(members) x group size matrix.
+        """
+        queries = self.vectors[members]
+        # |a - b|^2 = |a|^2 + |b|^2 - 2ab, for all pairs in one matrix product
+        squared = self.norms[members][:, None] + self.norms[None, :] - 2 * queries @ self.vectors.T
+        return np.sqrt(np.maximum(squared, 0))
+
+
+class SimilarityIndex:
+    """
+    Nearest-neighbour lookups over a scoring Snapshot.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.groups = {
+            False: StatMatrix(snapshot, snapshot.batters.rows, BATTING_STATS),
+            True: StatMatrix(snapshot, snapshot.pitchers.rows, PITCHING_STATS)
+        }
+        # Player id -> (is_pitcher, index within that group)
+        self.members = {}
+        for is_pitcher, group in self.groups.items():
+            for member, player_id in enumerate(snapshot.ids[group.rows].tolist()):
+                self.members[player_id] = (is_pitcher, member)
+
+    def snapshot_row(self, player_id):
+        is_pitcher, member = self.members[player_id]
+        return int(self.groups[is_pitcher].rows[member])
+
+    def similar(self, player_ids, k=10, positions=None):
+        """
+        The k players most similar to each of `player_ids`, which must all be
+        batters or all pitchers. Returns one list of (distance, snapshot row)
+        pairs per player, nearest first, leaving the player out of their own list.
+        """
+        found = [self.members[player_id] for player_id in player_ids]
+        if len({is_pitcher for is_pitcher, _ in found}) > 1:
+            raise ValueError("Players must all be batters or all pitchers")
+        if not found:
+            return []
+
+        group = self.groups[found[0][0]]
+        members = np.array([member for _, member in found])
+        candidates = np.arange(len(group.rows))
+        if positions:
+            candidates = np.flatnonzero(np.isin(group.positions, positions))
+
+        distances = group.distances(members)[:, candidates]
+        results = []
+        for member, row_distances in zip(members.tolist(), distances):
+            keep = candidates != member
+            pool, pool_distances = candidates[keep], row_distances[keep]
+            top = np.arange(len(pool))
+            if k < len(pool):
+                # Everything up to the k-th smallest distance, ties included, so equal distances keep id order
+                cutoff = np.partition(pool_distances, k - 1)[k - 1]
+                top = np.flatnonzero(pool_distances <= cutoff)
+            top = top[np.argsort(pool_distances[top], kind='stable')][:k]
+            results.append([(float(pool_distances[i]), int(group.rows[pool[i]])) for i in top.tolist()])
+        return results
+
+
+class SimilarityEngine:
+    """
+    Builds the SimilarityIndex from the scoring snapshot once per data version.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = None
+        data_version.subscribe(self.invalidate)
+
+    def get_index(self):
+        snapshot = engine.get_snapshot()
+        with self.lock:
+            if self.index is None or self.index.snapshot is not snapshot:
+                self.index = SimilarityIndex(snapshot)
+            return self.index
+
+    def invalidate(self):
+        with self.lock:
+            self.index = None
+
+
+similarity = SimilarityEngine()
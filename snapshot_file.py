@@ -0,0 +1,163 @@
+"""
+Prebuilt, memory-mapped snapshots of the player data, for serving without a database.
+
+A snapshot file is a JSON header followed by raw NumPy arrays: the columns the
+scoring engine reads and each player's encoded JSON. Opening one maps the file
+read-only and wraps the arrays in place, so it takes milliseconds whatever the
+league size, and every process serving the same file shares its pages in the
+OS page cache instead of holding its own copy.
+
+Files are named after a hash of their contents, e.g. snapshot.3fa2c1d04b9e.bin.
+CURRENT in the same directory names the one to serve; publish() writes a new
+file and then swaps CURRENT, so running processes pick it up on their next check.
+"""
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+SNAPSHOT_FORMAT_VERSION = 1
+MAGIC = b'DDSNAP01'
+CURRENT_FILE = 'CURRENT'
+
+# Arrays start on 64-byte boundaries so they can be used straight from the mapping
+ALIGNMENT = 64
+
+# Snapshot files kept after publishing; processes may still have the previous one mapped
+KEEP_SNAPSHOTS = 2
+
+SNAPSHOT_NAME = re.compile(r'^snapshot\.(?P<hash>[0-9a-f]{12})\.bin$')
+
+
+class NoSnapshotError(LookupError):
+    """
+    Raised when a snapshot directory has no current snapshot to serve.
+    """
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_snapshot(path, arrays, **meta):
+    """
+    Write `arrays` ({name: ndarray}) and `meta` to a snapshot file at `path`.
+    Returns the content hash the file is named after.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _aligned(offset + array.nbytes)
+
+    digest = hashlib.sha256()
+    for name, array in arrays.items():
+        digest.update(name.encode())
+        digest.update(array.dtype.str.encode())
+        digest.update(array.data)
+    version = digest.hexdigest()[:12]
+
+    header = json.dumps({'format': SNAPSHOT_FORMAT_VERSION, 'version': version,
+                         'created_at': datetime.now().isoformat(), 'meta': meta,
+                         'arrays': layout}).encode()
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+    with open(path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<Q', len(header)) + header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(array.data)
+        # Pad to the end of the last array so every region lies inside the file
+        f.truncate(max(data_start + offset, f.tell()))
+    return version
+
+
+class MappedSnapshot:
+    """
+    A snapshot file mapped read-only. `arrays` are NumPy views on the mapping and
+    `header` holds the version, creation time and `meta` the file was written with.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a snapshot file")
+        header_length, = struct.unpack_from('<Q', self.buffer, len(MAGIC))
+        self.header = json.loads(self.buffer[len(MAGIC) + 8:len(MAGIC) + 8 + header_length])
+        if self.header['format'] != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"{path} has snapshot format {self.header['format']}, "
+                             f"expected {SNAPSHOT_FORMAT_VERSION}")
+
+        self.path = path
+        self.version = self.header['version']
+        self.meta = self.header['meta']
+        data_start = _aligned(len(MAGIC) + 8 + header_length)
+        self.arrays = {}
+        for name, layout in self.header['arrays'].items():
+            dtype = np.dtype(layout['dtype'])
+            count = int(np.prod(layout['shape'], dtype=np.int64))
+            self.arrays[name] = np.frombuffer(self.buffer, dtype=dtype, count=count,
+                                              offset=data_start + layout['offset']).reshape(layout['shape'])
+
+
+def current_snapshot(directory):
+    """
+    Path of the snapshot CURRENT names in `directory`, or None if there is none.
+    """
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    path = os.path.join(directory, name)
+    return path if name and os.path.exists(path) else None
+
+
+def publish(directory, arrays, **meta):
+    """
+    Write a snapshot into `directory`, make it the current one and delete all but
+    the last KEEP_SNAPSHOTS files. Returns its path.
+    """
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.snapshot.', suffix='.tmp', dir=directory)
+    os.close(fd)
+    try:
+        version = write_snapshot(tmp_path, arrays, **meta)
+        name = f'snapshot.{version}.bin'
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, os.path.join(directory, name))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{CURRENT_FILE}.', suffix='.tmp', dir=directory)
+    with os.fdopen(fd, 'w') as f:
+        f.write(name + '\n')
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, os.path.join(directory, CURRENT_FILE))
+
+    prune_snapshots(directory, keep=name)
+    return os.path.join(directory, name)
+
+
+def prune_snapshots(directory, keep=None, keep_snapshots=KEEP_SNAPSHOTS):
+    """
+    Delete all but the newest `keep_snapshots` snapshot files, never deleting `keep`.
+    Processes that still have a deleted file mapped keep reading it.
+    """
+    snapshots = [name for name in os.listdir(directory) if SNAPSHOT_NAME.match(name)]
+    snapshots.sort(key=lambda name: os.path.getmtime(os.path.join(directory, name)), reverse=True)
+    removed = []
+    for name in snapshots[keep_snapshots:]:
+        if name != keep:
+            os.remove(os.path.join(directory, name))
+            removed.append(name)
+    return removed
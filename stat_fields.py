@@ -0,0 +1,35 @@
+# Stats in each block, in the order they are written
+BATTING_STATS = ('avg', 'runs', 'rbi', 'steals', 'hr', 'hits', 'babip')
+PITCHING_STATS = ('wins', 'era', 'strikeouts', 'walks', 'saves', 'runs_scored', 'fip')
+STAT_NAMES = BATTING_STATS + PITCHING_STATS
+FLOAT_STATS = ('avg', 'babip', 'era', 'fip')
+
+# A season's stats as played, or as projected before the season
+STAT_KINDS = ('actual', 'projected')
+
+
+def stat_set_name(season, kind):
+    return f'{season}_{kind}'
+
+
+def stat_sets(current_year):
+    """
+    The stat blocks a fetch in `current_year` writes, as stats_<set> in the JSON
+    files: last season, this season's projection and this season so far.
+    """
+    return (stat_set_name(current_year - 1, 'actual'),
+            stat_set_name(current_year, 'projected'),
+            stat_set_name(current_year, 'actual'))
+
+
+def parse_stat_set(name):
+    """
+    (season, kind) of a stat set name such as '2025_actual' or '2026_projected'.
+    A bare season ('2024', as older files have it) is its actual stats. Raises
+    ValueError for anything else.
+    """
+    season, _, kind = str(name).partition('_')
+    kind = kind or 'actual'
+    if not season.isdigit() or kind not in STAT_KINDS:
+        raise ValueError(f"Unknown stat set {name}")
+    return int(season), kind
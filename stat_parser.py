@@ -0,0 +1,117 @@
+"""
+Turns hydrated MLB Stats API person records into the player objects written to the JSON files.
+
+Each stat is a row in a table: the API field it is read from and its type, or
+the function deriving it from the whole split. Parsing never touches the
+network, so it runs the same on live responses and on an archived crawl.
+"""
+from stat_fields import FLOAT_STATS, STAT_NAMES, stat_set_name
+
+PITCHER_POSITIONS = ('P', 'SP', 'RP', 'CL')
+
+# Approximation of the yearly FIP constant
+FIP_CONSTANT = 3.10
+
+
+def number(stats, field, kind, default=0):
+    """
+    A split field as `kind`; zero, missing and unparseable values (such as an ERA of "-.--") give `default`.
+    """
+    try:
+        return kind(stats.get(field, 0)) or default
+    except (TypeError, ValueError):
+        return default
+
+
+def babip(stats):
+    # BABIP = (H - HR) / (AB - K - HR + SF), without SF, which isn't always available
+    at_bats = number(stats, 'atBats', int, 1)
+    hits = number(stats, 'hits', int)
+    hr = number(stats, 'homeRuns', int)
+    denominator = at_bats - number(stats, 'strikeOuts', int) - hr
+    return round((hits - hr) / denominator, 3) if denominator > 0 else 0.0
+
+
+def fip(stats):
+    # FIP = (13 * HR + 3 * BB - 2 * K) / IP + constant
+    innings_pitched = number(stats, 'inningsPitched', float, 1.0)
+    value = (13 * number(stats, 'homeRuns', int) + 3 * number(stats, 'baseOnBalls', int)
+             - 2 * number(stats, 'strikeOuts', int)) / innings_pitched + FIP_CONSTANT
+    return round(value, 2)
+
+
+# Per API stat group: (stat, API field and type, or a function of the split), in STAT_NAMES order
+STAT_TABLE = {
+    'hitting': (
+        ('avg', ('avg', float)),
+        ('runs', ('runs', int)),
+        ('rbi', ('rbi', int)),
+        ('steals', ('stolenBases', int)),
+        ('hr', ('homeRuns', int)),
+        ('hits', ('hits', int)),
+        ('babip', babip),
+    ),
+    'pitching': (
+        ('wins', ('wins', int)),
+        ('era', ('era', float)),
+        ('strikeouts', ('strikeOuts', int)),
+        ('walks', ('baseOnBalls', int)),
+        ('saves', ('saves', int)),
+        ('runs_scored', ('runs', int)),
+        ('fip', fip),
+    ),
+}
+
+
+def empty_stats():
+    return {stat: 0.0 if stat in FLOAT_STATS else 0 for stat in STAT_NAMES}
+
+
+def parse_split(group, stats):
+    """
+    The stats of one API split of `group` ('hitting' or 'pitching').
+    """
+    parsed = {}
+    for stat, source in STAT_TABLE[group]:
+        parsed[stat] = source(stats) if callable(source) else number(stats, *source)
+    return parsed
+
+
+def season_stats(person, seasons):
+    """
+    {season: stats} for each of `seasons` (years as strings), with every stat in
+    STAT_NAMES order and zeros where the person has no split. When a season has
+    several splits of a group, the last one wins.
+    """
+    stats = {season: empty_stats() for season in seasons}
+    for stat_group in person.get('stats', []):
+        group = stat_group['group']['displayName']
+        if group not in STAT_TABLE:
+            continue
+        for split in stat_group['splits']:
+            season = split.get('season')
+            if season in stats:
+                stats[season].update(parse_split(group, split['stat']))
+    return stats
+
+
+def build_player(player_info, person, current_year):
+    """
+    Build the player object written to the JSON files from a hydrated person record.
+
+    The stat sets are named after the seasons they hold (see stat_fields.stat_sets).
+    Projections are left at zero; fetch_data.build_players fills them in from the
+    player's whole history.
+    """
+    previous_season, current_season = str(current_year - 1), str(current_year)
+    seasons = season_stats(person, (previous_season, current_season))
+    return {
+        'id': player_info['id'],
+        'name': player_info['full_name'],
+        'team': player_info['team_name'],
+        'position': player_info['position'],
+        'is_pitcher': player_info['position'] in PITCHER_POSITIONS,
+        f"stats_{stat_set_name(previous_season, 'actual')}": seasons[previous_season],
+        f"stats_{stat_set_name(current_season, 'projected')}": empty_stats(),
+        f"stats_{stat_set_name(current_season, 'actual')}": seasons[current_season]
+    }
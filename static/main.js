@@ -13,6 +13,7 @@ document.addEventListener('DOMContentLoaded', function() {
     let displayedPlayers = [];
     let currentYear = '2024';
     let dataType = 'actual'; // 'actual' or 'projected'
+    let currentStatSet = '2024'; // Players hold their stats as stats_<year>_<type>
     let currentSort = {column: 'points', direction: 'desc'};
     let searchTerm = '';
     
@@ -56,16 +57,7 @@ document.addEventListener('DOMContentLoaded', function() {
             yearBtns.forEach(b => b.classList.remove('active'));
             this.classList.add('active');
             
-            const yearData = this.dataset.year;
-            if (yearData.includes('_')) {
-                const [year, type] = yearData.split('_');
-                currentYear = year;
-                dataType = type;
-            } else {
-                currentYear = yearData;
-                dataType = 'actual';
-            }
-            
+            selectStatSet(this.dataset.year);
             filterAndDisplayPlayers();
         });
     });
@@ -139,47 +131,88 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     // Functions
+    // Decode players.columns.json (one array per field) back into player objects
+    function decodeColumns(data) {
+        const players = [];
+        for (let i = 0; i < data.count; i++) {
+            const player = {};
+            data.fields.forEach(field => {
+                player[field] = data.columns[field][i];
+            });
+            data.stat_sets.forEach(statSet => {
+                const stats = {};
+                data.stats.forEach(stat => {
+                    stats[stat] = data.columns[`stats_${statSet}.${stat}`][i];
+                });
+                player[`stats_${statSet}`] = stats;
+            });
+            players.push(player);
+        }
+        return players;
+    }
+    
+    // manifest.json maps each data file to its content-hashed copy, which browsers can cache for good
+    let dataManifest = null;
+    
+    async function dataUrl(filename) {
+        if (dataManifest === null) {
+            try {
+                const response = await fetch('./data/manifest.json', {cache: 'no-cache'});
+                dataManifest = response.ok ? await response.json() : {};
+            } catch (error) {
+                dataManifest = {};
+            }
+        }
+        const entry = (dataManifest.files || {})[filename];
+        return `./data/${entry ? entry.path : filename}`;
+    }
+    
+    // Players from the columnar file, fetched once and filtered client-side
+    let columnarPlayers = null;
+    
+    async function loadColumnarPlayers() {
+        if (columnarPlayers === null) {
+            const response = await fetch(await dataUrl('players.columns.json'));
+            if (!response.ok) {
+                return null;
+            }
+            columnarPlayers = decodeColumns(await response.json());
+        }
+        return columnarPlayers;
+    }
+    
     async function loadData(filter = 'all') {
         try {
-            // Determine which data file to fetch based on filter
-            let dataFile;
-            switch(filter) {
-                case 'batter':
-                    dataFile = './data/batters.json';
-                    break;
-                case 'pitcher':
-                    dataFile = './data/pitchers.json';
-                    break;
-                default:
-                    dataFile = './data/players.json';
+            let players = null;
+            try {
+                players = await loadColumnarPlayers();
+            } catch (error) {
+                console.warn('Could not load players.columns.json, using the per-group files', error);
             }
             
-            // Fetch player data
-            const response = await fetch(dataFile);
-            if (!response.ok) {
-                // If separated files don't exist, fall back to combined file
-                console.warn(`Could not load ${dataFile}, falling back to players.json`);
-                const fallbackResponse = await fetch('./data/players.json');
-                allPlayers = await fallbackResponse.json();
-                
-                // Filter the data manually if we're using the fallback
+            if (players !== null) {
                 if (filter === 'batter') {
-                    allPlayers = allPlayers.filter(player => !player.is_pitcher);
+                    allPlayers = players.filter(player => !player.is_pitcher);
                 } else if (filter === 'pitcher') {
-                    allPlayers = allPlayers.filter(player => player.is_pitcher);
+                    allPlayers = players.filter(player => player.is_pitcher);
+                } else {
+                    allPlayers = players;
                 }
             } else {
-                allPlayers = await response.json();
+                await loadDataFile(filter);
             }
             
             // Fetch last updated timestamp
-            const timestampResponse = await fetch('./data/last_updated.json');
+            const timestampResponse = await fetch(await dataUrl('last_updated.json'));
             const timestampData = await timestampResponse.json();
             
             // Format and display timestamp
             const lastUpdated = new Date(timestampData.timestamp);
             dataTimestamp.textContent = `Last updated: ${lastUpdated.toLocaleDateString()} at ${lastUpdated.toLocaleTimeString()}`;
             
+            // The seasons on the year buttons come from the data itself
+            applyStatSets(allPlayers);
+            
             // Calculate player values with default weights
             calculatePlayerValues();
             
@@ -192,6 +225,68 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
+    function selectStatSet(statSet) {
+        const [year, type] = statSet.split('_');
+        currentStatSet = statSet;
+        currentYear = year;
+        dataType = type || 'actual';
+    }
+    
+    function applyStatSets(players) {
+        // Label the year buttons with the stat sets the players hold, e.g. stats_2025_actual
+        if (!players.length) return;
+        const statSets = Object.keys(players[0])
+            .filter(key => key.startsWith('stats_'))
+            .map(key => key.slice('stats_'.length));
+        yearBtns.forEach((btn, index) => {
+            const statSet = statSets[index];
+            if (!statSet) return;
+            const [year, type] = statSet.split('_');
+            btn.dataset.year = statSet;
+            btn.textContent = `${year} ${type === 'projected' ? 'Projected' : 'Actual'}`;
+            if (btn.classList.contains('active')) {
+                selectStatSet(statSet);
+            }
+        });
+    }
+    
+    function statsFor(player) {
+        return player[`stats_${currentStatSet}`];
+    }
+    
+    async function loadDataFile(filter) {
+        // Determine which data file to fetch based on filter
+        let dataFile;
+        switch(filter) {
+            case 'batter':
+                dataFile = 'batters.json';
+                break;
+            case 'pitcher':
+                dataFile = 'pitchers.json';
+                break;
+            default:
+                dataFile = 'players.json';
+        }
+        
+        // Fetch player data
+        const response = await fetch(await dataUrl(dataFile));
+        if (!response.ok) {
+            // If separated files don't exist, fall back to combined file
+            console.warn(`Could not load ${dataFile}, falling back to players.json`);
+            const fallbackResponse = await fetch(await dataUrl('players.json'));
+            allPlayers = await fallbackResponse.json();
+            
+            // Filter the data manually if we're using the fallback
+            if (filter === 'batter') {
+                allPlayers = allPlayers.filter(player => !player.is_pitcher);
+            } else if (filter === 'pitcher') {
+                allPlayers = allPlayers.filter(player => player.is_pitcher);
+            }
+        } else {
+            allPlayers = await response.json();
+        }
+    }
+    
     function calculatePlayerValues() {
         // Get weights from input fields
         const weights = {};
@@ -204,12 +299,7 @@ document.addEventListener('DOMContentLoaded', function() {
             const playerCopy = {...player};
             
             // Get the correct stats based on year and data type
-            let stats;
-            if (currentYear === '2025') {
-                stats = dataType === 'actual' ? playerCopy.stats_2025_actual : playerCopy.stats_2025_projected;
-            } else {
-                stats = playerCopy.stats_2024;
-            }
+            let stats = statsFor(playerCopy);
             
             // Make sure stats object exists with proper defaults
             if (!stats) {
@@ -322,15 +412,8 @@ document.addEventListener('DOMContentLoaded', function() {
                 bValue = b.points || 0;
             } else {
                 // Get the correct stats based on year and data type
-                let aStats, bStats;
-                
-                if (currentYear === '2025') {
-                    aStats = dataType === 'actual' ? a.stats_2025_actual : a.stats_2025_projected;
-                    bStats = dataType === 'actual' ? b.stats_2025_actual : b.stats_2025_projected;
-                } else {
-                    aStats = a.stats_2024;
-                    bStats = b.stats_2024;
-                }
+                let aStats = statsFor(a);
+                let bStats = statsFor(b);
                 
                 // Handle missing stats objects
                 if (!aStats) {
@@ -447,12 +530,7 @@ document.addEventListener('DOMContentLoaded', function() {
             row.setAttribute('data-is-pitcher', player.is_pitcher);
             
             // Get the correct stats based on year and data type
-            let stats;
-            if (currentYear === '2025') {
-                stats = dataType === 'actual' ? player.stats_2025_actual : player.stats_2025_projected;
-            } else {
-                stats = player.stats_2024;
-            }
+            let stats = statsFor(player);
             
             // Make sure stats object exists with proper defaults
             if (!stats) {
@@ -568,12 +646,7 @@ document.addEventListener('DOMContentLoaded', function() {
         const container = document.getElementById('player-card-container');
         
         // Get current stats based on year and data type
-        let stats;
-        if (currentYear === '2025') {
-            stats = dataType === 'actual' ? player.stats_2025_actual : player.stats_2025_projected;
-        } else {
-            stats = player.stats_2024;
-        }
+        let stats = statsFor(player);
 
         if (!stats) {
             stats = {
@@ -0,0 +1,24 @@
+from collections import defaultdict
+
+import pytest
+
+import load_data
+from database import STAT_NAMES
+from scoring import Snapshot
+
+
+def memory_snapshot(players):
+    # The same in-memory snapshot load_data.build_snapshot() writes out
+    columns = ('id', 'name', 'team', 'position', 'is_pitcher')
+    rows = sorted(tuple(load_data.player_row(player)[column] for column in columns) for player in players)
+    seasons = defaultdict(list)
+    for player in players:
+        for season in load_data.season_rows(player):
+            seasons[season['season'], season['kind']].append(
+                (season['player_id'],) + tuple(season[stat] for stat in STAT_NAMES))
+    return Snapshot(rows, seasons, lambda selection: seasons.get((selection.first, selection.kind), []))
+
+
+@pytest.fixture
+def make_snapshot():
+    return memory_snapshot
@@ -0,0 +1,297 @@
+"""
+The Flask API over a scratch SQLite database, loaded from synthetic players.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+# app reads DATABASE_URL at import time, so point it at a scratch database first
+TEST_DIR = tempfile.mkdtemp(prefix='diamonddraft-test-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+os.environ.pop('SNAPSHOT_DIR', None)
+
+import data_assets  # noqa: E402
+import load_data  # noqa: E402
+import metrics  # noqa: E402
+import scoring  # noqa: E402
+from app import app, db  # noqa: E402
+from benchmarks.synthetic import synthetic_players  # noqa: E402
+from database import DataVersion, Player, PlayerSeasonStats  # noqa: E402
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def players_file(count, seed=42):
+    path = os.path.join(TEST_DIR, f'players-{count}-{seed}.json')
+    with open(path, 'w') as f:
+        json.dump(synthetic_players(count, seed=seed, current_year=2025), f)
+    return path
+
+
+def load_in_other_process(path):
+    # As `python load_data.py` or another gunicorn worker would
+    subprocess.run([sys.executable, 'load_data.py', path], cwd=REPO_DIR, check=True, capture_output=True,
+                   env=dict(os.environ, PYTHONPATH=REPO_DIR))
+
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        db.create_all()
+        load_data.load_players(players_file(50))
+    return app.test_client()
+
+
+def test_load_from_another_process_is_noticed(client, monkeypatch):
+    monkeypatch.setattr(scoring, 'DATA_CHECK_INTERVAL', 0)
+    response = client.get('/api/players?limit=100')
+    assert response.headers['X-Total-Count'] == '50'
+
+    load_in_other_process(players_file(80, seed=1))
+
+    response = client.get('/api/players?limit=100')
+    assert response.status_code == 200
+    assert response.headers['X-Total-Count'] == '80'
+    assert len(response.get_json()) == 80
+    calculated = client.post('/api/calculate', json={'hr': 1})
+    assert len(calculated.get_json()) == 80
+    search = client.get('/api/search?q=Player 70&fallback=false').get_json()
+    assert [player['id'] for player in search['results']] == [70]
+
+
+def test_failed_load_leaves_the_old_league_in_place(client, tmp_path):
+    path = players_file(80, seed=1)
+    truncated = tmp_path / 'truncated.json'
+    with open(path) as f:
+        text = f.read()
+    truncated.write_text(text[:len(text) // 2])
+
+    with app.app_context():
+        version = db.session.execute(db.select(DataVersion.version)).scalar()
+        with pytest.raises(ValueError):
+            load_data.load_players(str(truncated))
+        assert db.session.execute(db.select(db.func.count(Player.id))).scalar() == 50
+        assert db.session.execute(db.select(db.func.count()).select_from(PlayerSeasonStats)).scalar() > 0
+        assert db.session.execute(db.select(DataVersion.version)).scalar() == version
+    assert client.get('/api/players?limit=100').headers['X-Total-Count'] == '50'
+
+
+def ids(response):
+    assert response.status_code == 200
+    return [player['id'] for player in response.get_json()]
+
+
+def ranked(players, stat, stat_set='2025_projected', descending=True):
+    # Ties stay in id order, as in the API
+    return [player['id'] for player in sorted(
+        players, key=lambda player: ((-1 if descending else 1) * player[f'stats_{stat_set}'][stat], player['id']))]
+
+
+def test_players_are_paged_in_id_order(client):
+    response = client.get('/api/players?offset=5&limit=10')
+    assert ids(response) == list(range(6, 16))
+    assert response.headers['X-Total-Count'] == '50'
+    assert ids(client.get('/api/players?offset=45')) == list(range(46, 51))
+    assert ids(client.get('/api/players?offset=60')) == []
+
+
+def test_players_sort_by_stats_and_fields(client):
+    players = synthetic_players(50, seed=42, current_year=2025)
+
+    assert ids(client.get('/api/players?sort=hr&limit=100')) == ranked(players, 'hr')
+    assert ids(client.get('/api/players?sort=era&order=asc&limit=100')) == ranked(players, 'era', descending=False)
+    assert ids(client.get('/api/players?sort=hr&year=2024&limit=100')) == ranked(players, 'hr', '2024_actual')
+    assert ids(client.get('/api/players?sort=name&order=asc&limit=5')) == \
+        [player['id'] for player in sorted(players, key=lambda player: player['name'])][:5]
+    # top_k is the first k by the sort, the first stat when none is given
+    assert ids(client.get('/api/players?top_k=5')) == ranked(players, 'avg')[:5]
+
+
+@pytest.mark.parametrize('query, matches', [
+    ('position=SS,C', lambda player: player['position'] in ('SS', 'C')),
+    ('team=Team 1', lambda player: player['team'] == 'Team 1'),
+    ('is_pitcher=true', lambda player: player['is_pitcher']),
+    ('is_pitcher=0&position=1B', lambda player: not player['is_pitcher'] and player['position'] == '1B'),
+])
+def test_players_filter(client, query, matches):
+    expected = [player['id'] for player in synthetic_players(50, seed=42, current_year=2025) if matches(player)]
+    assert expected
+
+    response = client.get(f'/api/players?{query}&limit=2')
+    assert ids(response) == expected[:2]
+    assert response.headers['X-Total-Count'] == str(len(expected))
+
+
+@pytest.mark.parametrize('query, error', [
+    ('offset=-1', 'offset must not be negative'),
+    ('limit=ten', 'limit must be an integer'),
+    ('top_k=-3', 'top_k must not be negative'),
+    ('sort=salary', 'sort must be one of'),
+    ('order=up', 'order must be asc or desc'),
+    ('is_pitcher=maybe', 'is_pitcher must be true or false'),
+])
+def test_players_reject_bad_options(client, query, error):
+    response = client.get(f'/api/players?{query}')
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith(error)
+
+
+def test_ids_missing_from_a_stale_snapshot_never_fail(client, monkeypatch):
+    monkeypatch.setattr(scoring, 'DATA_CHECK_INTERVAL', 3600)
+    client.get('/api/players?limit=100')
+
+    # Within the check interval the snapshot is stale, but SQL already sees the new players
+    load_in_other_process(players_file(80, seed=1))
+
+    response = client.get('/api/players?limit=100')
+    assert response.status_code == 200
+    assert [player['id'] for player in response.get_json()] == list(range(1, 81))
+    response = client.get('/api/players?sort=hr&limit=100')
+    assert response.status_code == 200
+    assert len(response.get_json()) == 80
+
+
+@pytest.mark.parametrize('limit', ['0', '-5'])
+def test_search_rejects_limits_below_one(client, limit):
+    response = client.get(f'/api/search?q=Player&limit={limit}')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'limit must be at least 1'}
+
+
+@pytest.mark.parametrize('body', [{'hr': 1, 'slots': [1, 2]}, {'weights': [1, 2]}, [1, 2]])
+def test_simulate_draft_rejects_non_object_settings(client, body):
+    response = client.post('/api/simulate-draft', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def etag_in_other_process(body):
+    script = ("import json, sys\nfrom app import app\n"
+              "print(app.test_client().post('/api/calculate', json=json.loads(sys.argv[1])).headers['ETag'])")
+    result = subprocess.run([sys.executable, '-c', script, json.dumps(body)], cwd=REPO_DIR, check=True,
+                            capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=REPO_DIR))
+    return result.stdout.split()[-1]
+
+
+def test_calculate_etags_name_the_same_data_in_every_process(client, monkeypatch):
+    monkeypatch.setattr(scoring, 'DATA_CHECK_INTERVAL', 0)
+    body = {'hr': 4, 'era': -2}
+    # This process has seen two loads; a fresh process only the last one
+    first = client.post('/api/calculate', json=body).headers['ETag']
+    with app.app_context():
+        load_data.load_players(players_file(80, seed=1))
+    second = client.post('/api/calculate', json=body).headers['ETag']
+
+    assert second != first
+    assert etag_in_other_process(body) == second
+    assert client.post('/api/calculate', json=body, headers={'If-None-Match': first}).status_code == 200
+    assert client.post('/api/calculate', json=body, headers={'If-None-Match': second}).status_code == 304
+
+
+@pytest.mark.parametrize('body', [[1, 2], 'hr', 4])
+def test_calculate_rejects_non_object_bodies(client, body):
+    response = client.post('/api/calculate', json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'The body must be a JSON object of weights'}
+
+
+def test_calculate_accepts_a_list_of_positions(client):
+    players = client.get('/api/players?limit=100').get_json()
+    expected = sorted(player['id'] for player in players if player['position'] in ('SS', '2B'))
+    assert expected
+
+    for body in ({'hr': 1, 'position': ['SS', '2B']}, {'hr': 1, 'position': 'SS,2B'}):
+        response = client.post('/api/calculate', json=body)
+        assert response.headers['X-Total-Count'] == str(len(expected))
+        assert sorted(player['id'] for player in response.get_json()) == expected
+
+
+@pytest.mark.parametrize('body', [{'hr': 1, 'position': ['SS', 2]}, {'hr': 1, 'position': {'SS': 1}},
+                                  {'hr': 1, 'team': ['NYY']}])
+def test_calculate_rejects_malformed_filters(client, body):
+    assert client.post('/api/calculate', json=body).status_code == 400
+
+
+@pytest.mark.parametrize('settings', [{'teams': 100000}, {'bench': 10 ** 6}, {'limit': -1},
+                                      {'slots': {'P': 10 ** 6}}])
+def test_simulate_draft_rejects_out_of_range_settings(client, settings):
+    response = client.post('/api/simulate-draft', json=dict({'hr': 1, 'simulations': 1}, **settings))
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'DATA_DIR', str(tmp_path))
+    with open(tmp_path / 'players.json', 'w') as f:
+        json.dump([{'id': 1}] * 100, f)
+    data_assets.publish(str(tmp_path), ['players.json'])
+    return tmp_path
+
+
+def test_data_files_are_sent_precompressed(client, data_dir):
+    response = client.get('/data/players.json', headers={'Accept-Encoding': 'gzip, br'})
+    assert (response.headers['Content-Encoding'], response.mimetype) == ('br', 'application/json')
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    response = client.get('/data/players.json.gz')
+    assert (response.headers['Content-Encoding'], response.mimetype) == ('gzip', 'application/json')
+
+    hashed = data_assets.load_manifest(str(data_dir))['files']['players.json']['path']
+    response = client.get(f'/data/{hashed}', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Cache-Control'] == data_assets.IMMUTABLE_CACHE_CONTROL
+
+
+def test_unknown_refresh_jobs_are_not_found(client):
+    response = client.get(f"/api/refresh-data/{'0' * 32}")
+    assert response.status_code == 404
+    assert client.get('/api/refresh-data/not-a-job').status_code == 404
+
+
+def test_similar_players(client):
+    pitcher = next(player for player in synthetic_players(50, seed=42, current_year=2025) if player['is_pitcher'])
+    body = client.get(f"/api/similar/{pitcher['id']}?k=3").get_json()
+
+    assert body['player']['id'] == pitcher['id']
+    assert len(body['results']) == 3
+    assert all(result['is_pitcher'] and result['id'] != pitcher['id'] for result in body['results'])
+    distances = [result['distance'] for result in body['results']]
+    assert distances == sorted(distances)
+
+
+@pytest.mark.parametrize('path, status', [('/api/similar/999999', 404), ('/api/similar/1?k=0', 400),
+                                          ('/api/similar/1?k=many', 400)])
+def test_similar_rejects_unknown_players_and_bad_k(client, path, status):
+    response = client.get(path)
+    assert response.status_code == status
+    assert 'error' in response.get_json()
+
+
+def test_metrics_count_requests_and_queries(client):
+    from test_metrics import parse
+
+    def scrape():
+        response = client.get('/metrics')
+        assert response.content_type == metrics.CONTENT_TYPE
+        return parse(response.get_data(as_text=True))
+
+    labels = '{method="GET",route="/api/players",status="200"}'
+    before = scrape()
+    for _ in range(2):
+        client.get('/api/players?sort=hr&limit=5')
+    after = scrape()
+
+    assert after['http_requests_total', labels] - before.get(('http_requests_total', labels), 0) == 2
+    # Sorting and paging run in SQL, so each request queries the database
+    assert after['db_queries_total', ''] >= before['db_queries_total', ''] + 2
+    queries = '{method="GET",route="/api/players"}'
+    assert after['http_request_db_queries_count', queries] - \
+        before.get(('http_request_db_queries_count', queries), 0) == 2
+    assert after['http_response_size_bytes_sum', queries] > before.get(('http_response_size_bytes_sum', queries), 0)
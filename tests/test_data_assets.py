@@ -0,0 +1,99 @@
+"""
+Hashed copies, precompressed siblings, the manifest and Accept-Encoding negotiation for the data files.
+"""
+import gzip
+import json
+import os
+
+import pytest
+from werkzeug.http import parse_accept_header
+
+import data_assets
+
+
+def write(directory, filename, data):
+    with open(directory / filename, 'wb') as f:
+        f.write(data)
+
+
+def accepting(header):
+    return parse_accept_header(header)
+
+
+def test_hashed_names():
+    digest = data_assets.content_hash(b'[]')
+    name = data_assets.hashed_name('players.columns.json', digest)
+
+    assert name == f'players.columns.{digest[:12]}.json'
+    assert data_assets.is_hashed(name) and data_assets.is_hashed(name + '.br')
+    assert not data_assets.is_hashed('players.columns.json')
+    assert not data_assets.is_hashed('players.json.gz')
+
+
+def test_publish_writes_the_manifest_and_keeps_one_previous_generation(tmp_path):
+    generations = []
+    for players in (b'[1]', b'[1,2]', b'[1,2,3]'):
+        write(tmp_path, 'players.json', players)
+        data_assets.publish(str(tmp_path), ['players.json'])
+        entry = data_assets.load_manifest(str(tmp_path))['files']['players.json']
+        generations.append(entry['path'])
+
+        assert entry['sha256'] == data_assets.content_hash(players) and entry['size'] == len(players)
+        with open(tmp_path / entry['path'], 'rb') as f:
+            assert f.read() == players
+        with gzip.open(tmp_path / f"{entry['path']}.gz") as f:
+            assert f.read() == players
+
+    # The newest manifest's files and the one before it, each with its siblings
+    suffixes = [''] + [suffix for _, suffix in data_assets.available_encodings()]
+    assert {name for name in os.listdir(tmp_path) if data_assets.is_hashed(name)} == \
+        {path + suffix for path in generations[1:] for suffix in suffixes}
+
+
+def test_gzip_siblings_are_reproducible():
+    assert data_assets.compress(b'{"a": 1}' * 100, 'gzip') == data_assets.compress(b'{"a": 1}' * 100, 'gzip')
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip, deflate, br', ('players.json.br', 'br')),
+    ('gzip', ('players.json.gz', 'gzip')),
+    ('identity', ('players.json', None)),
+    ('', ('players.json', None)),
+])
+def test_negotiate_prefers_brotli(tmp_path, header, expected):
+    if data_assets.brotli is None and expected[1] == 'br':
+        pytest.skip('brotli is not installed')
+    write(tmp_path, 'players.json', b'[]')
+    data_assets.publish(str(tmp_path), ['players.json'])
+
+    assert data_assets.negotiate(str(tmp_path), 'players.json', accepting(header)) == expected
+
+
+def test_missing_and_stale_siblings_are_compressed_on_demand(tmp_path):
+    write(tmp_path, 'players.json', b'[1]')
+    assert data_assets.negotiate(str(tmp_path), 'players.json', accepting('gzip')) == ('players.json.gz', 'gzip')
+    with gzip.open(tmp_path / 'players.json.gz') as f:
+        assert f.read() == b'[1]'
+
+    # As after a pull that updated players.json but not the uncommitted sibling
+    write(tmp_path, 'players.json', b'[1,2]')
+    sibling = tmp_path / 'players.json.gz'
+    os.utime(sibling, (0, 0))
+    data_assets.negotiate(str(tmp_path), 'players.json', accepting('gzip'))
+    with gzip.open(sibling) as f:
+        assert f.read() == b'[1,2]'
+
+
+def test_siblings_asked_for_by_name_keep_their_encoding(tmp_path):
+    assert data_assets.negotiate(str(tmp_path), 'players.json.gz', accepting('')) == ('players.json.gz', 'gzip')
+    assert data_assets.negotiate(str(tmp_path), 'players.abcdef012345.json.br', accepting('gzip')) == \
+        ('players.abcdef012345.json.br', 'br')
+
+
+def test_nothing_is_written_outside_the_directory(tmp_path):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    write(tmp_path, 'secret.json', json.dumps({'key': 1}).encode())
+
+    assert data_assets.negotiate(str(data_dir), '../secret.json', accepting('gzip')) == ('../secret.json', None)
+    assert not (tmp_path / 'secret.json.gz').exists()
@@ -0,0 +1,86 @@
+"""
+Streamed data files against json.dump of the whole league, as fetch_data wrote them before.
+"""
+import json
+
+import pytest
+
+from benchmarks.synthetic import synthetic_players
+from data_writer import COLUMNS_FILE, PLAYER_FIELDS, PlayerDataWriter, compact_player
+from stat_fields import FLOAT_STATS, STAT_NAMES, stat_sets
+
+STAT_SETS = stat_sets(2025)
+
+
+@pytest.fixture(scope='module')
+def players():
+    players = synthetic_players(400, current_year=2025)
+    # A two-way player keeps both stat groups
+    two_way = next(player for player in players if not player['is_pitcher'])
+    two_way['stats_2025_actual'] = dict(two_way['stats_2025_actual'], wins=3, strikeouts=40)
+    return players
+
+
+@pytest.fixture(scope='module')
+def written(players, tmp_path_factory):
+    directory = tmp_path_factory.mktemp('data')
+    writer = PlayerDataWriter(str(directory), STAT_SETS)
+    for player in players:
+        writer.write(player)
+    writer.commit([('last_updated.json', {'total_players': len(players)})])
+    return directory
+
+
+def read(directory, filename):
+    with open(directory / filename, 'rb') as f:
+        return f.read()
+
+
+def expand(player):
+    # Put back the all-zero stat group compact_player left out
+    return {key: {stat: value.get(stat, 0.0 if stat in FLOAT_STATS else 0) for stat in STAT_NAMES}
+            if key.startswith('stats_') else value for key, value in player.items()}
+
+
+def test_group_files_match_json_dump(players, written):
+    for group, is_pitcher in (('batters', False), ('pitchers', True)):
+        expected = [player for player in players if player['is_pitcher'] == is_pitcher]
+        data = read(written, f'{group}.json')
+
+        assert data == json.dumps([compact_player(player) for player in expected], separators=(',', ':')).encode()
+        # Same league as the old json.dump(batters, f) once the dropped zeros are put back
+        assert [expand(player) for player in json.loads(data)] == json.loads(json.dumps(expected))
+
+
+def test_players_file_is_batters_then_pitchers(written):
+    players = json.loads(read(written, 'players.json'))
+    assert players == json.loads(read(written, 'batters.json')) + json.loads(read(written, 'pitchers.json'))
+
+
+def test_two_way_player_keeps_both_groups(written):
+    two_way = next(player for player in json.loads(read(written, 'batters.json'))
+                   if player['stats_2025_actual'].get('wins') == 3)
+    assert two_way['stats_2025_actual']['strikeouts'] == 40
+    assert 'wins' not in two_way['stats_2024_actual']
+
+
+def test_columns_hold_the_same_league(players, written):
+    columns = json.loads(read(written, COLUMNS_FILE))
+    ordered = [player for player in players if not player['is_pitcher']] + \
+        [player for player in players if player['is_pitcher']]
+
+    assert (columns['count'], columns['stat_sets'], columns['stats']) == (len(players), list(STAT_SETS),
+                                                                          list(STAT_NAMES))
+    for field in PLAYER_FIELDS:
+        assert columns['columns'][field] == [player[field] for player in ordered]
+    for stat_set in STAT_SETS:
+        for stat in STAT_NAMES:
+            assert columns['columns'][f'stats_{stat_set}.{stat}'] == \
+                [player[f'stats_{stat_set}'][stat] for player in ordered]
+
+
+def test_abort_leaves_nothing_behind(players, tmp_path):
+    writer = PlayerDataWriter(str(tmp_path), STAT_SETS)
+    writer.write(players[0])
+    writer.abort()
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,49 @@
+"""
+Seeded snake-draft simulations over synthetic players.
+"""
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import synthetic_players
+from draft import MAX_ROUNDS, MAX_TEAMS, simulator
+
+
+@pytest.fixture(scope='module')
+def league():
+    players = synthetic_players(600, current_year=2025)
+    rng = np.random.default_rng(7)
+    return rng.gamma(2.0, 50.0, len(players)), players
+
+
+def simulate(league, **settings):
+    points, players = league
+    settings = dict({'teams': 8, 'simulations': 300, 'seed': 11, 'workers': 1}, **settings)
+    return simulator.run(points, players, **settings)
+
+
+def test_same_seed_gives_the_same_draft(league):
+    first = simulate(league)
+    assert simulate(league) == first
+    # Chunks are seeded on their own, so spreading them over processes changes nothing
+    assert simulate(league, workers=2) == first
+    assert simulate(league, seed=12) != first
+
+
+def test_limit_caps_the_ranked_players(league):
+    assert len(simulate(league, simulations=20, limit=5)['players']) == 5
+    assert simulate(league, simulations=20, limit=0)['players'] == []
+
+
+@pytest.mark.parametrize('settings', [
+    {'teams': MAX_TEAMS + 1},
+    {'teams': 1},
+    {'draft_position': 9},
+    {'bench': MAX_ROUNDS},
+    {'slots': {'P': -1}},
+    {'slots': {'DH': 1}},
+    {'simulations': 20000, 'teams': 30},
+    {'limit': -1},
+])
+def test_out_of_range_settings_are_rejected(league, settings):
+    with pytest.raises(ValueError):
+        simulate(league, **settings)
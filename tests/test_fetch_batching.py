@@ -0,0 +1,108 @@
+"""
+Batched player hydration against the stub MLB Stats API (benchmarks/stub_server.py).
+"""
+import json
+
+import pytest
+
+import fetch_data
+from benchmarks.stub_server import StubServer
+from benchmarks.synthetic import SyntheticLeague
+from mlb_api import MLBClient
+
+LEAGUE = SyntheticLeague(teams=2, players_per_team=26)
+
+
+def player_infos(league):
+    return [player_info for team in league.teams
+            for player_info in fetch_data.roster_players(team, league.roster_response(team['id']))]
+
+
+def client_for(server):
+    return MLBClient(server.base_url, requests_per_second=0, max_retries=0, backoff=0)
+
+
+def fetch(server, output_dir, batch_size):
+    ok = fetch_data.fetch_players_data(server.base_url, str(output_dir), max_workers=4, requests_per_second=0,
+                                       batch_size=batch_size, cache_dir=None, archive_dir=None)
+    assert ok
+    with open(output_dir / 'players.json') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='module')
+def single_players(tmp_path_factory):
+    with StubServer(LEAGUE, latency=0) as server:
+        return fetch(server, tmp_path_factory.mktemp('single'), batch_size=1)
+
+
+@pytest.mark.parametrize('batch_size', [1, 7, 50])
+def test_batch_sizes_fetch_the_same_players(tmp_path, single_players, batch_size):
+    with StubServer(LEAGUE, latency=0) as server:
+        players = fetch(server, tmp_path, batch_size)
+
+    assert players == single_players
+    assert sorted(player['id'] for player in players) == sorted(LEAGUE.people)
+    sizes = [len(person_ids) for person_ids in server.people_requests]
+    assert max(sizes) == min(batch_size, len(LEAGUE.people))
+    assert sum(sizes) == len(LEAGUE.people)
+    assert len(sizes) == len(fetch_data.chunks(list(LEAGUE.people), batch_size))
+
+
+def test_rejected_batches_fall_back_to_single_requests(tmp_path, single_players):
+    with StubServer(LEAGUE, latency=0, max_batch_size=10) as server:
+        players = fetch(server, tmp_path, batch_size=25)
+
+    assert players == single_players
+    # 52 players: two batches of 25 are rejected and refetched one by one, the last 2 go through
+    sizes = sorted(len(person_ids) for person_ids in server.people_requests)
+    assert sizes == [1] * 50 + [2, 25, 25]
+
+
+@pytest.mark.parametrize('status', [400, 500, 503])
+def test_failed_batch_falls_back_to_single_requests(status):
+    batch = player_infos(LEAGUE)[:5]
+    with StubServer(LEAGUE, latency=0, batch_status=status) as server:
+        people = fetch_data.fetch_people(client_for(server), batch)
+
+    assert [person['id'] for person in people] == [player_info['id'] for player_info in batch]
+    assert server.people_requests == [[player_info['id'] for player_info in batch]] + \
+        [[player_info['id']] for player_info in batch]
+
+
+def test_player_missing_from_batch_is_fetched_alone():
+    batch = player_infos(LEAGUE)[:5]
+    missing = batch[2]['id']
+    with StubServer(LEAGUE, latency=0, missing_from_batches=[missing]) as server:
+        people = fetch_data.fetch_people(client_for(server), batch)
+
+    assert [person['id'] for person in people] == [player_info['id'] for player_info in batch]
+    assert people[2] == LEAGUE.people[missing]
+    assert server.people_requests[1:] == [[missing]]
+
+
+def test_batch_of_one_uses_the_single_person_endpoint():
+    batch = player_infos(LEAGUE)[:1]
+    with StubServer(LEAGUE, latency=0, batch_status=500) as server:
+        people = fetch_data.fetch_people(client_for(server), batch)
+
+    assert people == [LEAGUE.people[batch[0]['id']]]
+    assert server.people_requests == [[batch[0]['id']]]
+
+
+def test_incremental_run_reports_the_requests_it_skipped(tmp_path):
+    runs = []
+    for run in range(2):
+        output_dir = tmp_path / 'data'
+        with StubServer(LEAGUE, latency=0) as server:
+            ok = fetch_data.fetch_players_data(server.base_url, str(output_dir), max_workers=4,
+                                               requests_per_second=0, batch_size=7,
+                                               cache_dir=str(tmp_path / 'cache'), archive_dir=None)
+        assert ok
+        with open(output_dir / 'last_updated.json') as f:
+            runs.append((server.request_count, json.load(f)['refresh']))
+
+    (full_count, full), (incremental_count, incremental) = runs
+    assert full['requests_skipped'] == 0
+    assert incremental['incremental']
+    assert incremental['requests_skipped'] == full_count - incremental_count
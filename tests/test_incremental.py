@@ -0,0 +1,83 @@
+"""
+Incremental refreshes against the stub MLB Stats API, and the response cache behind them.
+"""
+import json
+import os
+import threading
+
+import fetch_data
+from benchmarks.stub_server import StubServer
+from benchmarks.synthetic import SyntheticLeague
+from response_cache import ResponseCache
+
+
+def refresh(server, output_dir, cache_dir):
+    ok = fetch_data.fetch_players_data(server.base_url, str(output_dir), max_workers=4, requests_per_second=0,
+                                       batch_size=7, cache_dir=cache_dir and str(cache_dir),
+                                       incremental=cache_dir is not None, archive_dir=None)
+    assert ok
+    with open(output_dir / 'last_updated.json') as f:
+        report = json.load(f)['refresh']
+    with open(output_dir / 'players.json') as f:
+        return report, json.load(f)
+
+
+def test_only_the_player_whose_season_changed_is_refetched(tmp_path):
+    league = SyntheticLeague(teams=2, players_per_team=26)
+    with StubServer(league, latency=0) as server:
+        refresh(server, tmp_path / 'data', tmp_path / 'cache')
+
+        player_id = sorted(league.people)[3]
+        split = league.people[player_id]['stats'][0]['splits'][-1]
+        assert split['season'] == str(league.current_year)
+        split['stat'] = dict(split['stat'], homeRuns=split['stat']['homeRuns'] + 1)
+
+        before = len(server.people_requests)
+        report, players = refresh(server, tmp_path / 'data', tmp_path / 'cache')
+
+    assert server.people_requests[before:] == [[player_id]]
+    assert (report['players_hydrated'], report['players_current_season']) == (0, 1)
+    changed = next(player for player in players if player['id'] == player_id)
+    assert changed[f'stats_{league.current_year}_actual']['hr'] == split['stat']['homeRuns']
+
+
+def test_incremental_output_matches_a_full_refresh(tmp_path):
+    league = SyntheticLeague(teams=3, players_per_team=26)
+    with StubServer(league, latency=0) as server:
+        refresh(server, tmp_path / 'data', tmp_path / 'cache')
+        league.advance_day(fraction=0.2, trades=3)
+        report, incremental = refresh(server, tmp_path / 'data', tmp_path / 'cache')
+        _, full = refresh(server, tmp_path / 'full', None)
+
+    assert report['incremental']
+    # Traded players are hydrated in full, players who played only for this season
+    assert report['players_hydrated'] >= 1 and report['players_current_season'] >= 1
+    assert incremental == full
+
+
+def test_concurrent_writes_of_one_url_never_collide(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    errors = []
+
+    class Response:
+        headers = {'ETag': '"1"'}
+
+        def __init__(self, text):
+            self.text = text
+
+    def write(index):
+        try:
+            for _ in range(50):
+                cache.put('v1/teams?sportId=1', Response(f'{{"writer": {index}}}'))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert json.loads(cache.get('v1/teams?sportId=1')['body'])['writer'] in range(8)
+    assert os.listdir(tmp_path) == [os.path.basename(cache.path('v1/teams?sportId=1'))]
@@ -0,0 +1,144 @@
+"""
+Background refresh jobs, with one JobManager per simulated worker sharing a jobs directory.
+"""
+import os
+import threading
+
+import pytest
+
+from jobs import JobManager, RefreshJob
+
+
+class Refresh:
+    """
+    A refresh that runs until released.
+    """
+
+    def __init__(self, result=True):
+        self.result = result
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def __call__(self, job):
+        self.calls += 1
+        job.update('fetching', 1, 4, 0)
+        self.started.set()
+        assert self.release.wait(5)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def wait_for(manager, job):
+    for _ in range(500):
+        current = manager.get(job.id)
+        if not current.active:
+            return current
+        threading.Event().wait(0.01)
+    raise AssertionError(f'job {job.id} never finished')
+
+
+@pytest.fixture
+def refresh():
+    refresh = Refresh()
+    yield refresh
+    refresh.release.set()
+
+
+def test_workers_share_jobs_and_run_one_refresh(tmp_path, refresh):
+    first, second = JobManager(refresh, str(tmp_path)), JobManager(refresh, str(tmp_path))
+    job, created = first.submit()
+    assert created
+    assert refresh.started.wait(5)
+
+    joined, created = second.submit()
+    assert not created and joined.id == job.id
+    status = second.get(job.id).to_dict()
+    assert (status['status'], status['stage'], status['processed'], status['total']) == \
+        ('running', 'fetching', 1, 4)
+
+    refresh.release.set()
+    assert wait_for(second, job).status == 'succeeded'
+    assert refresh.calls == 1
+
+
+def test_job_of_a_worker_that_died_is_reported_failed(tmp_path):
+    manager = JobManager(Refresh(), str(tmp_path))
+    job = RefreshJob(save=manager._save)
+    job.status = 'running'
+    # Saved, but nothing holds the refresh lock
+    manager._save(job)
+
+    status = manager.get(job.id)
+    assert status.status == 'failed'
+    assert 'stopped' in status.error
+
+
+def test_unknown_and_malformed_ids_are_not_found(tmp_path):
+    manager = JobManager(Refresh(), str(tmp_path))
+    assert manager.get('0' * 32) is None
+    assert manager.get('../../etc/passwd') is None
+
+
+def test_job_lifecycle(tmp_path, refresh):
+    manager = JobManager(refresh, str(tmp_path))
+    job, created = manager.submit()
+    assert created
+    assert manager.get(job.id).status in ('queued', 'running')
+
+    assert refresh.started.wait(5)
+    status = manager.get(job.id).to_dict()
+    assert status['status'] == 'running' and status['started_at'] is not None
+    assert status['finished_at'] is None
+
+    refresh.release.set()
+    status = wait_for(manager, job).to_dict()
+    assert status['status'] == 'succeeded'
+    assert status['finished_at'] >= status['started_at'] >= status['created_at']
+    assert status['eta_seconds'] is None
+
+
+def test_submitting_after_a_refresh_ends_starts_a_new_one(tmp_path, refresh):
+    refresh.release.set()
+    manager = JobManager(refresh, str(tmp_path))
+    first, _ = manager.submit()
+    wait_for(manager, first)
+
+    second, created = manager.submit()
+    assert created and second.id != first.id
+    wait_for(manager, second)
+    assert refresh.calls == 2
+
+
+@pytest.mark.parametrize('result, error', [(False, None), (RuntimeError('roster fetch failed'),
+                                                           'roster fetch failed')])
+def test_failed_refreshes_are_reported(tmp_path, result, error):
+    refresh = Refresh(result)
+    refresh.release.set()
+    manager = JobManager(refresh, str(tmp_path))
+    job, _ = manager.submit()
+
+    status = wait_for(manager, job)
+    assert (status.status, status.error) == ('failed', error)
+
+
+def test_history_keeps_the_latest_jobs(tmp_path, refresh):
+    refresh.release.set()
+    manager = JobManager(refresh, str(tmp_path), history=3)
+    jobs = []
+    for _ in range(5):
+        job, _ = manager.submit()
+        jobs.append(wait_for(manager, job))
+
+    assert [manager.get(job.id) for job in jobs[:2]] == [None, None]
+    assert [manager.get(job.id).status for job in jobs[2:]] == ['succeeded'] * 3
+    assert len([name for name in os.listdir(tmp_path) if name.endswith('.json')]) == 3
+
+
+def test_eta_extrapolates_the_current_stage():
+    job = RefreshJob()
+    job.status = 'running'
+    job.update('fetching', 25, 100, 0)
+    job.stage_started_at -= 10
+    assert job.eta() == pytest.approx(30, abs=0.5)
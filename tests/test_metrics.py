@@ -0,0 +1,67 @@
+"""
+The Prometheus text rendering of the in-process metrics.
+"""
+import re
+
+import pytest
+
+from metrics import Counter, Registry
+
+# One sample line of the text exposition format: name, optional labels, value
+SAMPLE = re.compile(r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)'
+                    r'(?P<labels>\{(?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*",?)*\})?'
+                    r' (?P<value>[-+]?(?:\d+(?:\.\d*)?(?:e[-+]?\d+)?|Inf|NaN))$')
+
+
+def parse(text):
+    """
+    {(name, labels): value} of the samples in a rendering, checking every line is
+    well formed and each metric's HELP and TYPE come before its samples.
+    """
+    samples, described = {}, set()
+    for line in text.splitlines():
+        if line.startswith('# HELP ') or line.startswith('# TYPE '):
+            kind, name = line.split(' ')[1:3]
+            described.add((kind, name))
+            if kind == 'TYPE':
+                assert line.split(' ')[3] in ('counter', 'gauge', 'histogram')
+            continue
+        match = SAMPLE.match(line)
+        assert match, f'malformed sample line: {line!r}'
+        base = re.sub(r'_(bucket|sum|count)$', '', match['name'])
+        assert ('TYPE', base) in described or ('TYPE', match['name']) in described, line
+        samples[match['name'], match['labels'] or ''] = float(match['value'])
+    return samples
+
+
+def test_counters_gauges_and_label_escaping():
+    registry = Registry()
+    requests = registry.counter('requests_total', "Requests.", ('route',))
+    requests.inc(route='/a')
+    requests.inc(2, route='/a')
+    requests.inc(route='say "hi"\\\n')
+    registry.gauge('last_run_seconds', "When.").set(12.5)
+
+    samples = parse(registry.render())
+    assert samples['requests_total', '{route="/a"}'] == 3
+    assert samples['requests_total', '{route="say \\"hi\\"\\\\\\n"}'] == 1
+    assert samples['last_run_seconds', ''] == 12.5
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = registry.histogram('latency_seconds', "Latency.", ('route',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, route='/a')
+
+    samples = parse(registry.render())
+    buckets = [samples['latency_seconds_bucket', f'{{route="/a",le="{bound}"}}'] for bound in ('0.1', '1.0', '+Inf')]
+    assert buckets == [2, 3, 4]
+    assert samples['latency_seconds_count', '{route="/a"}'] == 4
+    assert samples['latency_seconds_sum', '{route="/a"}'] == pytest.approx(3.65)
+
+
+def test_labels_must_match():
+    counter = Counter('x_total', "X.", ('route',))
+    with pytest.raises(ValueError):
+        counter.inc(status=200)
@@ -0,0 +1,119 @@
+"""
+The MLB API client's token bucket and its retries, against the stub MLB Stats API.
+"""
+import pytest
+import requests
+
+import mlb_api
+from benchmarks.stub_server import StubServer
+from mlb_api import MLBClient, RateLimiter
+
+
+class FakeTime:
+    """
+    Stands in for the time module in mlb_api: sleeping only moves the clock.
+    Tests use rates whose intervals are exact in binary, so the bucket refills
+    to exactly one token.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(mlb_api, 'time', clock)
+    return clock
+
+
+def test_bucket_allows_a_burst_then_the_rate(clock):
+    limiter = RateLimiter(rate=4, burst=2)
+    for _ in range(2):
+        limiter.acquire()
+    assert clock.sleeps == []
+
+    started = clock.now
+    for _ in range(8):
+        limiter.acquire()
+    assert clock.now - started == pytest.approx(2.0)
+    assert all(wait == pytest.approx(0.25) for wait in clock.sleeps)
+
+
+def test_bucket_refills_while_idle_up_to_its_capacity(clock):
+    limiter = RateLimiter(rate=8)
+    for _ in range(8):
+        limiter.acquire()
+    clock.now += 60
+    for _ in range(8):
+        limiter.acquire()
+    assert clock.sleeps == []
+    limiter.acquire()
+    assert clock.sleeps == [0.125]
+
+
+def test_rate_of_zero_never_waits(clock):
+    limiter = RateLimiter(rate=0)
+    for _ in range(1000):
+        limiter.acquire()
+    assert clock.sleeps == []
+
+
+def client_for(server, **options):
+    return MLBClient(server.base_url, requests_per_second=0, **dict({'max_retries': 3, 'backoff': 0.5}, **options))
+
+
+def test_429_and_5xx_are_retried_with_exponential_backoff(clock):
+    with StubServer(latency=0, failures=[429, 503, 500]) as server:
+        client = client_for(server)
+        response = client.get('v1/teams?sportId=1')
+
+    assert response.status_code == 200
+    assert server.request_count == 4
+    assert clock.sleeps == [0.5, 1.0, 2.0]
+    report = client.endpoint_report()['v1/teams']
+    assert (report['requests'], report['retries'], report['errors']) == (4, 3, 3)
+
+
+def test_retry_after_is_honoured(clock):
+    with StubServer(latency=0, failures=[429], retry_after=7) as server:
+        assert client_for(server).get('v1/teams?sportId=1').status_code == 200
+    assert clock.sleeps == [7]
+
+
+def test_last_error_is_returned_once_retries_run_out(clock):
+    with StubServer(latency=0, failures=[503] * 10) as server:
+        response = client_for(server, max_retries=2).get('v1/teams?sportId=1')
+
+    assert response.status_code == 503
+    assert server.request_count == 3
+    assert clock.sleeps == [0.5, 1.0]
+
+
+def test_client_errors_are_not_retried(clock):
+    with StubServer(latency=0, failures=[404]) as server:
+        assert client_for(server).get('v1/teams?sportId=1').status_code == 404
+    assert server.request_count == 1
+    assert clock.sleeps == []
+
+
+def test_connection_errors_are_retried_then_raised(clock):
+    with StubServer(latency=0) as server:
+        base_url = server.base_url
+    client = MLBClient(base_url, requests_per_second=0, max_retries=2, backoff=0.5, timeout=2)
+
+    with pytest.raises(requests.ConnectionError):
+        client.get('v1/teams?sportId=1')
+    assert clock.sleeps == [0.5, 1.0]
+    assert client.counts['requests'] == 3
@@ -0,0 +1,32 @@
+"""
+Projections of players the league rates can't fill in.
+"""
+import json
+
+import numpy as np
+
+import projections
+
+
+def test_pitcher_without_history_or_league_rates_projects_no_nan():
+    # The season stats fetch failed, so there are no league rates to regress to
+    league = projections.League.from_season_stats([None] * len(projections.SEASON_WEIGHTS))
+    history = projections.player_history({'id': 1, 'stats': []})
+    batter, pitcher = projections.project([history, history], [False, True], league, 2025)
+
+    assert pitcher['era'] == 0.0 and pitcher['fip'] == 0.0
+    for stats in (batter, pitcher):
+        assert all(np.isfinite(value) for value in stats.values())
+        json.dumps(stats, allow_nan=False)
+
+
+def test_pitcher_with_history_keeps_the_fip_constant():
+    league = projections.League.from_season_stats([None] * len(projections.SEASON_WEIGHTS))
+    split = {'season': '2024', 'stat': {'inningsPitched': '60.0', 'earnedRuns': 20, 'homeRuns': 5,
+                                        'baseOnBalls': 20, 'strikeOuts': 60, 'gamesPlayed': 60}}
+    history = projections.player_history({'id': 1, 'stats': [
+        {'group': {'displayName': 'pitching'}, 'splits': [split]}]})
+    pitcher, = projections.project([history], [True], league, 2025)
+
+    assert pitcher['era'] == 3.0
+    assert pitcher['fip'] == round((13 * 5 + 3 * 20 - 2 * 60) / 60 + projections.FIP_CONSTANT, 2)
@@ -0,0 +1,69 @@
+"""
+Archiving a fetch from the stub MLB Stats API and rebuilding its data files offline.
+"""
+import os
+import time
+
+import archive
+import fetch_data
+import rebuild
+from benchmarks.stub_server import StubServer
+from benchmarks.synthetic import SyntheticLeague
+
+# The data files a rebuild writes; last_updated.json records when and from what, so it differs
+DATA_FILES = ('batters.json', 'pitchers.json', 'players.json', 'players.columns.json')
+
+
+def fetch(server, work_dir):
+    ok = fetch_data.fetch_players_data(server.base_url, str(work_dir / 'data'), max_workers=4,
+                                       requests_per_second=0, batch_size=7, cache_dir=str(work_dir / 'cache'),
+                                       archive_dir=str(work_dir / 'archive'))
+    assert ok
+
+
+def assert_rebuilt_identically(work_dir, name):
+    paths = archive.latest_chain(str(work_dir / 'archive'))
+    rebuild.rebuild(paths, str(work_dir / name), workers=1)
+    for filename in DATA_FILES:
+        with open(work_dir / 'data' / filename, 'rb') as fetched, open(work_dir / name / filename, 'rb') as rebuilt:
+            assert rebuilt.read() == fetched.read(), filename
+    return paths
+
+
+def test_rebuilds_are_byte_identical(tmp_path):
+    league = SyntheticLeague(teams=2, players_per_team=26)
+    with StubServer(league, latency=0) as server:
+        fetch(server, tmp_path)
+        assert len(assert_rebuilt_identically(tmp_path, 'full')) == 1
+
+        # Archives are named to the second
+        time.sleep(1.1)
+        league.advance_day(0.2, trades=2)
+        fetch(server, tmp_path)
+
+    paths = assert_rebuilt_identically(tmp_path, 'incremental')
+    assert [os.path.basename(path).split('.')[1] for path in paths] == ['full', 'incremental']
+
+
+def test_prune_keeps_the_last_full_runs(tmp_path):
+    names = ['20250101T000000.full', '20250102T000000.incremental', '20250103T000000.full',
+             '20250104T000000.full', '20250105T000000.incremental']
+    for name in names:
+        (tmp_path / f'{name}.ndjson.gz').write_bytes(b'')
+
+    removed = archive.prune_archives(str(tmp_path), keep_full_runs=2)
+    assert sorted(os.path.basename(path) for path in removed) == [f'{name}.ndjson.gz' for name in names[:2]]
+    assert [os.path.basename(path) for path in archive.latest_chain(str(tmp_path))] == \
+        [f'{name}.ndjson.gz' for name in names[3:]]
+
+
+def test_archives_round_trip(tmp_path):
+    writer = archive.ArchiveWriter(str(tmp_path), current_year=2025)
+    writer.add('v1/teams?sportId=1', '{"teams": []}')
+    path = writer.close(incremental=False, players=0)
+
+    records = list(archive.read_archive(path))
+    assert records[0]['type'] == 'meta' and records[0]['current_year'] == 2025
+    assert records[1] == {'path': 'v1/teams?sportId=1', 'body': '{"teams": []}'}
+    assert records[2]['type'] == 'summary' and records[2]['responses'] == 1
+    assert [name for name in os.listdir(tmp_path)] == [os.path.basename(path)]
@@ -0,0 +1,92 @@
+"""
+Prefix, ranking, folding and fuzzy matching in the player search index.
+"""
+import pytest
+
+from search import EXACT_NAME, NAME_PREFIX, NAME_TOKENS, TEAM_TOKENS, SearchIndex, normalize
+
+PLAYERS = [
+    (1, 'José Ramírez', 'Cleveland Guardians', '3B', False),
+    (2, 'Jose Berrios', 'Toronto Blue Jays', 'P', True),
+    (3, 'Ramon Laureano', 'Baltimore Orioles', 'RF', False),
+    (4, 'Aaron Judge', 'New York Yankees', 'RF', False),
+    (5, 'Aaron Judge Jr.', 'Cleveland Guardians', 'CF', False),
+    (6, 'Judge Aaronson', 'Boston Red Sox', 'P', True),
+    (7, 'Guardiola Smith', 'Texas Rangers', 'C', False),
+]
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    for player_id, name, team, position, is_pitcher in PLAYERS:
+        index.add({'id': player_id, 'name': name, 'team': team, 'position': position, 'is_pitcher': is_pitcher})
+    return index
+
+
+def ids(results):
+    return [player['id'] for _, player in results]
+
+
+def test_normalize_folds_accents_case_and_punctuation():
+    assert normalize('José Ramírez Jr.') == 'jose ramirez jr'
+    assert normalize("  O'NEIL  ") == 'o neil'
+    assert normalize(None) == ''
+
+
+def test_words_are_matched_by_prefix(index):
+    assert index.prefix_matches('ram', 'name') == {1, 3}
+    assert index.prefix_matches('jud', 'name') == {4, 5, 6}
+    assert index.prefix_matches('guard', 'team') == {1, 5}
+    assert index.prefix_matches('guard', 'name') == {7}
+    # Past the last word, and a prefix nothing starts with
+    assert index.prefix_matches('zz', 'name') == set()
+    assert index.prefix_matches('ramz', 'name') == set()
+
+
+def test_every_query_word_must_match(index):
+    assert ids(index.search('jose ram')) == [1]
+    assert ids(index.search('ram jose')) == [1]
+    assert index.word_matches(['jose', 'laur'], 'name') == set()
+
+
+@pytest.mark.parametrize('query', ['jose ramirez', 'JOSÉ RAMÍREZ', 'José Ramírez', 'jose-ramirez', 'JoSe RaM'])
+def test_accents_case_and_punctuation_are_folded(index, query):
+    assert ids(index.search(query))[0] == 1
+
+
+def test_exact_names_rank_above_prefixes_words_and_teams(index):
+    results = index.search('aaron judge')
+    assert ids(results) == [4, 5, 6]
+    assert [score for score, _ in results] == [EXACT_NAME, NAME_PREFIX, NAME_TOKENS]
+
+    results = index.search('guard')
+    # The name starting with the query beats players whose team does; ties go by name
+    assert ids(results) == [7, 5, 1]
+    assert [score for score, _ in results] == [NAME_PREFIX, TEAM_TOKENS, TEAM_TOKENS]
+
+
+def test_ties_are_ordered_by_name_and_cut_to_the_limit(index):
+    assert ids(index.search('jose')) == [2, 1]
+    assert ids(index.search('jose', limit=1)) == [2]
+    assert index.search('jose', limit=0) == []
+    assert index.search('  ') == []
+
+
+def test_misspellings_fall_back_to_trigrams(index):
+    results = index.search('jose ramirex')
+    assert ids(results)[0] == 1
+    assert 0.5 <= results[0][0] < 1
+
+
+def test_update_reindexes_only_changed_players(index):
+    players = [{'id': player_id, 'name': name, 'team': team, 'position': position, 'is_pitcher': is_pitcher}
+               for player_id, name, team, position, is_pitcher in PLAYERS]
+    players[0] = dict(players[0], team='Seattle Mariners')
+    del players[-1]
+
+    assert index.update(players) == (0, 1, 1)
+    assert index.prefix_matches('guard', 'team') == {5}
+    assert index.prefix_matches('seat', 'team') == {1}
+    assert index.search('guardiola') == []
+    assert len(index) == 6
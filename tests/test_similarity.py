@@ -0,0 +1,70 @@
+"""
+Nearest players from the similarity index against a brute-force z-scored distance.
+"""
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import synthetic_players
+from database import BATTING_STATS, PITCHING_STATS
+from similarity import SimilarityIndex
+
+
+@pytest.fixture(scope='module')
+def players():
+    return synthetic_players(300, current_year=2025)
+
+
+@pytest.fixture
+def index(players, make_snapshot):
+    return SimilarityIndex(make_snapshot(players))
+
+
+def brute_force(players, player_id, stat_sets, k, positions=None):
+    player = next(player for player in players if player['id'] == player_id)
+    group = sorted((other for other in players if other['is_pitcher'] == player['is_pitcher']),
+                   key=lambda other: other['id'])
+    stats = PITCHING_STATS if player['is_pitcher'] else BATTING_STATS
+    matrix = np.array([[other[f'stats_{stat_set.name}'][stat] for stat_set in stat_sets for stat in stats]
+                       for other in group], dtype=np.float64)
+    std = matrix.std(axis=0)
+    std[std == 0] = 1
+    vectors = (matrix - matrix.mean(axis=0)) / std
+    target = vectors[[other['id'] for other in group].index(player_id)]
+
+    ranked = sorted((float(np.linalg.norm(vector - target)), other['id']) for vector, other in zip(vectors, group)
+                    if other['id'] != player_id and (not positions or other['position'] in positions))
+    return ranked[:k]
+
+
+@pytest.mark.parametrize('pitcher', [False, True])
+def test_nearest_players_match_brute_force(players, index, pitcher):
+    player_id = next(player['id'] for player in players if player['is_pitcher'] == pitcher)
+    expected = brute_force(players, player_id, index.snapshot.stat_sets, 10)
+
+    found = index.similar([player_id], 10)[0]
+    assert [int(index.snapshot.ids[row]) for _, row in found] == [other_id for _, other_id in expected]
+    assert [distance for distance, _ in found] == pytest.approx([distance for distance, _ in expected])
+    assert all(bool(index.snapshot.is_pitcher[row]) == pitcher for _, row in found)
+
+
+def test_positions_limit_the_candidates(players, index):
+    player_id = next(player['id'] for player in players if not player['is_pitcher'])
+    found = index.similar([player_id], 5, positions=['SS', '2B'])[0]
+
+    expected = brute_force(players, player_id, index.snapshot.stat_sets, 5, positions=['SS', '2B'])
+    assert [int(index.snapshot.ids[row]) for _, row in found] == [other_id for _, other_id in expected]
+    assert {index.snapshot.player(row)['position'] for _, row in found} <= {'SS', '2B'}
+
+
+def test_k_beyond_the_group_returns_everyone_else(players, index):
+    pitchers = [player['id'] for player in players if player['is_pitcher']]
+    found = index.similar([pitchers[0]], len(players))[0]
+    assert sorted(int(index.snapshot.ids[row]) for _, row in found) == pitchers[1:]
+
+
+def test_batters_and_pitchers_are_not_compared(players, index):
+    batter = next(player['id'] for player in players if not player['is_pitcher'])
+    pitcher = next(player['id'] for player in players if player['is_pitcher'])
+    with pytest.raises(ValueError):
+        index.similar([batter, pitcher])
+    assert index.similar([]) == []
@@ -0,0 +1,92 @@
+"""
+Snapshot files served through FileSnapshot against the in-memory snapshot they were built from.
+"""
+import json
+import os
+
+import pytest
+
+import load_data
+import snapshot_file
+from benchmarks.synthetic import synthetic_players
+from database import StatSelection
+from scoring import WEIGHT_NAMES, FileSnapshot
+from serialization import STREAM_CHUNK_SIZE, MappedBody
+
+
+@pytest.fixture(scope='module')
+def players():
+    players = synthetic_players(3000, current_year=2025)
+    # An older season, so there is a range of actual stats to total
+    for player in players:
+        player['stats_2023_actual'] = dict(player['stats_2024_actual'], hr=player['stats_2024_actual']['hr'] + 1)
+    return players
+
+
+@pytest.fixture(scope='module')
+def snapshot_dir(players, tmp_path_factory):
+    directory = tmp_path_factory.mktemp('snapshots')
+    path = directory / 'players.json'
+    path.write_text(json.dumps(players))
+    load_data.build_snapshot(str(path), str(directory))
+    return str(directory)
+
+
+@pytest.fixture
+def snapshots(players, snapshot_dir, make_snapshot):
+    mapped = snapshot_file.MappedSnapshot(snapshot_file.current_snapshot(snapshot_dir))
+    return make_snapshot(players), FileSnapshot(mapped)
+
+
+def test_full_body_is_streamed_from_the_mapping(snapshots):
+    memory, mapped = snapshots
+    selection = mapped.selection()
+    body = mapped.body(selection)
+
+    assert isinstance(body, MappedBody)
+    chunks = list(body)
+    assert len(chunks) == -(-len(body) // STREAM_CHUNK_SIZE)
+    assert b''.join(chunks) == memory.body(selection)
+
+
+def test_pages_and_players_match(snapshots):
+    memory, mapped = snapshots
+    weights = dict.fromkeys(WEIGHT_NAMES, 1.0)
+    for year in (None, '2024', '2023-2024'):
+        selection = mapped.selection(year)
+        for options in ({'sort': 'hr', 'limit': 25}, {'sort': 'name', 'descending': False, 'offset': 10},
+                        {'positions': ['C', 'SS'], 'sort': 'avg', 'limit': 40}, {'is_pitcher': True}):
+            total, rows = mapped.page(selection, **options)
+            expected_total, expected_rows = memory.page(selection, **options)
+            assert (total, rows.tolist()) == (expected_total, expected_rows.tolist())
+        if year != '2023-2024':
+            assert mapped.points(weights, selection).tolist() == memory.points(weights, selection).tolist()
+            assert mapped.body(selection, [5, 0, 17]) == memory.body(selection, [5, 0, 17])
+    assert mapped.player(42) == memory.player(42)
+
+
+def test_ranges_are_totalled_like_the_database(players, snapshots):
+    _, mapped = snapshots
+    columns = mapped.stat_columns(StatSelection(2023, 2024, 'actual')).stats
+    row = mapped.row_of[players[0]['id']]
+    seasons = [players[0]['stats_2023_actual'], players[0]['stats_2024_actual']]
+
+    assert columns['hr'][row] == sum(stats['hr'] for stats in seasons)
+    rates = [stats['avg'] for stats in seasons if stats['avg']]
+    assert columns['avg'][row] == round(sum(rates) / len(rates), 3)
+
+
+def test_publish_swaps_current_and_keeps_the_last_two(tmp_path):
+    paths = [snapshot_file.publish(str(tmp_path), {'id': [index]}) for index in range(3)]
+
+    assert snapshot_file.current_snapshot(str(tmp_path)) == paths[-1]
+    assert sorted(name for name in os.listdir(tmp_path) if name.startswith('snapshot.')) == \
+        sorted(os.path.basename(path) for path in paths[1:])
+    assert snapshot_file.MappedSnapshot(paths[-1]).arrays['id'].tolist() == [2]
+
+
+def test_rejects_files_that_are_not_snapshots(tmp_path):
+    path = tmp_path / 'not-a-snapshot.bin'
+    path.write_bytes(b'x' * 64)
+    with pytest.raises(ValueError):
+        snapshot_file.MappedSnapshot(str(path))
@@ -0,0 +1,75 @@
+"""
+stat_parser against the hand-written person records in tests/fixtures/people.json.
+"""
+import json
+import os
+
+import pytest
+
+import stat_parser
+from stat_fields import PITCHING_STATS, STAT_NAMES
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+@pytest.fixture(scope='module')
+def people():
+    with open(os.path.join(FIXTURES, 'people.json')) as f:
+        return {person['fullName']: person for person in json.load(f)['people']}
+
+
+def player_info(person, position):
+    return {'id': person['id'], 'full_name': person['fullName'], 'team_name': 'Los Angeles Dodgers',
+            'position': position}
+
+
+def test_two_way_player_gets_both_groups(people):
+    player = stat_parser.build_player(player_info(people['Two Way'], 'TWP'), people['Two Way'], 2025)
+
+    assert list(player) == ['id', 'name', 'team', 'position', 'is_pitcher', 'stats_2024_actual',
+                            'stats_2025_projected', 'stats_2025_actual']
+    assert (player['id'], player['name'], player['is_pitcher']) == (660271, 'Two Way', False)
+    assert player['stats_2025_actual'] == {
+        'avg': 0.282, 'runs': 146, 'rbi': 102, 'steals': 20, 'hr': 55, 'hits': 172,
+        # (172 - 55) / (611 - 187 - 55)
+        'babip': 0.317,
+        'wins': 1, 'era': 2.87, 'strikeouts': 62, 'walks': 9, 'saves': 0, 'runs_scored': 14,
+        # (13 * 4 + 3 * 9 - 2 * 62) / 47 + 3.10
+        'fip': 2.14,
+    }
+    # 2023 is outside the two seasons written, and there was no pitching in 2024
+    assert player['stats_2024_actual']['hr'] == 54
+    assert player['stats_2024_actual']['babip'] == 0.34
+    assert all(player['stats_2024_actual'][stat] == 0 for stat in PITCHING_STATS)
+    assert player['stats_2025_projected'] == stat_parser.empty_stats()
+
+
+def test_last_split_of_a_season_wins_and_bad_values_are_zero(people):
+    person = people['Traded Reliever']
+    player = stat_parser.build_player(player_info(person, 'RP'), person, 2025)
+
+    assert player['is_pitcher']
+    stats = player['stats_2025_actual']
+    assert (stats['wins'], stats['era'], stats['strikeouts'], stats['saves']) == (3, 3.0, 24, 7)
+    assert stats['fip'] == 2.47
+    # An ERA of "-.--" parses as zero, and no innings count as one for FIP
+    assert player['stats_2024_actual']['era'] == 0
+    assert player['stats_2024_actual']['fip'] == round(13 * 1 + 3 * 1 + 3.10, 2)
+    assert player['stats_2024_actual']['avg'] == 0.0
+
+
+def test_person_without_stats_is_all_zeros(people):
+    person = people['September Callup']
+    player = stat_parser.build_player(player_info(person, 'CF'), person, 2025)
+
+    for name in ('stats_2024_actual', 'stats_2025_projected', 'stats_2025_actual'):
+        assert list(player[name]) == list(STAT_NAMES)
+        assert player[name] == stat_parser.empty_stats()
+
+
+@pytest.mark.parametrize('value, kind, default, expected', [
+    ('.275', float, 0, 0.275), ('3', int, 0, 3), ('-.--', float, 0, 0), (None, int, 0, 0),
+    ('0.0', float, 1.0, 1.0), ('', float, 0, 0),
+])
+def test_number(value, kind, default, expected):
+    assert stat_parser.number({'field': value}, 'field', kind, default) == expected